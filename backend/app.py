@@ -1,13 +1,40 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, request, jsonify, make_response, session, redirect, url_for, send_from_directory
 from datetime import datetime, timedelta
+import json
 import os
 import random
 import string
-from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
-import base64
+import logging
 from pathlib import Path
+from blinker import Namespace
+from sqlalchemy import or_, true, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, OTP, Complaint, FakeInvestigation, ArchivedComplaint, ResolutionCheck
+from archive import schedule_archival
+from escalation import schedule_escalation
+from events import (
+    EVENT_PAGE_MAX, event_dict, read_events, record_events, replaced, schedule_snapshots, timeline, transition
+)
+from assets import init_assets
+from fragments import card_language, card_tab, init_fragments, render_page, server_cards, status_counts
+from notifications import queue_fan_out
+from passwords import VerifierBusy, hash_password, needs_rehash, rehash_password, verify_password
+from logs import get_logger, init_logging, log_event
+from metrics import init_metrics, render_metrics
+from metrics_store import clear_snapshots
+from migrations import migrate_schema, schedule_migrations
+from principals import authorize, current_principal, revoke_sessions, start_session
+from profiling import init_profiling
+from risk import AUTO_FORWARD_MAX_RISK, assess_submission, photo_file_fingerprint, record_fakes, repeat_offenders
+import routing
+from serving import engine_options, init_serving
+from shards import init_shards
+from sync import SyncError, parse_operations, run_batch
+from tasks import enqueue
+from uploads import finished_upload, init_uploads
+from utils import DISTRICTS, ComplaintIdAllocator
+from verification import CHECK_PAGE_MAX, REVIEW_OUTCOMES, check_dict, review, schedule_verification
 
 # Initialize Flask App
 # Point to frontend folders that were moved
@@ -15,93 +42,33 @@ app = Flask(__name__,
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'database', 'civic_system.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = (
+    os.environ.get('DATABASE_URL', '').replace('postgres://', 'postgresql://', 1)
+    or 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'database', 'civic_system.db')
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Bounded, pre-pinged pool suited to every worker class (see serving.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit for base64 photo data
 
 # Initialize Database
-db = SQLAlchemy(app)
-
-# ==================== DATABASE MODELS ====================
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    phone = db.Column(db.String(10), unique=True, nullable=True)
-    user_id = db.Column(db.String(50), unique=True, nullable=True)
-    password = db.Column(db.String(255), nullable=True)
-    role = db.Column(db.String(20), nullable=False)  # citizen, municipal, dept, police
-    name = db.Column(db.String(100))
-    department = db.Column(db.String(100), nullable=True)
-    pincode = db.Column(db.String(6), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now)
-    complaints = db.relationship('Complaint', backref='reporter', lazy=True, foreign_keys='Complaint.reporter_id')
-
-class OTP(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    phone = db.Column(db.String(10), unique=True)
-    otp_code = db.Column(db.String(6))
-    created_at = db.Column(db.DateTime, default=datetime.now)
-    expires_at = db.Column(db.DateTime)
-
-class Complaint(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    complaint_id = db.Column(db.String(20), unique=True)
-    reporter_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    phone = db.Column(db.String(15), nullable=True)
-    title = db.Column(db.String(100), nullable=False)
-    complaint_type = db.Column(db.String(50), nullable=False)
-    description = db.Column(db.Text)
-    district = db.Column(db.String(50))
-    pincode = db.Column(db.String(6))
-    location = db.Column(db.String(200))
-    coordinates = db.Column(db.String(50))
-    status = db.Column(db.String(20), default='submitted')  # submitted, assigned, resolved
-    priority = db.Column(db.String(10), default='medium')
-    photo_path = db.Column(db.String(255))
-    photo_data = db.Column(db.LargeBinary)
-    evidence_path = db.Column(db.String(255))
-    resolved_photo_path = db.Column(db.String(255))
-    resolved_coordinates = db.Column(db.String(50))
-    forwarded_department = db.Column(db.String(100), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now)
-    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
-    verified_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
-    assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
-    resolved_at = db.Column(db.DateTime, nullable=True)
-    resolution_notes = db.Column(db.Text)
-    is_fake = db.Column(db.Boolean, default=False)
-    reporter_name = db.Column(db.String(100))
-    fake_investigation = db.relationship('FakeInvestigation', backref='complaint', lazy=True, uselist=False)
-
-class FakeInvestigation(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'), unique=True)
-    investigated_by = db.Column(db.Integer, db.ForeignKey('user.id'))
-    reason = db.Column(db.Text)
-    evidence = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, default=datetime.now)
-
-# ==================== AUTHENTICATION DECORATORS ====================
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def role_required(role):
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            if 'user_id' not in session:
-                return redirect(url_for('index'))
-            if session.get('role') != role:
-                return jsonify({'success': False, 'message': 'Access Denied'}), 403
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+db.init_app(app)
+
+# Structured logging with request ids (see logs.py)
+init_logging(app)
+logger = get_logger('app')
+
+# Fingerprinted CSS/JS bundles and per-language translation files (see assets.py)
+init_assets(app)
+
+# Resumable photo uploads for flaky mobile connections (see uploads.py)
+init_uploads(app)
+
+# Server-rendered, cached complaint cards for the dashboard (see fragments.py)
+init_fragments(app)
+
+# Application signals (post-commit hooks for complaint state changes)
+civic_signals = Namespace()
 
 # ==================== UTILITY FUNCTIONS ====================
 
@@ -109,21 +76,10 @@ def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
 def generate_complaint_id():
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join(random.choices(string.digits, k=4))
-    return f"CMP-{timestamp}-{random_suffix}"
+    return complaint_id_allocator.allocate()
 
 def get_districts():
-    return [
-        'Ariyalur', 'Chengalpattu', 'Chennai', 'Coimbatore', 'Cuddalore',
-        'Dharmapuri', 'Dindigul', 'Erode', 'Kallakurichi', 'Kancheepuram',
-        'Kanyakumari', 'Karur', 'Krishnagiri', 'Madurai', 'Mayiladuthurai',
-        'Nagapattinam', 'Namakkal', 'Nilgiris', 'Perambalur', 'Pudukkottai',
-        'Ramanathapuram', 'Ranipet', 'Salem', 'Sivaganga', 'Tenkasi',
-        'Thanjavur', 'Theni', 'Thoothukudi', 'Tiruchirappalli', 'Tirunelveli',
-        'Tirupathur', 'Tiruppur', 'Tiruvallur', 'Tiruvannamalai', 'Tiruvarur',
-        'Vellore', 'Viluppuram', 'Virudhunagar'
-    ]
+    return list(DISTRICTS)
 
 # ==================== ROUTES ====================
 
@@ -159,11 +115,10 @@ def request_otp():
         otp = OTP(phone=phone, otp_code=otp_code, expires_at=expires_at)
         db.session.add(otp)
     
+    # Delivered by the background worker once the OTP is committed
+    enqueue('send_sms', phone=phone, message=f"Your OTP is {otp_code}. It expires in 10 minutes.")
     db.session.commit()
     
-    # In production, send SMS via gateway
-    print(f"OTP for {phone}: {otp_code}")
-    
     return jsonify({'success': True, 'message': f'OTP sent. Demo OTP: {otp_code}', 'demo_otp': otp_code})
 
 @app.route('/api/citizen/verify-otp', methods=['POST'])
@@ -183,12 +138,12 @@ def verify_otp():
     user = User.query.filter_by(phone=phone).first()
     if not user:
         return jsonify({'success': False, 'message': 'User not found'}), 404
+    if user.is_active is False:
+        return jsonify({'success': False, 'message': 'Account disabled'}), 403
     
     # Create session
-    session['user_id'] = user.id
+    start_session(user)
     session['phone'] = phone
-    session['role'] = user.role
-    session['name'] = user.name
     
     # Delete used OTP
     db.session.delete(otp_record)
@@ -205,190 +160,302 @@ def official_login():
     pincode = data.get('pincode', '')
     department = data.get('department', '')
     
-    print(f"Login attempt: ID={user_id}, Role={role}, Pincode={pincode}, Dept={department}")
+    log_event(logger, 'login_attempt', 'Login attempt',
+              user_id=user_id, role=role, pincode=pincode, department=department)
     user = User.query.filter_by(user_id=user_id, role=role).first()
     
     if not user:
-        print(f"Login failed: User not found with ID {user_id} and role {role}")
+        log_event(logger, 'login_failed', 'Login failed: user not found', logging.WARNING, user_id=user_id, role=role)
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
         
-    if not check_password_hash(user.password, password):
-        print(f"Login failed: Password mismatch for {user_id}")
+    try:
+        password_ok = verify_password(user.password, password)
+        if password_ok and needs_rehash(user.password):
+            # Upgrade hashes made under an older policy while the plain password is at hand
+            user.password = rehash_password(password)
+            db.session.commit()
+    except VerifierBusy:
+        log_event(logger, 'login_busy', 'Login rejected: password verifier busy', logging.WARNING, user_id=user_id)
+        return jsonify({'success': False, 'message': 'Too many logins in progress, please retry'}), 503, {'Retry-After': '1'}
+    
+    if not password_ok:
+        log_event(logger, 'login_failed', 'Login failed: password mismatch', logging.WARNING, user_id=user_id, role=role)
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
+    if user.is_active is False:
+        return jsonify({'success': False, 'message': 'Account disabled'}), 403
     
     # Create session
-    session['user_id'] = user.id
-    session['role'] = user.role
-    session['name'] = user.name
+    start_session(user)
     session['pincode'] = pincode or user.pincode # Use entered pincode or default
     session['department'] = department or user.department
     
     return jsonify({'success': True, 'message': 'Login successful', 'role': user.role})
 
 @app.route('/dashboard')
-@login_required
+@authorize()
 def dashboard():
     role = session.get('role')
-    return render_template('dashboard.html', role=role, phone=session.get('phone'), districts=get_districts())
+    # First page of cards in the HTML when they are rendered on the server (see fragments.py)
+    cards = dashboard_cards(lang=request.cookies.get('lang')) if server_cards(request.args.get('cards')) else None
+    return render_template('dashboard.html', role=role, phone=session.get('phone'), districts=get_districts(),
+                           user_id=session['user_id'], cards=cards)
+
+def stage_complaint(data):
+    """
+    Validate a complaint submission and add it to the session without
+    committing; returns (response body, HTTP status). Nothing is staged when
+    the submission is rejected. Shared by the submit endpoint and /api/sync.
+    """
+    # Validate required fields
+    required_fields = ['type', 'district', 'pincode', 'location', 'description']
+    for field in required_fields:
+        if not data.get(field):
+            return {'success': False, 'message': f'{field.capitalize()} is required'}, 400
+    
+    user = current_principal()
+    
+    # A photo sent beforehand through the resumable upload API (see uploads.py)
+    photo_upload_id = data.get('photo_upload_id')
+    upload_path = None
+    if photo_upload_id:
+        upload_path = finished_upload(photo_upload_id, session['user_id'])
+        if not upload_path:
+            return {'success': False, 'message': 'Photo upload not found or not finished'}, 400
+    
+    complaint_id = generate_complaint_id()
+    
+    # Handle photo data if provided
+    photo_data = None if upload_path else data.get('photo')
+    photo_path = None
+    
+    if upload_path:
+        uploads_dir = Path(app.static_folder) / 'uploads'
+        photo_filename = f"{complaint_id}_{int(datetime.now().timestamp())}.jpg"
+        photo_path = str(uploads_dir / photo_filename)
+        enqueue('adopt_upload', max_attempts=3, upload_id=photo_upload_id, path=photo_path)
+    elif photo_data:
+        # Use static folder path from app config
+        uploads_dir = Path(app.static_folder) / 'uploads'
+        
+        if photo_data.startswith('data:image'):
+            # Extract base64 data after the comma
+            photo_data = photo_data.split(',')[1]
+        
+        # Decoding and writing the file happen in the background worker
+        photo_filename = f"{complaint_id}_{int(datetime.now().timestamp())}.jpg"
+        photo_path = str(uploads_dir / photo_filename)
+        enqueue('save_photo', max_attempts=3, path=photo_path, data=photo_data)
+    
+    complaint = Complaint(
+        complaint_id=complaint_id,
+        reporter_id=session['user_id'],
+        reporter_name=data.get('name') or user.name,
+        title=data.get('type'),
+        complaint_type=data.get('type'),
+        description=data.get('description'),
+        district=data.get('district'),
+        pincode=data.get('pincode'),
+        location=data.get('location'),
+        coordinates=data.get('coordinates', ''),
+        phone=data.get('mobile_number'),
+        photo_path=photo_path,
+        status='submitted'
+    )
+    
+    if upload_path:
+        complaint.photo_hash = photo_file_fingerprint(upload_path)
+    assess_submission(complaint, photo_data)
+    
+    # Predict the department; only a confident classifier skips manual triage, and never for a risky submission
+    department, confidence, model_confidence = routing.get_router().predict(
+        complaint.complaint_type, complaint.pincode, complaint.description
+    )
+    complaint.suggested_department = department
+    complaint.routing_confidence = confidence
+    auto_forwarded = (routing.AUTO_FORWARD and model_confidence >= routing.AUTO_FORWARD_CONFIDENCE
+                      and (complaint.risk_score or 0.0) < AUTO_FORWARD_MAX_RISK)
+    if auto_forwarded:
+        complaint.status = 'assigned'
+        complaint.forwarded_department = department
+        complaint.auto_forwarded = True
+    
+    db.session.add(complaint)
+    db.session.flush()
+    events = [transition(complaint, 'submit', None, session['user_id'], to_status='submitted', department=None)]
+    if auto_forwarded:
+        # Routed by the model, not by an officer
+        events.append(transition(complaint, 'forward', 'submitted', confidence=round(model_confidence, 3)))
+        queue_fan_out(events)
+    record_events(events)
+    
+    return {
+        'success': True,
+        'message': 'Complaint submitted successfully',
+        'complaint_id': complaint_id,
+        'forwarded_department': complaint.forwarded_department or ''
+    }, 200
 
 @app.route('/api/complaint/submit', methods=['POST'])
-@login_required
+@authorize()
 def submit_complaint():
     try:
         data = request.get_json()
-        print(f"Complaint Submission attempt by user {session.get('user_id')}")
+        log_event(logger, 'complaint_submit', 'Complaint submission attempt', user_id=session.get('user_id'))
         if not data:
             return jsonify({'success': False, 'message': 'No data provided'}), 400
         
-        # Validate required fields
-        required_fields = ['type', 'district', 'pincode', 'location', 'description']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'success': False, 'message': f'{field.capitalize()} is required'}), 400
-        
-        user = db.session.get(User, session['user_id'])
-        if not user:
-            return jsonify({'success': False, 'message': 'User not found'}), 404
-        
-        complaint_id = generate_complaint_id()
-        
-        # Handle photo data if provided
-        photo_data = data.get('photo')
-        photo_path = None
-        
-        if photo_data:
-            try:
-                # Create uploads directory if it doesn't exist
-                # Use static folder path from app config
-                uploads_dir = Path(app.static_folder) / 'uploads'
-                uploads_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Decode base64 photo
-                if photo_data.startswith('data:image'):
-                    # Extract base64 data after the comma
-                    photo_data = photo_data.split(',')[1]
-                
-                # Create filename
-                photo_filename = f"{complaint_id}_{int(datetime.now().timestamp())}.jpg"
-                photo_path = str(uploads_dir / photo_filename)
-                
-                # Save photo file
-                photo_bytes = base64.b64decode(photo_data)
-                with open(photo_path, 'wb') as f:
-                    f.write(photo_bytes)
-            except Exception as e:
-                print(f"Error saving photo: {e}")
-                photo_path = None
-        
-        complaint = Complaint(
-            complaint_id=complaint_id,
-            reporter_id=session['user_id'],
-            reporter_name=data.get('name') or user.name,
-            title=data.get('type'),
-            complaint_type=data.get('type'),
-            description=data.get('description'),
-            district=data.get('district'),
-            pincode=data.get('pincode'),
-            location=data.get('location'),
-            coordinates=data.get('coordinates', ''),
-            phone=data.get('mobile_number'),
-            photo_path=photo_path,
-            status='submitted'
-        )
-        
-        db.session.add(complaint)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Complaint submitted successfully',
-            'complaint_id': complaint_id
-        })
+        body, status = stage_complaint(data)
+        if status == 200:
+            db.session.commit()
+        return jsonify(body), status
     
     except Exception as e:
         db.session.rollback()
-        print(f"Error submitting complaint: {e}")
+        logger.exception('Error submitting complaint', extra={'event': 'complaint_submit_failed'})
         return jsonify({'success': False, 'message': f'Error submitting complaint: {str(e)}'}), 500
 
-@app.route('/api/complaints', methods=['GET'])
-@login_required
-def get_complaints():
+SEARCH_MIN_LENGTH = 3
+SEARCH_MAX_RESULTS = 200
+
+def scoped_complaints(model):
+    """Query for the complaints of `model` (live or archived) the signed-in role may see, or None"""
     role = session.get('role')
-    user_id = session['user_id']
-    
     pincode = session.get('pincode')
+    query = model.query
     
     if role == 'citizen':
-        complaints = Complaint.query.filter_by(reporter_id=user_id).all()
-    elif role == 'municipal':
+        return query.filter(model.reporter_id == session['user_id'])
+    if role == 'municipal':
         # Municipal officer sees complaints for the pincode entered at login
         if pincode:
-            complaints = Complaint.query.filter_by(pincode=pincode).all()
-        else:
-            complaints = Complaint.query.all()
-    elif role == 'dept':
+            query = query.filter(model.pincode == pincode)
+        return query
+    if role == 'dept':
         department = session.get('department')
-        query = Complaint.query
         if department:
-            query = query.filter(Complaint.forwarded_department == department)
+            query = query.filter(model.forwarded_department == department)
         if pincode:
-            query = query.filter(Complaint.pincode == pincode)
-        else:
-            query = query.filter(Complaint.status.in_(['assigned', 'in_progress', 'resolved']))
-        complaints = query.all()
-    elif role == 'police':
+            return query.filter(model.pincode == pincode)
+        return query.filter(model.status.in_(['assigned', 'in_progress', 'resolved']))
+    if role == 'police':
         # Police only see fake reports in the entered pincode
+        query = query.filter(model.is_fake.is_(True))
         if pincode:
-            complaints = Complaint.query.filter_by(is_fake=True, pincode=pincode).all()
-        else:
-            complaints = Complaint.query.filter_by(is_fake=True).all()
-    else:
-        complaints = []
-    
-    result = []
-    for c in complaints:
-        # Build photo URL if photo exists
-        photo_url = None
-        if c.photo_path:
-            # We store paths like '../frontend/static/uploads/file.jpg'
-            # We want URLs like '/static/uploads/file.jpg'
-            filename = os.path.basename(c.photo_path)
-            photo_url = f'/static/uploads/{filename}'
-        
-        resolved_photo_url = None
-        if c.resolved_photo_path:
-            filename = os.path.basename(c.resolved_photo_path)
-            resolved_photo_url = f'/static/uploads/{filename}'
-        
-        result.append({
-            'id': c.id,
-            'complaint_id': c.complaint_id,
-            'title': c.title or c.complaint_type,
-            'type': c.complaint_type,
-            'description': c.description or '',
-            'district': c.district,
-            'pincode': c.pincode,
-            'status': c.status,
-            'forwarded_department': c.forwarded_department or '',
-            'created_at': c.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'location': c.location,
-            'coordinates': c.coordinates or '',
-            'photo_url': photo_url,
-            'resolved_photo_url': resolved_photo_url,
-            'reporter_name': c.reporter_name or (c.reporter.name if c.reporter else 'Anonymous'),
-            'reporter_phone': c.phone or (c.reporter.phone if c.reporter else 'N/A'),
-            'resolution_notes': c.resolution_notes or '',
-            'resolved_coordinates': c.resolved_coordinates or ''
-        })
+            query = query.filter(model.pincode == pincode)
+        return query
+    return None
+
+def visible_complaint(complaint_id):
+    """The live or archived complaint `complaint_id` if the signed-in role may see it, else None"""
+    for model in (Complaint, ArchivedComplaint):
+        query = scoped_complaints(model)
+        if query is None:
+            return None
+        complaint = query.filter(model.id == complaint_id).first()
+        if complaint:
+            return complaint
+    return None
+
+def complaint_summary(c):
+    # Build photo URL if photo exists
+    photo_url = None
+    if c.photo_path:
+        # We store paths like '../frontend/static/uploads/file.jpg'
+        # We want URLs like '/static/uploads/file.jpg'
+        filename = os.path.basename(c.photo_path)
+        photo_url = f'/static/uploads/{filename}'
+    
+    resolved_photo_url = None
+    if c.resolved_photo_path:
+        filename = os.path.basename(c.resolved_photo_path)
+        resolved_photo_url = f'/static/uploads/{filename}'
+    
+    return {
+        'id': c.id,
+        'complaint_id': c.complaint_id,
+        'title': c.title or c.complaint_type,
+        'type': c.complaint_type,
+        'description': c.description or '',
+        'district': c.district,
+        'pincode': c.pincode,
+        'status': c.status,
+        'priority': c.priority or 'medium',
+        'forwarded_department': c.forwarded_department or '',
+        'suggested_department': c.suggested_department or '',
+        'risk_score': round(c.risk_score, 3) if c.risk_score is not None else None,
+        'created_at': c.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'location': c.location,
+        'coordinates': c.coordinates or '',
+        'photo_url': photo_url,
+        'resolved_photo_url': resolved_photo_url,
+        'reporter_name': c.reporter_name or (c.reporter.name if c.reporter else 'Anonymous'),
+        'reporter_phone': c.phone or (c.reporter.phone if c.reporter else 'N/A'),
+        'resolution_notes': c.resolution_notes or '',
+        'resolved_coordinates': c.resolved_coordinates or ''
+    }
+
+@app.route('/api/complaints', methods=['GET'])
+@authorize()
+def get_complaints():
+    query = scoped_complaints(Complaint)
+    if query is None:
+        return jsonify({'complaints': []})
+    if session.get('role') == 'municipal' and request.args.get('sort') == 'risk':
+        # Served by the (pincode, risk_score) index
+        query = query.order_by(Complaint.risk_score.desc().nullslast())
     
-    return jsonify({'complaints': result})
+    return jsonify({'complaints': [complaint_summary(c) for c in query.all()]})
+
+def dashboard_cards(tab=None, lang=None, before=None):
+    """A page of the signed-in role's complaint cards as HTML, with the tab counts on the first page"""
+    query = scoped_complaints(Complaint)
+    if query is None:
+        return None
+    role = session.get('role')
+    tab = card_tab(role, tab)
+    lang = card_language(lang)
+    counts = status_counts(query, Complaint) if tab and not before else None
+    html, next_before = render_page(query, Complaint, complaint_summary, role, tab, lang, before)
+    return {'html': html, 'tab': tab, 'lang': lang, 'counts': counts, 'next': next_before}
+
+@app.route('/dashboard/cards', methods=['GET'])
+@authorize()
+def get_dashboard_cards():
+    """Next page of cards (?before=<id>), or the first page of another tab (?tab=) or language (?lang=)"""
+    cards = dashboard_cards(request.args.get('tab'), request.args.get('lang'), request.args.get('before', type=int))
+    if cards is None:
+        return '', 204
+    response = make_response(cards['html'])
+    if cards['counts']:
+        response.headers['X-Status-Counts'] = json.dumps(cards['counts'])
+    return response
+
+@app.route('/api/complaints/search', methods=['GET'])
+@authorize()
+def search_complaints():
+    """Live and archived complaints matching `q`: a complaint ID, or text in the description or location"""
+    q = request.args.get('q', '').strip()
+    if len(q) < SEARCH_MIN_LENGTH:
+        return jsonify({'success': False, 'message': f'Search text must be at least {SEARCH_MIN_LENGTH} characters'}), 400
+    limit = min(request.args.get('limit', 50, type=int), SEARCH_MAX_RESULTS)
+    
+    results = []
+    for model in (Complaint, ArchivedComplaint):
+        query = scoped_complaints(model)
+        if query is None or len(results) >= limit:
+            break
+        matches = query.filter(or_(
+            model.complaint_id == q,
+            model.description.contains(q, autoescape=True),
+            model.location.contains(q, autoescape=True),
+        )).order_by(model.created_at.desc()).limit(limit - len(results))
+        results += [dict(complaint_summary(c), archived=model is ArchivedComplaint) for c in matches]
+    
+    return jsonify({'success': True, 'complaints': results})
 
 @app.route('/api/complaint/<int:complaint_id>/forward', methods=['POST'])
-@login_required
+@authorize('municipal')
 def forward_complaint(complaint_id):
-    if session.get('role') != 'municipal':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-
     data = request.get_json()
     department = data.get('department', '').strip()
 
@@ -399,19 +466,21 @@ def forward_complaint(complaint_id):
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
 
+    from_status = complaint.status
     complaint.status = 'assigned'
     complaint.forwarded_department = department
     complaint.verified_by = session['user_id']
     complaint.updated_at = datetime.now()
+    event = transition(complaint, 'forward', from_status, session['user_id'], at=complaint.updated_at)
+    record_events([event])
+    queue_fan_out([event])
     db.session.commit()
 
     return jsonify({'success': True, 'message': f'Complaint forwarded to {department}'})
 
 @app.route('/api/complaint/<int:complaint_id>/assign', methods=['POST'])
-@login_required
+@authorize('municipal')
 def assign_complaint(complaint_id):
-    if session.get('role') != 'municipal':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     data = request.get_json()
     dept_officer_id = data.get('assigned_to')
@@ -420,34 +489,35 @@ def assign_complaint(complaint_id):
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
+    from_status = complaint.status
     complaint.status = 'assigned'
     complaint.assigned_to = dept_officer_id
     complaint.updated_at = datetime.now()
+    record_events([transition(complaint, 'assign', from_status, session['user_id'], at=complaint.updated_at,
+                              assigned_to=dept_officer_id)])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Complaint assigned'})
 
 @app.route('/api/complaint/<int:complaint_id>/start-work', methods=['POST'])
-@login_required
+@authorize('dept')
 def start_work(complaint_id):
-    if session.get('role') != 'dept':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     complaint = db.session.get(Complaint, complaint_id)
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
+    from_status = complaint.status
     complaint.status = 'in_progress'
     complaint.updated_at = datetime.now()
+    record_events([transition(complaint, 'start_work', from_status, session['user_id'], at=complaint.updated_at)])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Complaint marked as In Progress'})
 
 @app.route('/api/complaint/<int:complaint_id>/resolve', methods=['POST'])
-@login_required
+@authorize('dept')
 def resolve_complaint(complaint_id):
-    if session.get('role') != 'dept':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     data = request.get_json()
     
@@ -455,70 +525,92 @@ def resolve_complaint(complaint_id):
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
+    from_status, previous_notes = complaint.status, complaint.resolution_notes
     complaint.status = 'resolved'
     complaint.resolved_at = datetime.now()
     complaint.resolution_notes = data.get('notes')
     complaint.updated_at = datetime.now()
+    event = transition(complaint, 'resolve', from_status, session['user_id'], at=complaint.updated_at,
+                       notes=complaint.resolution_notes,
+                       previous_notes=replaced(previous_notes, complaint.resolution_notes))
+    record_events([event])
+    queue_fan_out([event])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Complaint resolved'})
 
-@app.route('/api/complaint/<int:complaint_id>/update-status', methods=['POST'])
-@login_required
-def update_status(complaint_id):
-    if session.get('role') != 'dept':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-    
-    data = request.get_json()
+def stage_status_update(complaint_id, data):
+    """
+    Validate a department status update and apply it to the session without
+    committing; returns (response body, HTTP status). Everything is checked
+    before the complaint is touched, so a rejected update stages nothing.
+    Shared by the update-status endpoint and /api/sync.
+    """
     new_status = data.get('status')
     notes = data.get('notes', '')
     
     if new_status not in ['assigned', 'in_progress', 'resolved']:
-        return jsonify({'success': False, 'message': 'Invalid status'}), 400
+        return {'success': False, 'message': 'Invalid status'}, 400
         
     complaint = db.session.get(Complaint, complaint_id)
     if not complaint:
-        return jsonify({'success': False, 'message': 'Complaint not found'}), 404
+        return {'success': False, 'message': 'Complaint not found'}, 404
+    
+    # A resolved photo arrives as a finished resumable upload or inline base64
+    resolved_photo_upload_id = data.get('resolved_photo_upload_id') if new_status == 'resolved' else None
+    resolved_photo_data = data.get('resolved_photo') if new_status == 'resolved' else None
+    if resolved_photo_upload_id and not finished_upload(resolved_photo_upload_id, session['user_id']):
+        return {'success': False, 'message': 'Photo upload not found or not finished'}, 400
         
+    from_status, previous_notes = complaint.status, complaint.resolution_notes
     complaint.status = new_status
     if notes:
         complaint.resolution_notes = notes
         
     complaint.updated_at = datetime.now()
+    event = transition(complaint, 'resolve' if new_status == 'resolved' else 'update_status', from_status,
+                       session['user_id'], at=complaint.updated_at, notes=notes,
+                       previous_notes=replaced(previous_notes, complaint.resolution_notes))
     if new_status == 'resolved':
         complaint.resolved_at = datetime.now()
         complaint.resolved_coordinates = data.get('resolved_coordinates')
         
-        # Handle resolved photo if provided
-        resolved_photo_data = data.get('resolved_photo')
-        if resolved_photo_data:
-            try:
-                # Use static folder path from app config
-                uploads_dir = Path(app.static_folder) / 'uploads'
-                uploads_dir.mkdir(parents=True, exist_ok=True)
-                
+        if resolved_photo_upload_id or resolved_photo_data:
+            # Use static folder path from app config
+            uploads_dir = Path(app.static_folder) / 'uploads'
+            photo_filename = f"RES_{complaint.complaint_id}_{int(datetime.now().timestamp())}.jpg"
+            photo_path = str(uploads_dir / photo_filename)
+            
+            if resolved_photo_upload_id:
+                enqueue('adopt_upload', max_attempts=3, upload_id=resolved_photo_upload_id, path=photo_path,
+                        column='resolved_photo_path')
+            else:
                 if resolved_photo_data.startswith('data:image'):
                     resolved_photo_data = resolved_photo_data.split(',')[1]
-                
-                photo_filename = f"RES_{complaint.complaint_id}_{int(datetime.now().timestamp())}.jpg"
-                photo_path = str(uploads_dir / photo_filename)
-                
-                photo_bytes = base64.b64decode(resolved_photo_data)
-                with open(photo_path, 'wb') as f:
-                    f.write(photo_bytes)
-                
-                complaint.resolved_photo_path = photo_path
-            except Exception as e:
-                print(f"Error saving resolved photo: {e}")
-                
-    db.session.commit()
-    return jsonify({'success': True, 'message': f'Status updated to {new_status}'})
+                enqueue('save_photo', max_attempts=3, path=photo_path, data=resolved_photo_data,
+                        column='resolved_photo_path')
+            
+            complaint.resolved_photo_path = photo_path
+        
+        event['resolved_coordinates'] = complaint.resolved_coordinates
+        queue_fan_out([event])
+    record_events([event])
+    
+    return {'success': True, 'message': f'Status updated to {new_status}'}, 200
+
+@app.route('/api/complaint/<int:complaint_id>/update-status', methods=['POST'])
+@authorize('dept')
+def update_status(complaint_id):
+    
+    data = request.get_json()
+    body, status = stage_status_update(complaint_id, data)
+    if status == 200:
+        db.session.commit()
+    return jsonify(body), status
 
 @app.route('/api/complaint/<int:complaint_id>/mark-fake', methods=['POST'])
-@login_required
+@authorize('dept')
 def dept_mark_fake(complaint_id):
-    if session.get('role') != 'dept':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     data = request.get_json()
     reason = data.get('reason', 'Marked as fake/spam by department officer')
@@ -527,19 +619,24 @@ def dept_mark_fake(complaint_id):
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
+    if not complaint.is_fake:
+        record_fakes([complaint.id])
+    from_status, previous_notes = complaint.status, complaint.resolution_notes
     complaint.is_fake = True
     complaint.status = 'resolved' # Mark as resolved/closed from dept view
     complaint.resolution_notes = f"REPORTED AS FAKE: {reason}"
     complaint.updated_at = datetime.now()
+    # The notes the department had written survive in the event log
+    record_events([transition(complaint, 'mark_fake', from_status, session['user_id'], at=complaint.updated_at,
+                              reason=reason, notes=complaint.resolution_notes,
+                              previous_notes=replaced(previous_notes, complaint.resolution_notes))])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Complaint marked as fake and moved to investigation'})
 
 @app.route('/api/complaint/<int:complaint_id>/report-fake', methods=['POST'])
-@login_required
+@authorize('police')
 def report_fake_complaint(complaint_id):
-    if session.get('role') != 'police':
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
     data = request.get_json()
     
@@ -547,6 +644,8 @@ def report_fake_complaint(complaint_id):
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
+    if not complaint.is_fake:
+        record_fakes([complaint.id])
     complaint.is_fake = True
     investigation = FakeInvestigation(
         complaint_id=complaint_id,
@@ -556,14 +655,213 @@ def report_fake_complaint(complaint_id):
     )
     
     db.session.add(investigation)
+    record_events([transition(complaint, 'report_fake', complaint.status, session['user_id'],
+                              reason=investigation.reason, evidence=investigation.evidence)])
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Complaint marked as fake'})
 
+# ==================== BULK TRANSITIONS ====================
+
+BULK_MAX_IDS = 500
+
+# Receivers get one call per committed batch: events=[{complaint_id, action, from_status, to_status, ...}]
+complaint_transitions = civic_signals.signal('complaint-transitions')
+
+def parse_bulk_ids(data):
+    """Return the de-duplicated list of integer complaint ids in the request, or None if malformed"""
+    raw_ids = (data or {}).get('complaint_ids')
+    if not isinstance(raw_ids, list) or not raw_ids or len(raw_ids) > BULK_MAX_IDS:
+        return None
+    ids = []
+    seen = set()
+    for raw_id in raw_ids:
+        try:
+            complaint_id = int(raw_id)
+        except (TypeError, ValueError):
+            return None
+        if complaint_id not in seen:
+            seen.add(complaint_id)
+            ids.append(complaint_id)
+    return ids
+
+def apply_bulk_transition(ids, action, values, eligible=None, before_commit=None, details=None):
+    """Apply `values` to the complaints of `ids` the officer may see in a single UPDATE and commit.
+
+    `eligible` is (criterion, message): complaints failing the criterion are left untouched
+    and reported with the message. The officer's scope (scoped_complaints) and the criterion
+    are part of the UPDATE's WHERE, so a complaint changed after it was read is reported,
+    not overwritten. `before_commit(updated_ids)` runs inside the same transaction; `details`
+    go into each complaint's event payload.
+    """
+    scope = scoped_complaints(Complaint).whereclause
+    scope = true() if scope is None else scope
+    criterion, skip_message = eligible or (true(), None)
+    rows = db.session.query(
+        Complaint.id, Complaint.status, Complaint.forwarded_department, Complaint.resolution_notes,
+        scope.label('in_scope'), criterion.label('eligible')
+    ).filter(Complaint.id.in_(ids)).all()
+    rows_by_id = {row.id: row for row in rows}
+
+    now = datetime.now()
+    values = dict(values, updated_at=now)
+    candidates = [row.id for row in rows if row.in_scope and row.eligible]
+    matched = set()
+    if candidates:
+        matched = set(db.session.execute(
+            update(Complaint).where(Complaint.id.in_(candidates), scope, criterion)
+            .values(values).returning(Complaint.id),
+            execution_options={'synchronize_session': False},
+        ).scalars())
+
+    results = []
+    events = []
+    for complaint_id in ids:
+        row = rows_by_id.get(complaint_id)
+        if not row:
+            results.append({'id': complaint_id, 'success': False, 'message': 'Complaint not found'})
+        elif not row.in_scope:
+            results.append({'id': complaint_id, 'success': False, 'message': 'Unauthorized'})
+        elif not row.eligible:
+            results.append({'id': complaint_id, 'success': False, 'message': skip_message})
+        elif complaint_id not in matched:
+            results.append({'id': complaint_id, 'success': False, 'message': 'Changed by another request; reload and retry'})
+        else:
+            results.append({'id': complaint_id, 'success': True, 'message': 'Updated'})
+            events.append({
+                'complaint_id': complaint_id,
+                'action': action,
+                'from_status': row.status,
+                'to_status': values.get('status', row.status),
+                'department': values.get('forwarded_department', row.forwarded_department),
+                'actor_id': session['user_id'],
+                'at': now,
+                **(details or {}),
+            })
+            if 'resolution_notes' in values:
+                events[-1].update(notes=values['resolution_notes'],
+                                  previous_notes=replaced(row.resolution_notes, values['resolution_notes']))
+
+    updated_ids = [event['complaint_id'] for event in events]
+    if updated_ids:
+        if before_commit:
+            before_commit(updated_ids)
+        record_events(events)
+        queue_fan_out(events)
+        db.session.commit()
+        complaint_transitions.send(app, events=events)
+
+    return jsonify({
+        'success': True,
+        'message': f'{len(updated_ids)} of {len(ids)} complaints updated',
+        'updated': len(updated_ids),
+        'results': results
+    })
+
+@app.route('/api/complaints/bulk/forward', methods=['POST'])
+@authorize('municipal')
+def bulk_forward_complaints():
+    data = request.get_json()
+    ids = parse_bulk_ids(data)
+    if ids is None:
+        return jsonify({'success': False, 'message': f'Provide 1-{BULK_MAX_IDS} complaint ids'}), 400
+
+    department = data.get('department', '').strip()
+    if not department:
+        return jsonify({'success': False, 'message': 'Please select a department'}), 400
+
+    return apply_bulk_transition(ids, 'forward', {
+        'status': 'assigned',
+        'forwarded_department': department,
+        'verified_by': session['user_id'],
+    })
+
+@app.route('/api/complaints/bulk/start-work', methods=['POST'])
+@authorize('dept')
+def bulk_start_work():
+    ids = parse_bulk_ids(request.get_json())
+    if ids is None:
+        return jsonify({'success': False, 'message': f'Provide 1-{BULK_MAX_IDS} complaint ids'}), 400
+
+    return apply_bulk_transition(ids, 'start_work', {'status': 'in_progress'})
+
+@app.route('/api/complaints/bulk/resolve', methods=['POST'])
+@authorize('dept')
+def bulk_resolve_complaints():
+    data = request.get_json()
+    ids = parse_bulk_ids(data)
+    if ids is None:
+        return jsonify({'success': False, 'message': f'Provide 1-{BULK_MAX_IDS} complaint ids'}), 400
+
+    return apply_bulk_transition(ids, 'resolve', {
+        'status': 'resolved',
+        'resolved_at': datetime.now(),
+        'resolution_notes': data.get('notes'),
+    })
+
+@app.route('/api/complaints/bulk/mark-fake', methods=['POST'])
+@authorize('dept')
+def bulk_mark_fake():
+    data = request.get_json()
+    ids = parse_bulk_ids(data)
+    if ids is None:
+        return jsonify({'success': False, 'message': f'Provide 1-{BULK_MAX_IDS} complaint ids'}), 400
+
+    reason = data.get('reason', 'Marked as fake/spam by department officer')
+    return apply_bulk_transition(ids, 'mark_fake', {
+        'is_fake': True,
+        'status': 'resolved',
+        'resolution_notes': f"REPORTED AS FAKE: {reason}",
+    }, eligible=(Complaint.is_fake.isnot(True), 'Already marked as fake'),
+       before_commit=record_fakes, details={'reason': reason})
+
+# ==================== OFFLINE SYNC ====================
+
+def sync_submit_complaint(operation):
+    return stage_complaint(operation.get('data') or {})
+
+def sync_update_status(operation):
+    if session.get('role') != 'dept':
+        return {'success': False, 'message': 'Unauthorized'}, 403
+    complaint_id = operation.get('complaint_id')
+    if not isinstance(complaint_id, int):
+        return {'success': False, 'message': 'complaint_id is required'}, 400
+    return stage_status_update(complaint_id, operation.get('data') or {})
+
+SYNC_HANDLERS = {
+    'submit_complaint': sync_submit_complaint,
+    'update_status': sync_update_status,
+}
+
+@app.route('/api/sync', methods=['POST'])
+@authorize()
+def sync_outbox():
+    """Apply a device's queued submissions and status updates in one transaction (see sync.py)"""
+    try:
+        operations = parse_operations(request.get_json(silent=True), SYNC_HANDLERS)
+    except SyncError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        results = run_batch(session['user_id'], operations, SYNC_HANDLERS)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Error syncing outbox', extra={'event': 'sync_failed'})
+        return jsonify({'success': False, 'message': f'Error syncing: {str(e)}'}), 500
+    return jsonify({'success': True, 'message': f'Synced {len(results)} operations', 'results': results})
+
+@app.route('/api/police/repeat-offenders', methods=['GET'])
+@authorize('police')
+def get_repeat_offenders():
+    
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({'success': True, 'offenders': repeat_offenders(limit)})
+
 @app.route('/api/complaint/<int:complaint_id>/detail', methods=['GET'])
-@login_required
+@authorize()
 def complaint_detail(complaint_id):
-    complaint = db.session.get(Complaint, complaint_id)
+    # Complaints closed long ago live in the archive under the same id (see archive.py)
+    complaint = visible_complaint(complaint_id)
     if not complaint:
         return jsonify({'success': False, 'message': 'Complaint not found'}), 404
     
@@ -590,6 +888,7 @@ def complaint_detail(complaint_id):
             'location': complaint.location,
             'coordinates': complaint.coordinates or '',
             'status': complaint.status,
+            'priority': complaint.priority or 'medium',
             'forwarded_department': complaint.forwarded_department or '',
             'created_at': complaint.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'photo_url': photo_url,
@@ -597,15 +896,101 @@ def complaint_detail(complaint_id):
             'reporter_name': complaint.reporter_name or (complaint.reporter.name if complaint.reporter else 'Unknown'),
             'reporter_phone': complaint.phone or (complaint.reporter.phone if complaint.reporter else 'N/A'),
             'resolution_notes': complaint.resolution_notes or '',
-            'resolved_coordinates': complaint.resolved_coordinates or ''
+            'resolved_coordinates': complaint.resolved_coordinates or '',
+            'archived': isinstance(complaint, ArchivedComplaint)
         }
     })
 
+# Investigation details and the officers involved are not shown to citizens
+CITIZEN_HIDDEN_FIELDS = {'reason', 'evidence', 'notes', 'previous_notes', 'assigned_to', 'actor_id', 'last_actor_id'}
+
+def citizen_view(record):
+    record = {key: value for key, value in record.items() if key not in CITIZEN_HIDDEN_FIELDS}
+    if 'details' in record:
+        record['details'] = citizen_view(record['details'])
+    return record
+
+@app.route('/api/complaint/<int:complaint_id>/timeline', methods=['GET'])
+@authorize()
+def complaint_timeline(complaint_id):
+    if not visible_complaint(complaint_id):
+        return jsonify({'success': False, 'message': 'Complaint not found'}), 404
+    # Read from the event log, so it outlives archival of the complaint itself
+    state, events = timeline(complaint_id)
+    if state is None:
+        return jsonify({'success': False, 'message': 'No events for this complaint'}), 404
+    if session.get('role') == 'citizen':
+        state, events = citizen_view(state), [citizen_view(event) for event in events]
+    return jsonify({'success': True, 'state': state, 'events': events})
+
+@app.route('/api/events', methods=['GET'])
+@authorize('municipal')
+def get_events():
+    """Page through the event log in order: pass the returned `next` as `after` to continue"""
+    after = request.args.get('after', 0, type=int)
+    limit = min(request.args.get('limit', 100, type=int), EVENT_PAGE_MAX)
+    try:
+        since, until = (datetime.fromisoformat(request.args[key]) if request.args.get(key) else None
+                        for key in ('since', 'until'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'since and until must be ISO 8601 timestamps'}), 400
+    events = read_events(after, limit, since, until)
+    return jsonify({
+        'success': True,
+        'events': [event_dict(e) for e in events],
+        'next': events[-1].id if events else after,
+    })
+
+@app.route('/api/resolution-checks', methods=['GET'])
+@authorize('municipal')
+def get_resolution_checks():
+    """Automated checks of resolution proofs in the officer's pincode, flagged ones by default, newest first"""
+    status = request.args.get('status', 'flagged')
+    limit = min(request.args.get('limit', 100, type=int), CHECK_PAGE_MAX)
+    query = ResolutionCheck.query.filter_by(status=status)
+    if session.get('pincode'):
+        query = query.filter_by(pincode=session['pincode'])
+    checks = query.order_by(ResolutionCheck.id.desc()).limit(limit)
+    return jsonify({'success': True, 'checks': [check_dict(c) for c in checks]})
+
+@app.route('/api/resolution-checks/<int:check_id>/review', methods=['POST'])
+@authorize('municipal')
+def review_resolution_check(check_id):
+    data = request.get_json() or {}
+    outcome = data.get('outcome')
+    if outcome not in REVIEW_OUTCOMES:
+        return jsonify({'success': False, 'message': f"outcome must be one of: {', '.join(REVIEW_OUTCOMES)}"}), 400
+    
+    check = db.session.get(ResolutionCheck, check_id)
+    if not check or (session.get('pincode') and check.pincode != session['pincode']):
+        return jsonify({'success': False, 'message': 'Resolution check not found'}), 404
+    
+    review(check, outcome, session['user_id'])
+    db.session.commit()
+    return jsonify({'success': True, 'message': f'Resolution proof {outcome}', 'check': check_dict(check)})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('index'))
 
+@app.route('/api/session/revoke-all', methods=['POST'])
+@authorize()
+def revoke_all_sessions():
+    # Logs this user out on every device, including the current one
+    user = db.session.get(User, session['user_id'])
+    revoke_sessions(user)
+    db.session.commit()
+    session.clear()
+    return jsonify({'success': True, 'message': 'All sessions revoked'})
+
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
@@ -624,30 +1009,58 @@ def create_sample_data():
         return  # Data already exists
     
     # Sample users
+    sample_password = hash_password('password123')
     users = [
         User(phone='9876543210', role='citizen', name='John Doe'),
         User(phone='9876543211', role='citizen', name='Jane Smith'),
-        User(user_id='MUN001', password=generate_password_hash('password123'), role='municipal', name='Municipal Officer', pincode='600001'),
-        User(user_id='DEPT001', password=generate_password_hash('password123'), role='dept', name='Municipal Corp Officer', department='Municipal Corporation'),
-        User(user_id='DEPT002', password=generate_password_hash('password123'), role='dept', name='Electrical Board Officer', department='Electrical Board'),
-        User(user_id='DEPT003', password=generate_password_hash('password123'), role='dept', name='Fire Station Officer', department='Fire Station'),
-        User(user_id='POLICE001', password=generate_password_hash('password123'), role='police', name='Police Officer'),
+        User(user_id='MUN001', password=sample_password, role='municipal', name='Municipal Officer', pincode='600001'),
+        User(user_id='DEPT001', password=sample_password, role='dept', name='Municipal Corp Officer', department='Municipal Corporation'),
+        User(user_id='DEPT002', password=sample_password, role='dept', name='Electrical Board Officer', department='Electrical Board'),
+        User(user_id='DEPT003', password=sample_password, role='dept', name='Fire Station Officer', department='Fire Station'),
+        User(user_id='POLICE001', password=sample_password, role='police', name='Police Officer'),
     ]
     
     for user in users:
         db.session.add(user)
     
-    db.session.commit()
-    print("Sample data created successfully")
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker booting against the same empty database seeded it first
+        db.session.rollback()
+        return
+    logger.info('Sample data created successfully')
 
 # ==================== INITIALIZE DATABASE ====================
 
 with app.app_context():
     db.create_all()
+    # Complaint tables on their district shards when SHARD_MAP is set (see shards.py)
+    init_shards(app)
+    # Bring databases created by older versions up to the current schema (see migrations.py)
+    migrate_schema(db.engine)
+    init_metrics(app, db.engine)
+    init_profiling(app, db.engine)
+    # Uploads are received in full before views touch the database; SQLite runs in WAL mode
+    init_serving(app, db.engine)
     create_sample_data()
+    # Closed complaints move to the archive tables in the background (see archive.py)
+    schedule_archival()
+    # Complaint events are folded into snapshots in the background (see events.py)
+    schedule_snapshots()
+    # Backfills and index builds of new migrations run in the background too
+    schedule_migrations()
+    # Resolution proofs are checked in batches off the request path (see verification.py)
+    schedule_verification()
+    # Complaints past their SLA are escalated by a recurring job (see escalation.py)
+    schedule_escalation()
+    db.session.commit()
+    complaint_id_allocator = ComplaintIdAllocator(db.engine)
 
 # ==================== MAIN ====================
 
 if __name__ == "__main__":
+    # A fresh server run: forget the metric snapshots of the previous one
+    clear_snapshots()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
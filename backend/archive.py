@@ -0,0 +1,157 @@
+"""
+Archival of closed complaints (hot/cold partitioning).
+
+Complaints that were resolved or confirmed fake and have not changed for
+ARCHIVE_AFTER_DAYS are moved, with their FakeInvestigation, from
+``complaint`` into ``archived_complaint`` (``archived_fake_investigation``).
+The live table and its indexes then hold only current work, so the role
+queries in get_complaints(), the SLA scans and the risk lookups stay small
+enough to be served from memory however long the system runs.
+
+The ``archive_complaints`` job moves ARCHIVE_BATCH_SIZE rows per
+transaction (INSERT ... SELECT into the archive, then DELETE), pausing
+between batches, so no lock is held for long and other writers, SQLite's
+single writer in particular, get in between. The DELETE repeats the
+selection's conditions; if a row changed after it was selected the batch is
+rolled back and left for the next run. A run moves at most
+ARCHIVE_MAX_BATCHES batches and reschedules itself sooner while a backlog
+remains. With district shards (shards.py) each shard is archived in turn,
+its complaints moving to the archive table on the same shard.
+
+Archived complaints keep their ids: the detail endpoint and
+/api/complaints/search look in the archive too, photo-reuse checks and
+rebuilt risk features count archived complaints, and the routing model
+trains on them. Two kinds of rows are held back: complaints with
+notifications still pending, and (unless sharded) the newest complaint row,
+because SQLite hands the highest deleted id to the next insert.
+
+Usage:
+  python archive.py         - Archive everything due now and exit
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, literal, or_, select
+
+from logs import get_logger, log_event
+from models import (db, ArchivedComplaint, ArchivedFakeInvestigation, BackgroundJob, Complaint,
+                    FakeInvestigation, Notification)
+from shards import pinned, shard_names, sharding_enabled
+from tasks import enqueue, task
+
+logger = get_logger('archive')
+
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 200))
+ARCHIVE_MAX_BATCHES = int(os.environ.get('ARCHIVE_MAX_BATCHES', 50))
+ARCHIVE_BATCH_PAUSE = float(os.environ.get('ARCHIVE_BATCH_PAUSE', 0.1))
+ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 24 * 3600))
+ARCHIVE_BACKLOG_INTERVAL = 60
+
+
+def held_back():
+    """Complaints with notifications still pending (read on their own: notifications may be on another database)"""
+    return [row.complaint_id for row in db.session.query(Notification.complaint_id).filter(
+        Notification.status == 'pending', Notification.complaint_id.isnot(None)
+    ).distinct()]
+
+
+def archivable(cutoff, held):
+    """Conditions for a live complaint to be moved to the archive"""
+    return (
+        or_(Complaint.status == 'resolved', Complaint.is_fake.is_(True)),
+        Complaint.updated_at < cutoff,
+        Complaint.id.notin_(held),
+    )
+
+
+def archive_batch(cutoff, shard_id=None, limit=ARCHIVE_BATCH_SIZE):
+    """Move up to `limit` archivable complaints (of one shard) in one transaction; returns how many moved"""
+    on_shard = pinned(shard_id)
+    held = held_back()
+    query = db.session.query(Complaint.id).filter(*archivable(cutoff, held))
+    if not sharding_enabled():
+        # Sharded ids come from shard_sequence and are never handed out twice
+        newest = db.session.query(func.max(Complaint.id)).scalar()
+        query = query.filter(Complaint.id < (newest or 0))
+    ids = [row.id for row in query.order_by(Complaint.id).limit(limit).execution_options(**on_shard)]
+    if not ids:
+        return 0
+
+    now = literal(datetime.now())
+    complaint_columns = [column.name for column in Complaint.__table__.columns]
+    db.session.execute(ArchivedComplaint.__table__.insert().from_select(
+        complaint_columns + ['archived_at'],
+        select(*Complaint.__table__.columns, now).where(Complaint.id.in_(ids))
+    ), execution_options=on_shard)
+    investigation_columns = [column.name for column in FakeInvestigation.__table__.columns]
+    db.session.execute(ArchivedFakeInvestigation.__table__.insert().from_select(
+        investigation_columns,
+        select(*FakeInvestigation.__table__.columns).where(FakeInvestigation.complaint_id.in_(ids))
+    ))
+    # Sent notifications keep their text; only the link to the live row goes
+    Notification.query.filter(Notification.complaint_id.in_(ids)).update(
+        {'complaint_id': None}, synchronize_session=False
+    )
+    FakeInvestigation.query.filter(FakeInvestigation.complaint_id.in_(ids)).delete(synchronize_session=False)
+    deleted = Complaint.query.filter(Complaint.id.in_(ids), *archivable(cutoff, held)).execution_options(
+        **on_shard
+    ).delete(synchronize_session=False)
+    if deleted != len(ids):
+        # Some rows changed since they were selected; try them again next run
+        db.session.rollback()
+        log_event(logger, 'archive_conflict', 'Complaints changed while being archived; batch skipped',
+                  selected=len(ids), matched=deleted, shard=shard_id)
+        return 0
+    db.session.commit()
+    return deleted
+
+
+def run_archival(cutoff=None, max_batches=ARCHIVE_MAX_BATCHES):
+    """Archive in batches until nothing is due or `max_batches` ran; returns (moved, backlog remains)"""
+    cutoff = cutoff or datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    moved = 0
+    batches = 0
+    for shard_id in (shard_names() if sharding_enabled() else [None]):
+        while True:
+            if batches == max_batches:
+                return moved, True
+            if batches:
+                time.sleep(ARCHIVE_BATCH_PAUSE)
+            count = archive_batch(cutoff, shard_id)
+            moved += count
+            batches += 1
+            if count < ARCHIVE_BATCH_SIZE:
+                break
+    return moved, False
+
+
+def schedule_archival(delay_seconds=ARCHIVE_INTERVAL):
+    """Queue an archival run unless one is already waiting"""
+    waiting = BackgroundJob.query.filter_by(task='archive_complaints', status='queued').first()
+    if not waiting:
+        enqueue('archive_complaints', delay_seconds=delay_seconds)
+
+
+@task('archive_complaints')
+def archive_complaints():
+    moved, backlog = run_archival()
+    if moved:
+        log_event(logger, 'complaints_archived', f"Archived {moved} closed complaints", count=moved, backlog=backlog)
+    schedule_archival(ARCHIVE_BACKLOG_INTERVAL if backlog else ARCHIVE_INTERVAL)
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        total = 0
+        while True:
+            moved, backlog = run_archival()
+            total += moved
+            if not backlog:
+                break
+        print(f"✓ Archived {total} complaints closed more than {ARCHIVE_AFTER_DAYS:g} days ago")
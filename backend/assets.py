@@ -0,0 +1,123 @@
+"""
+Front-end assets: fingerprinted bundles and on-demand translations.
+
+build_assets.py writes each page's stylesheet and script bundle, the icon
+fonts and one translation file per language to frontend/static/dist/, with a
+content hash in every filename, plus manifest.json mapping logical names to
+those files. They are served from /assets/ with a one-year immutable cache
+lifetime (a changed file gets a new name) and gzip when the client accepts it.
+
+Without a build (a fresh checkout), pages fall back to the CDN stylesheets
+and the unminified sources in frontend/assets/, and translation files are
+rendered from utils.TRANSLATIONS on request, so development needs no build.
+
+The dashboard's service worker (js/sw.js) is served at /sw.js instead: a
+worker only controls pages under its own path, and browsers check it for
+updates on every visit, so it is never cached.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import abort, jsonify, request, send_from_directory, url_for
+
+from utils import TRANSLATIONS
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+SOURCE_DIR = os.path.join(FRONTEND_DIR, 'assets')
+DIST_DIR = os.path.join(FRONTEND_DIR, 'static', 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+TAILWIND_URL = 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css'
+FONT_AWESOME_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'
+VENDOR_STYLESHEETS = [TAILWIND_URL, FONT_AWESOME_URL]
+
+# Source files of each page's bundles, relative to SOURCE_DIR
+PAGES = {
+    'index': {'template': 'index.html', 'css': ['css/index.css'], 'js': ['js/i18n.js', 'js/index.js']},
+    'dashboard': {
+        'template': 'dashboard.html', 'css': ['css/dashboard.css'], 'js': ['js/i18n.js', 'js/dashboard.js'],
+        # Server-rendered complaint cards (see fragments.py)
+        'partials': ['partials/complaints_list.html', 'partials/complaint_cards.html', 'partials/complaint_card.html'],
+    },
+}
+SERVICE_WORKER = 'js/sw.js'
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE = ('.css', '.js', '.json')
+
+_manifest = None
+
+
+def load_manifest():
+    """Logical name -> built filename, or None when the assets have not been built"""
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def stylesheet_urls(page):
+    if _manifest:
+        return [url_for('built_asset', filename=_manifest[f'{page}.css'])]
+    return VENDOR_STYLESHEETS + [url_for('source_asset', filename=name) for name in PAGES[page]['css']]
+
+
+def script_urls(page):
+    if _manifest:
+        return [url_for('built_asset', filename=_manifest[f'{page}.js'])]
+    return [url_for('source_asset', filename=name) for name in PAGES[page]['js']]
+
+
+def i18n_urls():
+    """Language -> URL of its translation table, for the page scripts to fetch"""
+    if _manifest:
+        return {lang: url_for('built_asset', filename=_manifest[f'i18n/{lang}.json']) for lang in TRANSLATIONS}
+    return {lang: url_for('source_asset', filename=f'i18n/{lang}.json') for lang in TRANSLATIONS}
+
+
+# ==================== ROUTES ====================
+
+def built_asset(filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    compressed = filename.endswith(COMPRESSIBLE) and 'gzip' in request.headers.get('Accept-Encoding', '')
+    if compressed and os.path.exists(os.path.join(DIST_DIR, filename + '.gz')):
+        response = send_from_directory(DIST_DIR, filename + '.gz', mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+def source_asset(filename):
+    if filename.startswith('i18n/') and filename.endswith('.json'):
+        lang = filename[len('i18n/'):-len('.json')]
+        if lang not in TRANSLATIONS:
+            abort(404)
+        response = jsonify(TRANSLATIONS[lang])
+    else:
+        response = send_from_directory(SOURCE_DIR, filename)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def service_worker():
+    if _manifest:
+        response = send_from_directory(DIST_DIR, _manifest['sw.js'])
+    else:
+        response = send_from_directory(SOURCE_DIR, SERVICE_WORKER)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def init_assets(app):
+    global _manifest
+    _manifest = load_manifest()
+    app.add_url_rule('/assets/<path:filename>', 'built_asset', built_asset)
+    app.add_url_rule('/assets/src/<path:filename>', 'source_asset', source_asset)
+    app.add_url_rule('/sw.js', 'service_worker', service_worker)
+    app.jinja_env.globals.update(stylesheet_urls=stylesheet_urls, script_urls=script_urls, i18n_urls=i18n_urls)
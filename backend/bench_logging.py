@@ -0,0 +1,100 @@
+"""
+Benchmark of the per-request logging cost.
+
+Measures what a request thread pays to log one login attempt with the old
+``print()`` call and with the structured pipeline in ``logs.py`` (every
+event, sampled at 10%, level disabled). Each variant runs against two sinks:
+
+* a line-buffered file, i.e. a log pipe that keeps up;
+* a stalled sink where every write takes SLOW_WRITE_MS, i.e. a log pipe
+  whose reader (docker, journald, a shipper) has fallen behind.
+
+The time the listener thread needs to drain what is still queued after the
+loop is reported separately, since it is off the request path.
+
+Usage: python bench_logging.py [iterations]
+"""
+
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask, g
+
+import logs
+
+SLOW_WRITE_MS = 0.2
+
+
+class StalledSink:
+    """File wrapper whose writes block for SLOW_WRITE_MS"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, text):
+        time.sleep(SLOW_WRITE_MS / 1000)
+        return self.f.write(text)
+
+    def flush(self):
+        self.f.flush()
+
+
+def per_call_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(sink, iterations, fields):
+    def print_call():
+        print(f"Login attempt: ID={fields['user_id']}, Role={fields['role']}, "
+              f"Pincode={fields['pincode']}, Dept={fields['department']}")
+
+    def log_call():
+        logs.log_event(logger, 'login_attempt', 'Login attempt', **fields)
+
+    with contextlib.redirect_stdout(sink):
+        results = {'print() (before)': (per_call_us(print_call, iterations), None)}
+
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logs.JsonFormatter())
+    logger = logs.get_logger('bench')
+    for label, rate, level in (('structured, every event', 1.0, 'INFO'),
+                               ('structured, sampled 10%', 0.1, 'INFO'),
+                               ('structured, level off', 1.0, 'WARNING')):
+        logs.stop_listener()
+        logs.start_listener([handler])
+        logs.LOG_SAMPLE_RATES['login_attempt'] = rate
+        logging.getLogger(logs.ROOT_LOGGER).setLevel(level)
+        caller = per_call_us(log_call, iterations)
+        drain_started = time.perf_counter()
+        logs.stop_listener()
+        results[label] = (caller, (time.perf_counter() - drain_started) / iterations * 1e6)
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = Flask(__name__)
+    fields = {'user_id': 'MUN001', 'role': 'municipal', 'pincode': '600001', 'department': ''}
+    logs.init_logging()
+
+    with tempfile.TemporaryDirectory() as directory, app.test_request_context('/api/official/login'):
+        g.request_id = 'bench'
+        with open(os.path.join(directory, 'out.log'), 'w', buffering=1) as f:
+            sinks = {'file sink': f, f'stalled sink ({SLOW_WRITE_MS} ms/write)': StalledSink(f)}
+            for sink_label, sink in sinks.items():
+                print(f"{sink_label}, {iterations} iterations, microseconds per request:")
+                print(f"  {'':<28} {'request thread':>15} {'listener drain':>15}")
+                for label, (caller, drain) in run(sink, iterations, fields).items():
+                    drain_text = f"{drain:15.2f}" if drain is not None else f"{'-':>15}"
+                    print(f"  {label:<28} {caller:15.2f} {drain_text}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Login throughput under concurrent load.
+
+Starts gunicorn (gthread workers) on a throwaway SQLite database seeded with
+the sample officers, then runs two configurations back to back:
+
+  inline  PASSWORD_POOL_WORKERS=0, hashes computed in the request thread
+  pool    hashes computed in the bounded process pool (passwords.py)
+
+In each run, --concurrency threads log in as fast as they can (backing off
+for Retry-After when a login is rejected with 503) while one probe thread requests a cheap page and records its latency; the probe shows
+how much a login burst slows down everybody else in the same workers.
+
+Usage:
+  python bench_login.py [--concurrency 32] [--duration 10] [--workers 2] [--threads 8]
+                        [--pool-workers 2] [--port 5099]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from load_test import Client, percentile, start_server
+
+LOGIN = {'user_id': 'MUN001', 'password': 'password123', 'role': 'municipal', 'pincode': '600001'}
+
+
+def run(base_url, concurrency, duration):
+    client = Client(base_url, timeout=30)
+    stop_at = time.monotonic() + duration
+    lock = threading.Lock()
+    logins, probes, statuses = [], [], {}
+
+    def login_loop():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            status, _, _ = client.request('POST', '/api/official/login', LOGIN)
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    logins.append(elapsed)
+            if status == 503:
+                time.sleep(1)  # Retry-After
+
+    def probe_loop():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            client.request('GET', '/')
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(concurrency)]
+    threads.append(threading.Thread(target=probe_loop))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    completed = len(logins)
+    logins, probes = sorted(logins) or [0.0], sorted(probes) or [0.0]
+    return {
+        'logins_per_second': completed / duration,
+        'login_p50': percentile(logins, 50),
+        'login_p99': percentile(logins, 99),
+        'rejected': statuses.get(503, 0),
+        'errors': sum(count for status, count in statuses.items() if status not in (200, 503)),
+        'probe_p50': percentile(probes, 50),
+        'probe_p99': percentile(probes, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput benchmark')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='civic_login_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.db')
+    os.environ['EMBEDDED_WORKER'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['METRICS_DIR'] = os.path.join(directory, 'metrics')
+
+    results = {}
+    for name, pool_workers in (('inline', 0), ('pool', args.pool_workers)):
+        os.environ['PASSWORD_POOL_WORKERS'] = str(pool_workers)
+        # --preload seeds the sample officers once, before the workers fork
+        server = start_server(args.port, args.workers,
+                              ['--worker-class', 'gthread', '--threads', str(args.threads), '--preload'])
+        try:
+            results[name] = run(f'http://127.0.0.1:{args.port}', args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'mode':<8} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6} {'errors':>7} "
+          f"{'probe p50':>10} {'probe p99':>10}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['logins_per_second']:9.1f} {r['login_p50'] * 1000:8.1f} {r['login_p99'] * 1000:8.1f} "
+              f"{r['rejected']:6d} {r['errors']:7d} {r['probe_p50'] * 1000:10.1f} {r['probe_p99'] * 1000:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
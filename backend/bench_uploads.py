@@ -0,0 +1,182 @@
+"""
+Concurrent slow-client uploads across the gunicorn serving profiles.
+
+Each client submits a complaint with a base64 photo (--photo-kb) and sends
+the body at --client-kbps, the way a phone on a weak connection does, then
+starts the next upload. One probe thread meanwhile requests a cheap page.
+For every worker class (sync, gthread, gevent; gunicorn.conf.py settings)
+and every concurrency level the benchmark reports completed uploads per
+second, upload latency and probe latency.
+
+With sync workers an upload occupies a whole worker while its body trickles
+in, so throughput stays at about workers / upload time however many clients
+wait; gthread lifts that to workers * threads; gevent keeps scaling with the
+number of clients until CPU or the database is the limit.
+
+The server runs against a throwaway SQLite database, without the embedded
+job worker. Clients use a small socket send buffer; the server's receive
+buffer still absorbs the first ~100 KB of a body before a worker reads it,
+as it would on a real network.
+
+Usage:
+  python bench_uploads.py [--clients 4,16,64] [--workers 2] [--photo-kb 200]
+                          [--client-kbps 128] [--duration 15] [--profiles sync,gthread,gevent]
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+
+from load_test import Client, percentile, start_server
+
+CHUNK_BYTES = 8192
+SEND_BUFFER_BYTES = 16384
+
+
+def citizen_cookie(base_url):
+    client = Client(base_url)
+    # The first worker answers before the others finish booting (and migrating); give them a moment
+    for _ in range(10):
+        _, data, _ = client.request('POST', '/api/citizen/request-otp', {'phone': '9876543210'})
+        if data and data.get('demo_otp'):
+            _, _, cookie = client.request('POST', '/api/citizen/verify-otp',
+                                          {'phone': '9876543210', 'otp': data['demo_otp']})
+            if cookie:
+                return cookie
+        time.sleep(1)
+    raise SystemExit("Could not log in the sample citizen")
+
+
+def slow_body(payload, bytes_per_second):
+    """Yield `payload` in chunks, pausing after each as a link of `bytes_per_second` would"""
+    for offset in range(0, len(payload), CHUNK_BYTES):
+        yield payload[offset:offset + CHUNK_BYTES]
+        time.sleep(CHUNK_BYTES / bytes_per_second)
+
+
+def upload(port, cookie, payload, bytes_per_second):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        conn.connect()
+        # A large send buffer would soak up the body while the server is not reading yet, which a slow link cannot do
+        conn.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+        conn.request('POST', '/api/complaint/submit', body=slow_body(payload, bytes_per_second), headers={
+            'Content-Type': 'application/json', 'Content-Length': str(len(payload)), 'Cookie': cookie,
+        })
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def run_level(port, cookie, payload, clients, bytes_per_second, duration):
+    stop_at = time.monotonic() + duration
+    lock = threading.Lock()
+    uploads, probes = [], []
+    failures = [0]
+
+    def client_loop():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                ok = upload(port, cookie, payload, bytes_per_second) == 200
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    uploads.append(time.perf_counter() - started)
+                else:
+                    failures[0] += 1
+
+    def probe_loop():
+        probe = Client(f'http://127.0.0.1:{port}', timeout=120)
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            probe.request('GET', '/')
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.05)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe_loop))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Uploads still in flight at the deadline finish late; count them over the real elapsed time
+    elapsed = time.monotonic() - started
+    completed = len(uploads)
+    uploads, probes = sorted(uploads) or [0.0], sorted(probes) or [0.0]
+    return {
+        'uploads_per_second': completed / elapsed,
+        'upload_p50': percentile(uploads, 50),
+        'upload_p99': percentile(uploads, 99),
+        'failures': failures[0],
+        'probe_p50': percentile(probes, 50),
+        'probe_p99': percentile(probes, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Slow-client upload benchmark')
+    parser.add_argument('--clients', default='4,16,64,128', help='comma-separated concurrency levels')
+    parser.add_argument('--profiles', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--photo-kb', type=int, default=200)
+    parser.add_argument('--client-kbps', type=float, default=128, help='upload speed of each client (KB/s)')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per concurrency level')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='civic_upload_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'bench.db')
+    os.environ['EMBEDDED_WORKER'] = '0'  # measure the web tier; photo jobs stay queued
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['METRICS_DIR'] = os.path.join(directory, 'metrics')
+
+    photo = base64.b64encode(random.Random(0).randbytes(args.photo_kb * 1024)).decode()
+    payload = json.dumps({
+        'type': 'Garbage', 'district': 'Chennai', 'pincode': '600001', 'location': 'Upload bench street',
+        'description': 'Garbage not collected for a week', 'coordinates': '13.08, 80.27',
+        'photo': 'data:image/jpeg;base64,' + photo,
+    }).encode()
+    bytes_per_second = args.client_kbps * 1024
+    levels = [int(level) for level in args.clients.split(',')]
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
+    print(f"body {len(payload) / 1024:.0f} KB at {args.client_kbps:g} KB/s per client "
+          f"(~{len(payload) / bytes_per_second:.1f} s per upload), {args.workers} workers")
+    print(f"{'profile':<8} {'clients':>7} {'uploads/s':>10} {'p50 s':>7} {'p99 s':>7} {'failed':>7} "
+          f"{'probe p50 ms':>13} {'probe p99 ms':>13}")
+    results = []
+    for profile in args.profiles.split(','):
+        os.environ['WEB_WORKER_CLASS'] = profile
+        server = start_server(args.port, args.workers, ['-c', config])
+        try:
+            cookie = citizen_cookie(f'http://127.0.0.1:{args.port}')
+            for clients in levels:
+                r = run_level(args.port, cookie, payload, clients, bytes_per_second, args.duration)
+                results.append({'profile': profile, 'clients': clients, **r})
+                print(f"{profile:<8} {clients:7d} {r['uploads_per_second']:10.2f} {r['upload_p50']:7.2f} "
+                      f"{r['upload_p99']:7.2f} {r['failures']:7d} {r['probe_p50'] * 1000:13.1f} "
+                      f"{r['probe_p99'] * 1000:13.1f}", flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
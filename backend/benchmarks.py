@@ -0,0 +1,313 @@
+"""
+Micro-benchmarks for backend hot paths, with stored baselines.
+
+Each benchmark is timed in rounds; a round repeats the call enough times to
+last at least MIN_ROUND_SECONDS, and the per-call time of every round is
+kept. Results report min, median, mean and standard deviation per call.
+
+The benchmarks run against a throwaway SQLite database filled by
+generate_data.py (BENCH_COMPLAINTS complaints), through the Flask test
+client, so they include routing, session handling and serialization.
+
+Usage:
+  python benchmarks.py run [-k FILTER] [--save NAME]
+      Run and print results; --save stores them as .benchmarks/NAME.json
+  python benchmarks.py compare [-k FILTER] [--baseline NAME] [--threshold PCT]
+      Run and compare medians against a stored baseline (default "baseline");
+      exits with status 1 when any benchmark is slower by more than PCT percent
+  python benchmarks.py list
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmarks')
+MIN_ROUND_SECONDS = 0.05
+ROUNDS = 7
+BENCH_COMPLAINTS = 20000
+DEFAULT_THRESHOLD_PERCENT = 15.0
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark: the decorated function takes the fixtures and returns the callable to time"""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+# ==================== FIXTURES ====================
+
+class Fixtures:
+    """Isolated app + database shared by all benchmarks in one run"""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='civic_bench_')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(self.directory, 'bench.db')
+        os.environ['EMBEDDED_WORKER'] = '0'
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        os.environ['METRICS_DIR'] = os.path.join(self.directory, 'metrics')
+
+        import app as app_module
+        import generate_data
+        from models import Complaint, User, db
+
+        self.app_module = app_module
+        self.app = app_module.app
+        self.db = db
+        with self.app.app_context():
+            citizens = generate_data.generate_users(2000, 50, batch_size=5000)
+            rows = list(generate_data.complaint_rows(random.Random(7), BENCH_COMPLAINTS, citizens, 180, 1))
+            generate_data.insert_batches(Complaint, rows, 5000)
+
+            # Officers and a citizen whose dashboards show the busiest pincode
+            busiest_pincode = db.session.query(Complaint.pincode).group_by(Complaint.pincode).order_by(
+                db.func.count().desc()).limit(1).scalar()
+            heaviest_reporter = db.session.query(Complaint.reporter_id).group_by(Complaint.reporter_id).order_by(
+                db.func.count().desc()).limit(1).scalar()
+            officers = {role: User.query.filter_by(role=role).first().id for role in ('municipal', 'dept', 'police')}
+        self.sessions = {
+            'citizen': {'user_id': heaviest_reporter, 'role': 'citizen', 'name': 'Bench Citizen'},
+            'municipal': {'user_id': officers['municipal'], 'role': 'municipal', 'pincode': busiest_pincode},
+            'dept': {'user_id': officers['dept'], 'role': 'dept', 'pincode': busiest_pincode,
+                     'department': 'Municipal Corporation'},
+            'police': {'user_id': officers['police'], 'role': 'police', 'pincode': busiest_pincode},
+        }
+
+    def client(self, role=None):
+        client = self.app.test_client()
+        if role:
+            with client.session_transaction() as session:
+                session.update(self.sessions[role])
+        return client
+
+
+def photo_data_url(size_bytes):
+    return 'data:image/jpeg;base64,' + base64.b64encode(random.Random(0).randbytes(size_bytes)).decode()
+
+
+# ==================== BENCHMARKS ====================
+
+def list_benchmark(role):
+    def setup(fixtures):
+        client = fixtures.client(role)
+
+        def call():
+            response = client.get('/api/complaints')
+            assert response.status_code == 200
+        return call
+    return setup
+
+
+for _role in ('citizen', 'municipal', 'dept', 'police'):
+    benchmark(f'get_complaints[{_role}]')(list_benchmark(_role))
+
+
+def submit_benchmark(photo_bytes):
+    def setup(fixtures):
+        client = fixtures.client('citizen')
+        body = {
+            'type': 'Garbage', 'district': 'Chennai', 'pincode': '600001', 'location': 'Bench street',
+            'description': 'Garbage not collected for a week', 'coordinates': '13.08, 80.27',
+        }
+        if photo_bytes:
+            body['photo'] = photo_data_url(photo_bytes)
+
+        def call():
+            response = client.post('/api/complaint/submit', json=body)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return call
+    return setup
+
+
+benchmark('submit_complaint[no photo]')(submit_benchmark(0))
+benchmark('submit_complaint[300 KB photo]')(submit_benchmark(300 * 1024))
+
+
+@benchmark('base64_decode[5 MB data URL]')
+def bench_base64_decode(fixtures):
+    data_url = photo_data_url(5 * 1024 * 1024)
+
+    def call():
+        # Same steps as submit_complaint + the save_photo task
+        base64.b64decode(data_url.split(',')[1])
+    return call
+
+
+@benchmark('check_password_hash')
+def bench_check_password_hash(fixtures):
+    from werkzeug.security import check_password_hash, generate_password_hash
+    password_hash = generate_password_hash('password123')
+    return lambda: check_password_hash(password_hash, 'password123')
+
+
+@benchmark('official_login')
+def bench_official_login(fixtures):
+    client = fixtures.client()
+    body = {'user_id': 'MUN001', 'password': 'password123', 'role': 'municipal', 'pincode': '600001'}
+
+    def call():
+        response = client.post('/api/official/login', json=body)
+        assert response.status_code == 200
+    return call
+
+
+@benchmark('generate_complaint_id')
+def bench_generate_complaint_id(fixtures):
+    return fixtures.app_module.generate_complaint_id
+
+
+@benchmark('render[dashboard.html]')
+def bench_render_dashboard(fixtures):
+    from flask import render_template
+    app_module = fixtures.app_module
+
+    def call():
+        with fixtures.app.test_request_context('/dashboard'):
+            render_template('dashboard.html', role='municipal', phone=None, districts=app_module.get_districts(),
+                            user_id=1, cards=None)
+    return call
+
+
+# ==================== RUNNER ====================
+
+def time_benchmark(fn, rounds=ROUNDS):
+    """Per-call seconds for each round"""
+    fn()  # warm-up
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        iterations = max(iterations * 2, int(iterations * MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+
+    timings = [elapsed / iterations]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.perf_counter() - started) / iterations)
+    return timings, iterations
+
+
+def run_benchmarks(name_filter=None):
+    selected = [name for name in BENCHMARKS if not name_filter or name_filter in name]
+    if not selected:
+        raise SystemExit(f"No benchmark matches {name_filter!r}")
+    fixtures = Fixtures()
+    results = {}
+    with fixtures.app.app_context():
+        for name in selected:
+            timings, iterations = time_benchmark(BENCHMARKS[name](fixtures))
+            results[name] = {
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'mean': statistics.mean(timings),
+                'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+                'rounds': len(timings),
+                'iterations': iterations,
+            }
+            print(f"  {name:<34} {results[name]['median'] * 1000:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def print_results(results):
+    print(f"{'benchmark':<34} {'min ms':>10} {'median ms':>10} {'mean ms':>10} {'stddev ms':>10} {'ops/s':>10}")
+    for name, r in results.items():
+        print(f"{name:<34} {r['min'] * 1000:10.3f} {r['median'] * 1000:10.3f} {r['mean'] * 1000:10.3f} "
+              f"{r['stddev'] * 1000:10.3f} {1 / r['median']:10.1f}")
+
+
+def baseline_path(name):
+    return os.path.join(BENCHMARK_DIR, f'{name}.json')
+
+
+def save_baseline(name, results):
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump({'machine': machine_info(), 'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'results': results}, f, indent=2)
+    print(f"✓ Saved baseline {baseline_path(name)}")
+
+
+def compare(results, name, threshold_percent):
+    """Print the comparison; returns the names that regressed beyond the threshold"""
+    try:
+        with open(baseline_path(name)) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        raise SystemExit(f"No baseline {baseline_path(name)}; create one with: python benchmarks.py run --save {name}")
+    if baseline['machine'] != machine_info():
+        print(f"⚠ Baseline was recorded on a different machine: {baseline['machine']}")
+
+    regressions = []
+    print(f"{'benchmark':<34} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for bench_name, current in results.items():
+        previous = baseline['results'].get(bench_name)
+        if not previous:
+            print(f"{bench_name:<34} {'-':>12} {current['median'] * 1000:12.3f} {'new':>9}")
+            continue
+        change = (current['median'] - previous['median']) / previous['median'] * 100
+        regressed = change > threshold_percent
+        if regressed:
+            regressions.append(bench_name)
+        print(f"{bench_name:<34} {previous['median'] * 1000:12.3f} {current['median'] * 1000:12.3f} "
+              f"{change:+8.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backend micro-benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('-k', dest='name_filter', help='only benchmarks whose name contains this')
+    run_parser.add_argument('--save', metavar='NAME', help='store the results as a baseline')
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('-k', dest='name_filter', help='only benchmarks whose name contains this')
+    compare_parser.add_argument('--baseline', default='baseline')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                                help='allowed median slowdown in percent')
+    subparsers.add_parser('list')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print('\n'.join(BENCHMARKS))
+        return 0
+    results = run_benchmarks(args.name_filter)
+    if args.command == 'run':
+        print_results(results)
+        if args.save:
+            save_baseline(args.save, results)
+        return 0
+    regressions = compare(results, args.baseline, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) regressed by more than {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    print(f"✓ No regressions beyond {args.threshold}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
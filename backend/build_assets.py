@@ -0,0 +1,451 @@
+"""
+Build the front-end assets served from /assets/ (see assets.py).
+
+  python build_assets.py [--clean] [--vendor-dir DIR]
+
+For each page in assets.PAGES this writes to frontend/static/dist/:
+
+  <page>.<hash>.css       Tailwind and Font Awesome, keeping only the rules
+                          whose classes the page's templates or scripts
+                          mention, followed by the page's own CSS; minified
+  <page>.<hash>.js        the page's scripts, concatenated and minified
+  i18n/<lang>.<hash>.json one translation table per language (utils.TRANSLATIONS)
+  sw.<hash>.js            the offline service worker, minified (served at /sw.js)
+  fa-*.<hash>.woff2       the icon fonts the stylesheets refer to (woff2 only)
+  manifest.json           logical name -> built file, read by assets.py
+
+and a gzipped copy (.gz) of every text file. Third-party files are read
+from pinned copies committed in frontend/assets/vendor/ (host/path of each
+URL; --vendor-dir points elsewhere), so builds need no network. Every copy is
+checked against its SHA-256 in vendor/SHA256SUMS. A file with no copy yet is
+downloaded and must match its pinned checksum too; one with no checksum is
+used with a warning. --update-vendor records the checksums of new or
+deliberately changed files, to be committed with them. Files from earlier
+builds are kept so pages still open in a browser keep working during a
+deploy; --clean removes them first.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import urllib.request
+from urllib.parse import urljoin, urlparse
+
+from assets import COMPRESSIBLE, DIST_DIR, MANIFEST_PATH, PAGES, SERVICE_WORKER, SOURCE_DIR, VENDOR_STYLESHEETS
+from fragments import DEFAULT_STATUS_COLOR, STATUS_COLORS
+from utils import TRANSLATIONS
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(SOURCE_DIR), 'templates')
+VENDOR_DIR = os.path.join(SOURCE_DIR, 'vendor')
+
+VENDOR_CHECKSUMS = 'SHA256SUMS'
+
+# Classes only ever built at runtime from data, which the scan cannot see: the status badge and
+# tab colours (getStatusColor() and setActiveTab() in dashboard.js, STATUS_COLORS for server cards)
+SAFELIST = {name for colors in [*STATUS_COLORS.values(), DEFAULT_STATUS_COLOR, 'text-gray-600'] for name in colors.split()}
+
+HASH_LENGTH = 10
+
+
+# ==================== VENDOR FILES ====================
+
+class Vendor:
+    """Pinned third-party files under `directory`, each verified against its line in SHA256SUMS"""
+
+    def __init__(self, directory, update=False):
+        self.directory = directory
+        self.update = update
+        self.checksums = {}
+        self.unpinned = set()
+        path = os.path.join(directory, VENDOR_CHECKSUMS)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        checksum, name = line.split(None, 1)
+                        self.checksums[name.strip()] = checksum
+
+    def fetch(self, url):
+        """Contents of `url`, from its pinned copy, downloading it if there is none yet"""
+        parsed = urlparse(url)
+        name = f'{parsed.netloc}/{parsed.path.lstrip("/")}'
+        path = os.path.join(self.directory, *name.split('/'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            print(f"  downloading {url}")
+            with urllib.request.urlopen(url, timeout=60) as response:
+                data = response.read()
+        checksum = hashlib.sha256(data).hexdigest()
+        if self.update:
+            self.checksums[name] = checksum
+        elif name not in self.checksums:
+            if name not in self.unpinned:
+                print(f"  warning: {name} is not pinned; check it, run with --update-vendor and commit it")
+                self.unpinned.add(name)
+        elif checksum != self.checksums[name]:
+            raise SystemExit(f"{name} does not match its pinned checksum in {VENDOR_CHECKSUMS}")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return data
+
+    def save_checksums(self):
+        with open(os.path.join(self.directory, VENDOR_CHECKSUMS), 'w') as f:
+            f.writelines(f"{checksum}  {name}\n" for name, checksum in sorted(self.checksums.items()))
+
+
+# ==================== CSS ====================
+
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+NOT_PATTERN = re.compile(r':not\([^()]*\)')
+CLASS_PATTERN = re.compile(r'\.((?:[A-Za-z0-9_-]|\\[0-9a-fA-F]{1,6} ?|\\[^0-9a-fA-F])+)')
+ESCAPE_PATTERN = re.compile(r'\\([0-9a-fA-F]{1,6}) ?|\\(.)', re.S)
+URL_PATTERN = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+# Characters that can never be part of a class name as written in markup or a script string
+TOKEN_SEPARATORS = re.compile(r'[\s"\'`<>=;{}()\[\],$+]+')
+
+
+def skip_string(text, i):
+    """Index just past the string literal starting at text[i]"""
+    quote = text[i]
+    i += 1
+    while i < len(text) and text[i] != quote:
+        i += 2 if text[i] == '\\' else 1
+    return i + 1
+
+
+def split_top_level(text, separator):
+    """Split on `separator` outside strings and brackets"""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(text):
+        c = text[i]
+        if c in '"\'':
+            i = skip_string(text, i)
+            continue
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_css(css):
+    """[(prelude, block)] for each statement; block is None for `@charset ...;`-style ones"""
+    statements, depth, start, block_start, i = [], 0, 0, 0, 0
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i = skip_string(css, i)
+            continue
+        if c == '{':
+            if depth == 0:
+                block_start = i
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                statements.append((css[start:block_start].strip(), css[block_start + 1:i]))
+                start = i + 1
+        elif c == ';' and depth == 0:
+            if css[start:i].strip():
+                statements.append((css[start:i].strip(), None))
+            start = i + 1
+        i += 1
+    return statements
+
+
+def unescape(name):
+    return ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(1), 16)) if m.group(1) else m.group(2), name)
+
+
+def selector_classes(selector):
+    # What is inside :not(...) never has to be present for the selector to match
+    return {unescape(name) for name in CLASS_PATTERN.findall(NOT_PATTERN.sub('', selector))}
+
+
+def minify_selector(selector):
+    selector = re.sub(r'\s+', ' ', selector).strip()
+    return re.sub(r' ?([>+~]) ?', r'\1', selector)
+
+
+def minify_declarations(block):
+    declarations = []
+    for declaration in split_top_level(block, ';'):
+        prop, _, value = declaration.partition(':')
+        if prop.strip():
+            declarations.append(prop.strip() + ':' + re.sub(r'\s+', ' ', value).strip())
+    return ';'.join(declarations)
+
+
+def render_css(statements, used, rewrite_url):
+    """Serialize `statements`, dropping rules none of whose selectors can match (`used` None: keep all)"""
+    out = []
+    for prelude, block in statements:
+        prelude = re.sub(r'\s+', ' ', prelude)
+        if block is None:
+            out.append(prelude + ';')
+        elif prelude.startswith('@'):
+            name = prelude.split(' ', 1)[0].lower()
+            if '{' not in block:
+                # @font-face, @page: declarations
+                out.append(prelude + '{' + minify_declarations(URL_PATTERN.sub(rewrite_url, block)) + '}')
+            else:
+                # @media and @supports hold ordinary rules; @keyframes steps are kept whole
+                inner = render_css(parse_css(block), used if name in ('@media', '@supports') else None, rewrite_url)
+                if inner:
+                    out.append(prelude + '{' + inner + '}')
+        else:
+            selectors = split_top_level(prelude, ',')
+            if used is not None:
+                selectors = [s for s in selectors if selector_classes(s) <= used]
+            if selectors:
+                block = URL_PATTERN.sub(rewrite_url, block)
+                out.append(','.join(minify_selector(s) for s in selectors) + '{' + minify_declarations(block) + '}')
+    return ''.join(out)
+
+
+def drop_non_woff2_sources(css):
+    """Keep only the woff2 entries of @font-face src lists (every supported browser reads woff2)"""
+    def src(match):
+        sources = [s for s in split_top_level(match.group(1), ',') if 'woff2' in s]
+        return 'src:' + ','.join(sources) if sources else match.group(0)
+    return re.sub(r'src\s*:([^;}]*)', src, css)
+
+
+def build_css(sources, used, vendor, emit):
+    """One stylesheet from [(url or None, css, purge)]; url() references become built files"""
+    parts = []
+    for base_url, css, purge in sources:
+        def rewrite_url(match):
+            ref = match.group(2).strip()
+            if ref.startswith(('data:', '#')) or base_url is None:
+                return match.group(0)
+            absolute = urljoin(base_url, ref)
+            data = vendor.fetch(absolute.split('#')[0].split('?')[0])
+            return f'url({emit(os.path.basename(urlparse(absolute).path), data)})'
+
+        css = COMMENT_PATTERN.sub('', css)
+        if base_url is not None:
+            css = drop_non_woff2_sources(css)
+        parts.append(render_css(parse_css(css), used if purge else None, rewrite_url))
+    return '\n'.join(parts) + '\n'
+
+
+def used_tokens(paths):
+    """Every word of the page's template and scripts that could be a class name"""
+    tokens = set(SAFELIST)
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tokens.update(TOKEN_SEPARATORS.split(f.read()))
+    return tokens
+
+
+# ==================== JAVASCRIPT ====================
+
+# A `/` after one of these starts a regular expression, otherwise it divides
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'instanceof'}
+
+
+def minify_js(source):
+    """
+    Drop comments, indentation, trailing spaces and blank lines.
+
+    Line breaks are kept, so automatic semicolon insertion sees the same code.
+    String, template and regular expression literals are copied unchanged.
+    """
+    out = []
+    copy_code(source, 0, out, nested=False)
+    return ''.join(out).strip() + '\n'
+
+
+def copy_code(source, i, out, nested):
+    """Copy code from source[i]; inside ${...} (nested) stop after its closing brace"""
+    depth = 0
+    while i < len(source):
+        c = source[i]
+        if c == '`':
+            i = copy_template(source, i, out)
+            continue
+        if c in '"\'':
+            end = skip_string(source, i)
+            out.append(source[i:end])
+            i = end
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = len(source) if end < 0 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end < 0 else end + 2
+            continue
+        if c == '/' and starts_regex(out):
+            end = skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+            continue
+        if c == '\n':
+            while out and out[-1] in (' ', '\t'):
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n')
+            i += 1
+            while i < len(source) and source[i] in ' \t':
+                i += 1
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            if nested and depth == 0:
+                out.append(c)
+                return i + 1
+            depth -= 1
+        out.append(c)
+        i += 1
+    if nested:
+        raise ValueError('unterminated template substitution')
+    return i
+
+
+def copy_template(source, i, out):
+    """Copy the template literal starting at source[i], minifying the code of its substitutions"""
+    start = i
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            out.append(source[start:i + 1])
+            return i + 1
+        elif source.startswith('${', i):
+            out.append(source[start:i + 2])
+            i = start = copy_code(source, i + 2, out, nested=True)
+        else:
+            i += 1
+    raise ValueError('unterminated template literal')
+
+
+def starts_regex(out):
+    before = ''.join(out[-40:]).rstrip()
+    if not before or before[-1] in REGEX_PRECEDERS:
+        return True
+    word = re.search(r'[A-Za-z_$][\w$]*$', before)
+    return bool(word) and word.group(0) in REGEX_KEYWORDS
+
+
+def skip_regex(source, i):
+    """Index just past the regular expression literal (and its flags) starting at source[i]"""
+    i += 1
+    in_class = False
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            break
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    raise ValueError('unterminated regular expression literal')
+
+
+# ==================== BUILD ====================
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def read_source(name):
+    with open(os.path.join(SOURCE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the front-end assets')
+    parser.add_argument('--clean', action='store_true', help='remove files from earlier builds first')
+    parser.add_argument('--vendor-dir', default=VENDOR_DIR,
+                        help='where the pinned copies of Tailwind and Font Awesome are (host/path of each URL)')
+    parser.add_argument('--update-vendor', action='store_true',
+                        help='record the checksums of the vendor files instead of verifying them')
+    args = parser.parse_args()
+    vendor = Vendor(args.vendor_dir, update=args.update_vendor)
+
+    if args.clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(os.path.join(DIST_DIR, 'i18n'), exist_ok=True)
+
+    manifest, report = {}, []
+
+    def emit(name, data):
+        """Write `data` under its fingerprinted name (plus .gz for text) and return that name"""
+        built = fingerprint(name, data)
+        path = os.path.join(DIST_DIR, built)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if built.endswith(COMPRESSIBLE):
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, 9, mtime=0))
+        return built
+
+    def bundle(name, inputs, data):
+        manifest[name] = emit(name, data)
+        report.append((name, sum(len(i.encode()) for i in inputs), len(data), len(gzip.compress(data, 9, mtime=0))))
+
+    for page, spec in PAGES.items():
+        templates = [spec['template']] + spec.get('partials', [])
+        scanned = [os.path.join(TEMPLATE_DIR, n) for n in templates] + [os.path.join(SOURCE_DIR, n) for n in spec['js']]
+        used = used_tokens(scanned)
+        stylesheets = [(url, vendor.fetch(url).decode('utf-8'), True) for url in VENDOR_STYLESHEETS]
+        stylesheets += [(None, read_source(name), False) for name in spec['css']]
+        css = build_css(stylesheets, used, vendor, emit)
+        bundle(f'{page}.css', [source for _, source, _ in stylesheets], css.encode())
+
+        scripts = [read_source(name) for name in spec['js']]
+        bundle(f'{page}.js', scripts, ''.join(minify_js(source) for source in scripts).encode())
+
+    if args.update_vendor:
+        vendor.save_checksums()
+
+    worker = read_source(SERVICE_WORKER)
+    bundle('sw.js', [worker], minify_js(worker).encode())
+
+    for lang, table in TRANSLATIONS.items():
+        data = json.dumps(table, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        bundle(f'i18n/{lang}.json', [data], data.encode())
+
+    # Replace the manifest in one step so a starting app never reads half of it
+    with open(MANIFEST_PATH + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(MANIFEST_PATH + '.tmp', MANIFEST_PATH)
+
+    print(f"{'bundle':<18} {'sources':>10} {'built':>10} {'gzip':>9}  file")
+    for name, source_bytes, built_bytes, gzip_bytes in report:
+        print(f"{name:<18} {source_bytes:10,d} {built_bytes:10,d} {gzip_bytes:9,d}  {manifest[name]}")
+    print(f"wrote {DIST_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+SLA escalation of stale complaints.
+
+A complaint that stays in an open status longer than the SLA for its
+``complaint_type`` (``utils.COMPLAINT_SLA_HOURS``) gets its priority raised
+one level and its supervisors notified: the department officers once it is
+forwarded, the municipal officers of its pincode before that.
+
+Runs never scan the whole table. Each run reads only the open complaints
+whose SLA deadline fell between the previous run and now: one range scan on
+the ``(status, updated_at)`` index per distinct SLA period. The end of the
+last checked window is kept in a ``setting`` row (``sla_checked_until``), so
+separate processes, ``--once`` runs and restarts all continue where the last
+run stopped; only the very first run looks at every stale complaint. Each
+breach is escalated with an UPDATE guarded on the ``updated_at`` it was read
+with, so overlapping runs, or runs on two hosts, escalate it exactly once.
+Escalation moves ``updated_at``, so a complaint that stays stale is picked up
+again and escalated one more level after another SLA period.
+
+The ``escalate_complaints`` background job runs a check every
+SLA_CHECK_INTERVAL seconds; app start-up queues the first one.
+
+Usage:
+  python escalation.py         - Check every SLA_CHECK_INTERVAL seconds
+  python escalation.py --once  - Run a single pass and exit
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from events import record_events
+from logs import get_logger, log_event
+from models import db, BackgroundJob, Complaint, Setting
+from notifications import queue_fan_out
+from tasks import enqueue, task
+from utils import COMPLAINT_SLA_HOURS, DEFAULT_SLA_HOURS, ComplaintPriority
+
+logger = get_logger('escalation')
+
+CHECK_INTERVAL_SECONDS = int(os.environ.get('SLA_CHECK_INTERVAL', 60))
+OPEN_STATUSES = ('submitted', 'assigned')
+PRIORITY_ORDER = [p.value for p in ComplaintPriority]
+# Re-read this much history each run so rows committed late are not missed
+WATERMARK_OVERLAP = timedelta(minutes=5)
+WATERMARK_KEY = 'sla_checked_until'
+
+
+def raise_priority(priority):
+    if priority not in PRIORITY_ORDER:
+        return ComplaintPriority.HIGH.value
+    return PRIORITY_ORDER[min(PRIORITY_ORDER.index(priority) + 1, len(PRIORITY_ORDER) - 1)]
+
+
+class SlaScheduler:
+    """Finds and escalates open complaints whose SLA deadline passed since the last run"""
+
+    def __init__(self, sla_hours=None, default_hours=DEFAULT_SLA_HOURS):
+        self.sla_hours = sla_hours or COMPLAINT_SLA_HOURS
+        self.default_hours = default_hours
+
+    def periods(self):
+        """(SLA hours, filter on complaint_type) per distinct SLA period"""
+        types = {}
+        for complaint_type, hours in self.sla_hours.items():
+            types.setdefault(hours, []).append(complaint_type)
+        periods = [(hours, Complaint.complaint_type.in_(names)) for hours, names in types.items()]
+        others = Complaint.complaint_type.is_(None) | Complaint.complaint_type.notin_(list(self.sla_hours))
+        if self.default_hours in types:
+            periods = [(hours, clause | others if hours == self.default_hours else clause)
+                       for hours, clause in periods]
+        else:
+            periods.append((self.default_hours, others))
+        return periods
+
+    def due(self, checked_until, now):
+        """Rows of open complaints whose deadline is after `checked_until` (less the overlap) and not after `now`"""
+        rows = []
+        for hours, same_period in self.periods():
+            sla = timedelta(hours=hours)
+            query = db.session.query(
+                Complaint.id, Complaint.status, Complaint.priority, Complaint.forwarded_department,
+                Complaint.updated_at
+            ).filter(Complaint.status.in_(OPEN_STATUSES), Complaint.updated_at <= now - sla, same_period)
+            if checked_until:
+                query = query.filter(Complaint.updated_at > checked_until - sla - WATERMARK_OVERLAP)
+            rows += query.all()
+        return rows
+
+    def run_once(self, now=None):
+        """Escalate every complaint whose SLA has lapsed; returns the number escalated"""
+        now = now or datetime.now()
+        watermark = Setting.query.filter_by(key=WATERMARK_KEY).first()
+        checked_until = datetime.fromisoformat(watermark.value) if watermark else None
+
+        events = []
+        for row in self.due(checked_until, now):
+            priority = raise_priority(row.priority)
+            escalated = Complaint.query.filter(
+                Complaint.id == row.id,
+                Complaint.status.in_(OPEN_STATUSES),
+                Complaint.updated_at == row.updated_at
+            ).update({'priority': priority, 'updated_at': now}, synchronize_session=False)
+            if escalated:
+                events.append({
+                    'complaint_id': row.id,
+                    'action': 'escalate',
+                    'from_status': row.status,
+                    'to_status': row.status,
+                    'department': row.forwarded_department,
+                    'actor_id': None,
+                    'at': now,
+                    'priority': priority,
+                    'previous_priority': row.priority,
+                })
+
+        if events:
+            record_events(events)
+            queue_fan_out(events)
+        # Committed with the escalations, so a failed run is repeated in full by the next one
+        if watermark is None:
+            watermark = Setting(key=WATERMARK_KEY)
+            db.session.add(watermark)
+        if checked_until is None or now > checked_until:
+            watermark.value = now.isoformat()
+        db.session.commit()
+        return len(events)
+
+
+def schedule_escalation(delay_seconds=CHECK_INTERVAL_SECONDS):
+    """Queue an SLA check unless one is already waiting"""
+    waiting = BackgroundJob.query.filter_by(task='escalate_complaints', status='queued').first()
+    if not waiting:
+        enqueue('escalate_complaints', delay_seconds=delay_seconds)
+
+
+@task('escalate_complaints')
+def escalate_complaints():
+    escalated = SlaScheduler().run_once()
+    if escalated:
+        log_event(logger, 'sla_escalated', f"Escalated {escalated} complaints past their SLA", count=escalated)
+    schedule_escalation()
+    db.session.commit()
+
+
+def run_scheduler(app, once=False):
+    scheduler = SlaScheduler()
+    with app.app_context():
+        while True:
+            try:
+                escalated = scheduler.run_once()
+                if escalated:
+                    log_event(logger, 'sla_escalated', f"Escalated {escalated} complaints past their SLA", count=escalated)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('SLA scheduler error')
+            finally:
+                db.session.remove()
+            if once:
+                return
+            time.sleep(CHECK_INTERVAL_SECONDS)
+
+
+if __name__ == '__main__':
+    from app import app
+    run_scheduler(app, once='--once' in sys.argv)
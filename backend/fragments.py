@@ -0,0 +1,172 @@
+"""
+Server-rendered complaint cards for the dashboard.
+
+With DASHBOARD_CARDS=server (or ``/dashboard?cards=server``) the dashboard
+page arrives with its first page of complaint cards already in the HTML, so
+a phone shows the list before any JavaScript runs. dashboard.js then fetches
+further pages, other tabs and other languages as HTML fragments from
+``GET /dashboard/cards`` instead of building every card from /api/complaints
+in the browser. The cards come from the Jinja partials in
+frontend/templates/partials/, compiled once at startup. Maps are a
+placeholder that loads the Google Maps iframe when tapped, and photos load
+lazily into fixed-size boxes.
+
+Every rendered card is kept in a FragmentCache under (complaint id,
+language, role) and stays valid while the complaint's updated_at is
+unchanged. A page is one (id, updated_at) query; full rows are loaded and
+rendered only for the cards that are missing or changed.
+
+Pages are newest first, FRAGMENT_PAGE_SIZE cards each, and continue below
+the id of the last card (``before``), so appending pages never repeats or
+skips a card when complaints arrive in between.
+
+Usage:
+    GET /dashboard/cards?tab=submitted&lang=ta
+    GET /dashboard/cards?tab=submitted&lang=ta&before=<id of the last card>
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+from sqlalchemy import func
+
+from metrics import registry
+from utils import TRANSLATIONS, parse_coordinates
+
+DASHBOARD_CARDS = os.environ.get('DASHBOARD_CARDS', 'client')  # client or server
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 5000))
+FRAGMENT_PAGE_SIZE = int(os.environ.get('FRAGMENT_PAGE_SIZE', 20))
+
+CARD_TEMPLATE = 'partials/complaint_card.html'
+PAGE_TEMPLATE = 'partials/complaint_cards.html'
+
+STATUSES = ('submitted', 'assigned', 'in_progress', 'resolved')
+DEFAULT_TAB = {'municipal': 'submitted', 'dept': 'assigned'}  # roles whose list is split into status tabs
+
+STATUS_COLORS = {
+    'submitted': 'bg-yellow-100 text-yellow-800',
+    'verified': 'bg-blue-100 text-blue-800',
+    'assigned': 'bg-blue-100 text-blue-800',
+    'in_progress': 'bg-purple-100 text-purple-800',
+    'resolved': 'bg-green-100 text-green-800',
+}
+DEFAULT_STATUS_COLOR = 'bg-gray-100 text-gray-800'
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered cards, each valid for one updated_at of its complaint"""
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # (complaint id, language, role) -> (updated_at, html)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def put(self, key, version, html):
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache()
+_templates = {}
+
+
+def server_cards(requested=None):
+    """Whether the dashboard renders its cards on the server (`requested` is the ?cards= override)"""
+    return (requested or DASHBOARD_CARDS) == 'server'
+
+
+def card_language(lang):
+    return lang if lang in TRANSLATIONS else 'en'
+
+
+def card_tab(role, tab):
+    """Status shown by `role`'s list: `tab` if valid, the role's first tab, or None for untabbed roles"""
+    if role not in DEFAULT_TAB:
+        return None
+    return tab if tab in STATUSES else DEFAULT_TAB[role]
+
+
+def status_label(t, status):
+    return t.get('status' + ''.join(part.capitalize() for part in status.split('_'))) or status.replace('_', ' ')
+
+
+def render_card(summary, lang, role):
+    """HTML of one complaint card; `summary` is the complaint as built for /api/complaints"""
+    t = TRANSLATIONS[lang]
+    coordinates = parse_coordinates(summary['coordinates'])
+    return _templates['card'].render(
+        c=summary,
+        t=t,
+        role=role,
+        coordinates=coordinates,
+        status_label=status_label(t, summary['status']),
+        status_color=STATUS_COLORS.get(summary['status'], DEFAULT_STATUS_COLOR),
+    )
+
+
+def status_counts(query, model):
+    """Complaints of `query` per status (rows of each shard are summed)"""
+    counts = dict.fromkeys(STATUSES, 0)
+    for status, count in query.with_entities(model.status, func.count(model.id)).group_by(model.status):
+        counts[status] = counts.get(status, 0) + count
+    return counts
+
+
+def render_page(query, model, summarize, role, tab=None, lang='en', before=None, size=FRAGMENT_PAGE_SIZE):
+    """
+    (HTML, id to continue before or None) for the next page of `query`'s cards.
+    `summarize` turns a loaded complaint into the card's fields.
+    """
+    if tab:
+        query = query.filter(model.status == tab)
+    page = query.with_entities(model.id, model.updated_at)
+    if before:
+        page = page.filter(model.id < before)
+    rows = page.order_by(model.id.desc()).limit(size + 1).all()
+    more = len(rows) > size
+    rows = rows[:size]
+
+    cards = {}
+    for row in rows:
+        cards[row.id] = fragment_cache.get((row.id, lang, role), row.updated_at)
+    missing = [complaint_id for complaint_id, html in cards.items() if html is None]
+    registry.inc('civic_fragment_cache_total', {'result': 'hit'}, len(cards) - len(missing))
+    if missing:
+        registry.inc('civic_fragment_cache_total', {'result': 'miss'}, len(missing))
+        for complaint in query.filter(model.id.in_(missing)):
+            html = render_card(summarize(complaint), lang, role)
+            # Cached under the version it was rendered from, which may be newer than the page's
+            fragment_cache.put((complaint.id, lang, role), complaint.updated_at, html)
+            cards[complaint.id] = html
+
+    next_before = rows[-1].id if more else None
+    html = Markup(_templates['page'].render(
+        cards=[cards[row.id] for row in rows if cards[row.id] is not None],
+        t=TRANSLATIONS[lang],
+        first_page=before is None,
+        next_before=next_before,
+    ))
+    return html, next_before
+
+
+def init_fragments(app):
+    """Compile the card partials once, before the first request"""
+    _templates['card'] = app.jinja_env.get_template(CARD_TEMPLATE)
+    _templates['page'] = app.jinja_env.get_template(PAGE_TEMPLATE)
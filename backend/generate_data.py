@@ -0,0 +1,246 @@
+"""
+Synthetic data generator for performance work.
+
+Bulk-creates citizens, officers and complaints with realistic distributions:
+
+* districts weighted by approximate population, each with its own block of
+  pincodes (weighted Zipf-style, so a few urban pincodes are busy) and
+  coordinates scattered around the district centre;
+* complaint types, priorities and statuses weighted as seen in production,
+  with older complaints more likely to be forwarded or resolved;
+* complaints per citizen skewed, so a few heavy reporters file many;
+* a small share of complaints marked fake.
+
+Rows are inserted with Core bulk inserts in batches, so millions of
+complaints take minutes rather than hours. Point DATABASE_URL at a scratch
+database; the default is the application database. Afterwards run
+``python risk.py rebuild`` and ``python routing.py train`` to derive the risk
+aggregates and the routing model from the generated history.
+
+Officers share the password ``password123``. Municipal officers are MUN<n>,
+department officers DEPT<n> and police POLICE<n>; citizens get phone numbers
+from 7000000000 up. Numbering continues after the existing users, so the
+generator can be run repeatedly to grow a database.
+
+Usage: python generate_data.py [--complaints N] [--citizens N] [--officers N]
+                               [--days N] [--seed N] [--batch-size N]
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import app
+from models import db, Complaint, User
+from passwords import hash_password
+from utils import DEPARTMENT_ROUTING_RULES, format_complaint_id
+
+# (district, first three pincode digits, centre latitude, centre longitude, population in lakhs)
+DISTRICT_PROFILES = [
+    ('Ariyalur', '621', 11.14, 79.08, 7.5), ('Chengalpattu', '603', 12.69, 79.98, 25.6),
+    ('Chennai', '600', 13.08, 80.27, 71.0), ('Coimbatore', '641', 11.02, 76.96, 34.6),
+    ('Cuddalore', '607', 11.75, 79.75, 26.1), ('Dharmapuri', '636', 12.13, 78.16, 15.1),
+    ('Dindigul', '624', 10.36, 77.98, 21.6), ('Erode', '638', 11.34, 77.72, 22.5),
+    ('Kallakurichi', '606', 11.74, 78.96, 13.7), ('Kancheepuram', '631', 12.83, 79.70, 11.7),
+    ('Kanyakumari', '629', 8.08, 77.54, 18.7), ('Karur', '639', 10.96, 78.08, 10.6),
+    ('Krishnagiri', '635', 12.52, 78.21, 18.8), ('Madurai', '625', 9.93, 78.12, 30.4),
+    ('Mayiladuthurai', '609', 11.10, 79.65, 9.2), ('Nagapattinam', '611', 10.77, 79.84, 7.0),
+    ('Namakkal', '637', 11.22, 78.17, 17.3), ('Nilgiris', '643', 11.41, 76.70, 7.4),
+    ('Perambalur', '621', 11.23, 78.88, 5.7), ('Pudukkottai', '622', 10.38, 78.82, 16.2),
+    ('Ramanathapuram', '623', 9.37, 78.83, 13.5), ('Ranipet', '632', 12.93, 79.33, 12.1),
+    ('Salem', '636', 11.66, 78.15, 34.8), ('Sivaganga', '630', 9.85, 78.48, 13.4),
+    ('Tenkasi', '627', 8.96, 77.30, 14.1), ('Thanjavur', '613', 10.79, 79.14, 24.0),
+    ('Theni', '625', 10.01, 77.48, 12.5), ('Thoothukudi', '628', 8.76, 78.13, 17.5),
+    ('Tiruchirappalli', '620', 10.80, 78.69, 27.2), ('Tirunelveli', '627', 8.71, 77.76, 16.7),
+    ('Tirupathur', '635', 12.50, 78.57, 11.1), ('Tiruppur', '641', 11.11, 77.34, 24.8),
+    ('Tiruvallur', '602', 13.14, 79.91, 37.3), ('Tiruvannamalai', '606', 12.23, 79.07, 24.6),
+    ('Tiruvarur', '610', 10.77, 79.64, 12.6), ('Vellore', '632', 12.92, 79.13, 16.1),
+    ('Viluppuram', '605', 11.94, 79.49, 20.9), ('Virudhunagar', '626', 9.58, 77.96, 19.4),
+]
+PINCODES_PER_DISTRICT = 50
+COORDINATE_SPREAD_DEGREES = 0.12
+
+COMPLAINT_TYPE_WEIGHTS = {
+    'Roads': 22, 'Garbage': 20, 'Water': 15, 'Drainage': 12,
+    'Streetlight': 12, 'Electricity': 8, 'Public Safety': 4, 'Other': 7,
+}
+PRIORITY_WEIGHTS = {'low': 25, 'medium': 50, 'high': 20, 'urgent': 5}
+FAKE_RATE = 0.03
+DEPARTMENTS = ['Municipal Corporation', 'Electrical Board', 'Fire Station']
+DESCRIPTIONS = {
+    'Roads': ['Large pothole in the middle of the road', 'Road surface broken after rain', 'Speed breaker damaged'],
+    'Garbage': ['Garbage not collected for a week', 'Overflowing dustbin near the market', 'Waste dumped on the street'],
+    'Water': ['No water supply since morning', 'Drinking water pipe leaking', 'Contaminated water in the tap'],
+    'Drainage': ['Drain blocked and overflowing', 'Sewage water on the road', 'Open drain without cover'],
+    'Streetlight': ['Streetlight not working', 'Street lamp flickering all night', 'Whole street dark after 7 pm'],
+    'Electricity': ['Frequent power cuts in the area', 'Transformer sparking', 'Electric wire hanging low'],
+    'Public Safety': ['Tree fallen across the road', 'Fire hazard from burning waste', 'Unsafe abandoned building'],
+    'Other': ['Stray dogs near the school', 'Encroachment on the footpath', 'Noise from construction at night'],
+}
+DEFAULT_DEPARTMENT = {complaint_type: department for complaint_type, prefix, department, _ in DEPARTMENT_ROUTING_RULES
+                      if prefix == ''}
+
+
+def weighted_choices(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def district_pincodes():
+    """District -> (pincodes, cumulative Zipf-style weights); the same layout on every run"""
+    rng = random.Random(0)
+    pincodes = {}
+    for district, prefix, _, _, _ in DISTRICT_PROFILES:
+        suffixes = rng.sample(range(1, 1000), PINCODES_PER_DISTRICT)
+        codes = [f'{prefix}{suffix:03d}' for suffix in sorted(suffixes)]
+        pincodes[district] = (codes, list(itertools.accumulate(1 / (rank + 1) for rank in range(len(codes)))))
+    return pincodes
+
+
+def insert_batches(model, rows, batch_size, returning=False):
+    """Bulk insert `rows`, committing per batch; returns the new ids when `returning`"""
+    ids = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if returning:
+            ids.extend(db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), batch))
+        else:
+            db.session.execute(insert(model), batch)
+        db.session.commit()
+    return ids
+
+
+def generate_users(citizens, officers, batch_size):
+    """Create the users; returns [(id, phone)] of the new citizens"""
+    password = hash_password('password123')
+    now = datetime.now()
+    offset = db.session.query(db.func.count(User.id)).scalar()
+    phones = [str(7000000000 + offset + n) for n in range(citizens)]
+    citizen_rows = [{'phone': phone, 'role': 'citizen', 'name': f'Citizen {phone}', 'created_at': now}
+                    for phone in phones]
+    citizen_ids = insert_batches(User, citizen_rows, batch_size, returning=True)
+
+    all_pincodes = [(district, code) for district, (codes, _) in district_pincodes().items() for code in codes]
+    officer_rows = []
+    for n in range(offset, offset + officers):
+        district, pincode = all_pincodes[n % len(all_pincodes)]
+        officer_rows.append({'user_id': f'MUN{n + 1:05d}', 'password': password, 'role': 'municipal',
+                             'name': f'Municipal Officer {n + 1} ({district})', 'pincode': pincode, 'created_at': now})
+        department = DEPARTMENTS[n % len(DEPARTMENTS)]
+        officer_rows.append({'user_id': f'DEPT{n + 1:05d}', 'password': password, 'role': 'dept',
+                             'name': f'{department} Officer {n + 1}', 'department': department, 'created_at': now})
+        officer_rows.append({'user_id': f'POLICE{n + 1:05d}', 'password': password, 'role': 'police',
+                             'name': f'Police Officer {n + 1}', 'pincode': pincode, 'created_at': now})
+    insert_batches(User, officer_rows, batch_size)
+    return list(zip(citizen_ids, phones))
+
+
+def complaint_rows(rng, count, citizens, days, sequence_start):
+    """Yield `count` complaint rows, oldest first"""
+    pincodes = district_pincodes()
+    district_weights = {p[0]: p[4] for p in DISTRICT_PROFILES}
+    centres = {p[0]: (p[2], p[3]) for p in DISTRICT_PROFILES}
+    # A few heavy reporters (the busiest files ~0.2% of all complaints), a long tail of occasional ones
+    reporter_weights = list(itertools.accumulate(1 / (rank + 10) ** 0.6 for rank in range(len(citizens))))
+    now = datetime.now()
+    start = now - timedelta(days=days)
+
+    districts = weighted_choices(rng, district_weights, count)
+    types = weighted_choices(rng, COMPLAINT_TYPE_WEIGHTS, count)
+    priorities = weighted_choices(rng, PRIORITY_WEIGHTS, count)
+    reporters = rng.choices(citizens, cum_weights=reporter_weights, k=count)
+    # Submissions grow over time: sqrt of a uniform draw skews towards recent dates
+    offsets = sorted((days * 86400) * rng.random() ** 0.5 for _ in range(count))
+
+    for n in range(count):
+        district, complaint_type = districts[n], types[n]
+        codes, weights = pincodes[district]
+        pincode = rng.choices(codes, cum_weights=weights)[0]
+        lat, lng = centres[district]
+        created_at = start + timedelta(seconds=offsets[n])
+        age_days = (now - created_at).total_seconds() / 86400
+
+        # Older complaints are more likely to have progressed
+        progress = rng.random() * min(age_days / 14, 1.0)
+        is_fake = rng.random() < FAKE_RATE
+        department = DEFAULT_DEPARTMENT.get(complaint_type) or rng.choice(DEPARTMENTS)
+        if is_fake or progress < 0.15:
+            status, forwarded_department, updated_at = 'submitted', None, created_at
+        elif progress < 0.35:
+            status, forwarded_department = 'assigned', department
+            updated_at = created_at + timedelta(hours=rng.uniform(1, 72))
+        elif progress < 0.45:
+            status, forwarded_department = 'in_progress', department
+            updated_at = created_at + timedelta(hours=rng.uniform(12, 120))
+        else:
+            status, forwarded_department = 'resolved', department
+            updated_at = created_at + timedelta(hours=rng.lognormvariate(3.5, 0.9))
+        updated_at = min(updated_at, now)
+        description = rng.choice(DESCRIPTIONS[complaint_type])
+        location = f'Ward {rng.randint(1, 200)}, {district}'
+        latitude = round(rng.gauss(lat, COORDINATE_SPREAD_DEGREES), 6)
+        longitude = round(rng.gauss(lng, COORDINATE_SPREAD_DEGREES), 6)
+
+        yield {
+            'complaint_id': format_complaint_id(created_at, sequence_start + n),
+            'reporter_id': reporters[n][0],
+            'phone': reporters[n][1],
+            'title': complaint_type,
+            'complaint_type': complaint_type,
+            'description': description,
+            'district': district,
+            'pincode': pincode,
+            'location': location,
+            'coordinates': f'{latitude:.6f}, {longitude:.6f}',
+            'latitude': latitude,
+            'longitude': longitude,
+            'status': status,
+            'priority': priorities[n],
+            'forwarded_department': forwarded_department,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'resolved_at': updated_at if status == 'resolved' else None,
+            'resolution_notes': 'Issue fixed by field team' if status == 'resolved' else None,
+            'is_fake': is_fake,
+            'reporter_name': None,
+        }
+
+
+def generate(complaints, citizens, officers, days, seed, batch_size):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with app.app_context():
+        citizens_created = generate_users(citizens, officers, batch_size)
+        print(f"✓ Created {citizens} citizens and {officers * 3} officers "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        sequence_start = db.session.query(db.func.count(Complaint.id)).scalar() + 1
+        batch = []
+        inserted = 0
+        for row in complaint_rows(rng, complaints, citizens_created, days, sequence_start):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                inserted += len(batch)
+                insert_batches(Complaint, batch, batch_size)
+                batch = []
+                print(f"  {inserted} complaints ({inserted / (time.perf_counter() - started):.0f}/s)", end='\r')
+        if batch:
+            inserted += len(batch)
+            insert_batches(Complaint, batch, batch_size)
+        print(f"✓ Created {inserted} complaints in {time.perf_counter() - started:.1f}s" + ' ' * 20)
+        print("Next: python risk.py rebuild && python routing.py train")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-create synthetic citizens, officers and complaints')
+    parser.add_argument('--complaints', type=int, default=1_000_000)
+    parser.add_argument('--citizens', type=int, default=50_000)
+    parser.add_argument('--officers', type=int, default=2_000, help='officers per role')
+    parser.add_argument('--days', type=int, default=365, help='spread complaints over this many past days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+    generate(args.complaints, args.citizens, args.officers, args.days, args.seed, args.batch_size)
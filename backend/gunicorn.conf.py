@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for the supported serving profiles.
+
+  gunicorn -c gunicorn.conf.py app:app        (from backend/)
+
+WEB_WORKER_CLASS picks the profile:
+
+  sync     one request at a time per worker (gunicorn's default)
+  gthread  WEB_THREADS requests per worker; a slow client still holds a thread
+  gevent   up to WEB_WORKER_CONNECTIONS requests per worker; clients sending
+           or receiving slowly only hold a greenlet (recommended for
+           production, where mobile uploads are slow)
+
+The app is never preloaded: gevent must patch the worker before the app
+creates its database engine, locks and background threads. The master only
+manages the metric snapshot files (metrics_store.py): it clears them when the
+server starts and folds each exited worker's into the dead-workers total.
+"""
+
+import os
+
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'sync')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 8 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 1000))
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5 if worker_class == 'gevent' else 2))
+preload_app = False
+
+
+def on_starting(server):
+    from metrics_store import clear_snapshots
+    clear_snapshots()
+
+
+def child_exit(server, worker):
+    from metrics_store import retire_snapshot
+    retire_snapshot(worker.pid)
+
+
+def post_worker_init(worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        return
+    # Let psycopg2 yield to other greenlets while waiting on PostgreSQL
+    patch_psycopg()
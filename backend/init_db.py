@@ -3,7 +3,7 @@ Database initialization and seed data for Civic Issues Reporting and Resolution
 """
 
 from app import app, db, User
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
 from datetime import datetime
 
 def init_db():
@@ -39,7 +39,7 @@ def seed_demo_data():
             # Create municipal officer
             municipal_officer = User(
                 user_id='MUN001',
-                password=generate_password_hash('password123'),
+                password=hash_password('password123'),
                 role='municipal',
                 name='Municipal Officer',
                 pincode='600001',
@@ -49,7 +49,7 @@ def seed_demo_data():
             # Create department officials
             dept_officer1 = User(
                 user_id='DEPT001',
-                password=generate_password_hash('password123'),
+                password=hash_password('password123'),
                 role='dept',
                 name='Municipal Corp Officer',
                 department='Municipal Corporation',
@@ -58,7 +58,7 @@ def seed_demo_data():
             )
             dept_officer2 = User(
                 user_id='DEPT002',
-                password=generate_password_hash('password123'),
+                password=hash_password('password123'),
                 role='dept',
                 name='Electrical Board Officer',
                 department='Electrical Board',
@@ -67,7 +67,7 @@ def seed_demo_data():
             )
             dept_officer3 = User(
                 user_id='DEPT003',
-                password=generate_password_hash('password123'),
+                password=hash_password('password123'),
                 role='dept',
                 name='Fire Station Officer',
                 department='Fire Station',
@@ -78,7 +78,7 @@ def seed_demo_data():
             # Create police officer
             police_officer = User(
                 user_id='POLICE001',
-                password=generate_password_hash('password123'),
+                password=hash_password('password123'),
                 role='police',
                 name='Police Officer',
                 pincode='600001',
@@ -0,0 +1,371 @@
+"""
+Load harness that drives the real HTTP flows at a target request rate.
+
+Virtual users log in the way the browser does (citizens via request-otp and
+verify-otp, officers via official login) and then issue a weighted mix of
+operations:
+
+  otp_login     citizen request-otp + verify-otp
+  submit        citizen submits a complaint without a photo
+  submit_photo  citizen submits with a base64 photo data URL (--photo-kb)
+  list_*        dashboard list (GET /api/complaints) as citizen, municipal, dept
+  forward       municipal officer forwards a submitted complaint
+  resolve       department officer resolves an assigned complaint
+
+Requests are scheduled open-loop at --rps, so a slow server is not hidden by
+the harness slowing down: latency is measured from each request's scheduled
+start, including any time it waited for a free client thread.
+
+Credentials come from the database the server uses (DATABASE_URL, as for the
+app): citizens by phone, officers by user_id with the password
+``password123`` used by init_db.py and generate_data.py. Everything runs
+locally; with --start-server the harness also starts and stops gunicorn.
+
+Usage:
+  python load_test.py --start-server --workers 4 --rps 50 --duration 60
+  python load_test.py --url http://127.0.0.1:8000 --mix list_municipal=5,forward=1
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from sqlalchemy import create_engine, text
+
+DEFAULT_MIX = {
+    'otp_login': 5, 'submit': 12, 'submit_photo': 8,
+    'list_citizen': 20, 'list_municipal': 25, 'list_dept': 15,
+    'forward': 10, 'resolve': 5,
+}
+OFFICER_PASSWORD = 'password123'
+PERCENTILES = (50, 90, 95, 99)
+COMPLAINT_TYPES = ['Roads', 'Garbage', 'Water', 'Drainage', 'Streetlight', 'Electricity', 'Public Safety', 'Other']
+
+
+class Client:
+    """One keep-alive HTTP connection per thread; sessions are passed in as cookie strings"""
+
+    def __init__(self, base_url, timeout=30):
+        parsed = urllib.parse.urlparse(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def request(self, method, path, body=None, cookie=None):
+        """Return (status, parsed JSON or None, session cookie or None)"""
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if cookie:
+            headers['Cookie'] = cookie
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            conn = self.connection()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Server closed the keep-alive connection; retry once on a fresh one
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        set_cookie = SimpleCookie(response.getheader('Set-Cookie') or '')
+        session_cookie = f"session={set_cookie['session'].value}" if 'session' in set_cookie else None
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = None
+        return response.status, parsed, session_cookie
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, operation, seconds, ok):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+            if not ok:
+                self.errors[operation] += 1
+
+
+class Harness:
+    def __init__(self, client, users, photo_kb, seed):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.recorder = Recorder()
+        self.citizen_phones = users['citizen']
+        self.officers = {role: users[role] for role in ('municipal', 'dept')}
+        self.sessions = {'citizen': [], 'municipal': [], 'dept': []}
+        self.forward_pool = []
+        self.resolve_pool = []
+        self.pincodes = [pincode for _, pincode, _ in users['municipal']] or ['600001']
+        self.photo = 'data:image/jpeg;base64,' + base64.b64encode(os.urandom(photo_kb * 1024)).decode()
+        self._lock = threading.Lock()
+
+    # ---- timing helpers ----
+
+    def timed(self, operation, scheduled, method, path, body=None, cookie=None):
+        try:
+            status, data, new_cookie = self.client.request(method, path, body, cookie)
+            ok = 200 <= status < 300 and not (isinstance(data, dict) and data.get('success') is False)
+        except Exception:
+            status, data, new_cookie, ok = None, None, None, False
+        self.recorder.record(operation, time.perf_counter() - scheduled, ok)
+        return status, data, new_cookie
+
+    def pick_session(self, role):
+        with self._lock:
+            return self.rng.choice(self.sessions[role]) if self.sessions[role] else None
+
+    # ---- logins ----
+
+    def otp_login(self, scheduled):
+        phone = self.rng.choice(self.citizen_phones)
+        _, data, _ = self.timed('otp_request', scheduled, 'POST', '/api/citizen/request-otp', {'phone': phone})
+        if not data or not data.get('demo_otp'):
+            return
+        verify_started = time.perf_counter()
+        _, data, cookie = self.timed('otp_verify', verify_started, 'POST', '/api/citizen/verify-otp',
+                                     {'phone': phone, 'otp': data['demo_otp']})
+        if cookie:
+            with self._lock:
+                self.sessions['citizen'].append(cookie)
+
+    def official_login(self, role, user_id, pincode, department):
+        _, _, cookie = self.client.request('POST', '/api/official/login', {
+            'user_id': user_id, 'password': OFFICER_PASSWORD, 'role': role,
+            'pincode': pincode or self.rng.choice(self.pincodes), 'department': department or ''
+        })
+        if cookie:
+            self.sessions[role].append(cookie)
+
+    def setup(self, sessions_per_role):
+        """Log in the initial virtual users (not measured)"""
+        for _ in range(sessions_per_role):
+            self.otp_login(time.perf_counter())
+        for role, officers in self.officers.items():
+            for user_id, pincode, department in self.rng.sample(officers, min(sessions_per_role, len(officers))):
+                self.official_login(role, user_id, pincode, department)
+        self.recorder = Recorder()
+        missing = [role for role, sessions in self.sessions.items() if not sessions]
+        if missing:
+            raise SystemExit(f"Could not log in any {', '.join(missing)} users; is the database seeded?")
+
+    # ---- operations ----
+
+    def submit(self, scheduled, with_photo):
+        cookie = self.pick_session('citizen')
+        complaint_type = self.rng.choice(COMPLAINT_TYPES)
+        body = {
+            'type': complaint_type, 'district': 'Chennai', 'pincode': self.rng.choice(self.pincodes),
+            'location': f'Load test street {self.rng.randint(1, 999)}',
+            'description': f'{complaint_type} issue reported by the load harness',
+            'coordinates': f'{13.0 + self.rng.random() * 0.2:.6f}, {80.2 + self.rng.random() * 0.2:.6f}',
+        }
+        if with_photo:
+            body['photo'] = self.photo
+        self.timed('submit_photo' if with_photo else 'submit', scheduled, 'POST', '/api/complaint/submit', body, cookie)
+
+    def list_complaints(self, scheduled, role):
+        _, data, _ = self.timed(f'list_{role}', scheduled, 'GET', '/api/complaints', cookie=self.pick_session(role))
+        complaints = (data or {}).get('complaints') or []
+        if role == 'municipal':
+            ids = [c['id'] for c in complaints if c['status'] == 'submitted']
+            pool = self.forward_pool
+        elif role == 'dept':
+            ids = [c['id'] for c in complaints if c['status'] in ('assigned', 'in_progress')]
+            pool = self.resolve_pool
+        else:
+            return
+        with self._lock:
+            pool.extend(self.rng.sample(ids, min(len(ids), 50)))
+            del pool[:-1000]
+
+    def transition(self, scheduled, role, pool, operation, path, body):
+        with self._lock:
+            complaint_id = pool.pop() if pool else None
+        if complaint_id is None:
+            # Nothing harvested yet: list first, like an officer opening the dashboard
+            return self.list_complaints(scheduled, role)
+        self.timed(operation, scheduled, 'POST', path.format(complaint_id), body, self.pick_session(role))
+
+    def run_operation(self, operation, scheduled):
+        if operation == 'otp_login':
+            self.otp_login(scheduled)
+        elif operation in ('submit', 'submit_photo'):
+            self.submit(scheduled, operation == 'submit_photo')
+        elif operation.startswith('list_'):
+            self.list_complaints(scheduled, operation[len('list_'):])
+        elif operation == 'forward':
+            self.transition(scheduled, 'municipal', self.forward_pool, 'forward',
+                            '/api/complaint/{}/forward', {'department': 'Municipal Corporation'})
+        elif operation == 'resolve':
+            self.transition(scheduled, 'dept', self.resolve_pool, 'resolve',
+                            '/api/complaint/{}/resolve', {'notes': 'Resolved during load test'})
+        else:
+            raise ValueError(f'Unknown operation {operation}')
+
+    def run(self, mix, rps, duration, concurrency):
+        operations = self.rng.choices(list(mix), weights=list(mix.values()), k=int(rps * duration))
+        interval = 1 / rps
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for n, operation in enumerate(operations):
+                scheduled = started + n * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.run_operation, operation, scheduled)
+        return time.perf_counter() - started
+
+
+# ==================== REPORTING ====================
+
+def percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    summary = {}
+    for operation, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        summary[operation] = {
+            'count': len(values),
+            'errors': recorder.errors.get(operation, 0),
+            'rps': round(len(values) / elapsed, 2),
+            **{f'p{p}_ms': round(percentile(values, p) * 1000, 2) for p in PERCENTILES},
+            'max_ms': round(values[-1] * 1000, 2),
+        }
+    return summary
+
+
+def print_summary(summary, elapsed, target_rps):
+    total = sum(s['count'] for s in summary.values())
+    errors = sum(s['errors'] for s in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s, target {target_rps}), {errors} errors")
+    header = ['operation', 'count', 'errors', 'rps'] + [f'p{p} ms' for p in PERCENTILES] + ['max ms']
+    print(f"{header[0]:<14}" + ''.join(f"{h:>10}" for h in header[1:]))
+    for operation, s in summary.items():
+        values = [s['count'], s['errors'], s['rps']] + [s[f'p{p}_ms'] for p in PERCENTILES] + [s['max_ms']]
+        print(f"{operation:<14}" + ''.join(f"{v:>10}" for v in values))
+
+
+# ==================== SETUP ====================
+
+def database_url():
+    backend = os.path.dirname(os.path.abspath(__file__))
+    default = 'sqlite:///' + os.path.join(os.path.dirname(backend), 'database', 'civic_system.db')
+    return os.environ.get('DATABASE_URL', '').replace('postgres://', 'postgresql://', 1) or default
+
+
+def load_users(limit):
+    """Sample citizens and officers straight from the database the server uses"""
+    engine = create_engine(database_url())
+    users = {}
+    table = '"user"' if engine.dialect.name == 'postgresql' else 'user'
+    with engine.connect() as conn:
+        users['citizen'] = [row.phone for row in conn.execute(text(
+            f"SELECT phone FROM {table} WHERE role = 'citizen' AND phone IS NOT NULL ORDER BY random() LIMIT :limit"
+        ), {'limit': limit})]
+        for role in ('municipal', 'dept'):
+            users[role] = [tuple(row) for row in conn.execute(text(
+                f"SELECT user_id, pincode, department FROM {table} WHERE role = :role ORDER BY random() LIMIT :limit"
+            ), {'role': role, 'limit': limit})]
+    engine.dispose()
+    return users
+
+
+def start_server(port, workers, extra_args):
+    backend = os.path.dirname(os.path.abspath(__file__))
+    command = ['gunicorn', '--chdir', backend, '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               *extra_args, 'app:app']
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    client = Client(f'http://127.0.0.1:{port}', timeout=2)
+    for _ in range(120):
+        try:
+            client.request('GET', '/')
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit(f"gunicorn exited with status {process.returncode}")
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("gunicorn did not start within 60s")
+
+
+def parse_mix(value):
+    if not value:
+        return DEFAULT_MIX
+    mix = {}
+    for item in value.split(','):
+        operation, weight = item.split('=')
+        if operation not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown operation {operation!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[operation] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the real flows at a target RPS and report latency percentiles')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--rps', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--concurrency', type=int, default=64, help='client threads')
+    parser.add_argument('--mix', help='operation=weight,... (default: %s)' %
+                        ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+    parser.add_argument('--sessions', type=int, default=20, help='logged-in users per role')
+    parser.add_argument('--photo-kb', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the summary as JSON to this file')
+    parser.add_argument('--start-server', action='store_true', help='start a local gunicorn on the --url port')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --start-server')
+    parser.add_argument('--gunicorn-arg', action='append', default=[], help='extra gunicorn argument (repeatable)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    users = load_users(max(args.sessions * 10, 100))
+    server = None
+    if args.start_server:
+        server = start_server(urllib.parse.urlparse(args.url).port or 80, args.workers, args.gunicorn_arg)
+    try:
+        harness = Harness(Client(args.url), users, args.photo_kb, args.seed)
+        harness.setup(args.sessions)
+        print(f"Running {args.rps} req/s for {args.duration}s against {args.url} ...")
+        elapsed = harness.run(mix, args.rps, args.duration, args.concurrency)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(harness.recorder, elapsed)
+    print_summary(summary, elapsed, args.rps)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rps': args.rps, 'duration': args.duration, 'mix': mix, 'results': summary}, f, indent=2)
+    return 1 if any(s['errors'] for s in summary.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
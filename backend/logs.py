@@ -0,0 +1,214 @@
+"""
+Structured, non-blocking application logging.
+
+Loggers under the ``civic`` namespace hand records to a ``QueueHandler``; a
+``QueueListener`` thread formats them as one JSON object per line and writes
+them to stdout (and LOG_FILE when set). A request thread only pays for
+building the record and a queue put; the JSON encoding, redaction and the
+write happen off the request path.
+
+Each record carries:
+
+* ``request_id`` - taken from an incoming ``X-Request-ID`` header or
+  generated, and echoed back on the response;
+* ``event`` and any extra fields passed to ``log_event``;
+* ``sample_rate`` when the event is sampled (see LOG_SAMPLE_RATES).
+
+Phone numbers are masked to their last two digits and OTP codes, passwords
+and similar fields are replaced before anything is written.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.environ.get('LOG_FILE')
+# Records queued beyond this (a stalled log sink) are dropped rather than blocking requests
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+ROOT_LOGGER = 'civic'
+
+
+def parse_sample_rates(value):
+    """Parse 'event=rate,event=rate' into a dict"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            event, rate = item.split('=', 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+# Fraction of INFO/DEBUG occurrences of high-volume events that are written
+LOG_SAMPLE_RATES = {
+    'login_attempt': 1.0,
+    'complaint_submit': 1.0,
+    **parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES')),
+}
+
+REDACTED_FIELDS = {'otp', 'otp_code', 'code', 'password', 'token', 'secret'}
+# Indian mobile numbers, optionally with +91/91/0 prefix, not part of a longer digit run
+PHONE_PATTERN = re.compile(r'(?<![\d-])(?:\+?91[-\s]?|0)?([6-9]\d{7})(\d{2})(?![\d-])')
+# A 4-8 digit code shortly after 'OTP', 'code' or 'one-time'; longer digit runs (phone numbers) are skipped
+OTP_PATTERN = re.compile(r'(?i)(\b(?:otp|code|one-time)\b[^\n]{0,30}?)\b\d{4,8}\b')
+# Both patterns need a run of 4+ digits; most strings have none and skip the substitutions
+DIGITS_PATTERN = re.compile(r'\d{4}')
+REQUEST_ID_PATTERN = re.compile(r'^[\w.-]{1,64}$')
+
+
+def redact_text(text):
+    if not DIGITS_PATTERN.search(text):
+        return text
+    text = OTP_PATTERN.sub(r'\1[REDACTED]', text)
+    return PHONE_PATTERN.sub(lambda m: '*' * len(m.group(1)) + m.group(2), text)
+
+
+def redact(value, key=None):
+    if key and key.lower() in REDACTED_FIELDS:
+        return '[REDACTED]'
+    if isinstance(value, str):
+        return redact_text(value)
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, redacted"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact_text(record.getMessage()),
+        }
+        for attr in ('event', 'request_id', 'sample_rate', 'dropped'):
+            value = getattr(record, attr, None)
+            if value is not None:
+                entry[attr] = value
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(redact(fields))
+        if record.exc_text:
+            entry['exception'] = redact_text(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class RequestQueueHandler(QueueHandler):
+    """Queues records with the request id attached and the message already rendered"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Only cheap work here: this runs on the request thread
+        if has_request_context():
+            record.request_id = g.get('request_id')
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            # Not exact under concurrency; it only needs to flag that records were lost
+            record.dropped, self.dropped = self.dropped, 0
+        return record
+
+
+_queue_handler = RequestQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+_listener = None
+
+
+def output_handlers():
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
+        handlers.append(logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def start_listener(handlers=None):
+    """(Re)start the writer thread; also called in forked children, where it did not survive"""
+    global _listener
+    _queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(_queue_handler.queue, *(handlers or output_handlers()))
+    _listener.start()
+
+
+def stop_listener():
+    """Flush everything queued so far and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def log_event(logger, event, message, level=logging.INFO, **fields):
+    """Log `message` as `event` with structured `fields`, sampling high-volume events"""
+    if not logger.isEnabledFor(level):
+        return
+    sample_rate = LOG_SAMPLE_RATES.get(event) if level < logging.WARNING else None
+    if sample_rate is not None and sample_rate < 1.0:
+        if random.random() >= sample_rate:
+            return
+    else:
+        sample_rate = None
+    # makeRecord + handle skips logger.log's caller lookup (a stack walk we never print)
+    logger.handle(logger.makeRecord(logger.name, level, '', 0, message, None, None, extra={
+        'event': event, 'fields': fields, 'sample_rate': sample_rate
+    }))
+
+
+# ==================== REQUEST IDS ====================
+
+def assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+
+
+def echo_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def init_logging(app=None):
+    """Route the civic.* loggers through the queue; with `app`, also tag requests with ids"""
+    root = logging.getLogger(ROOT_LOGGER)
+    if _queue_handler not in root.handlers:
+        root.addHandler(_queue_handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        start_listener()
+        atexit.register(stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=start_listener)
+    if app is not None:
+        app.before_request(assign_request_id)
+        app.after_request(echo_request_id)
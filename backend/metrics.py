@@ -0,0 +1,162 @@
+"""
+Request and database metrics in Prometheus text format.
+
+Each process records into an in-memory registry and periodically writes a
+snapshot to ``METRICS_DIR/metrics_<pid>.json`` (atomically, via rename).
+``/metrics`` merges the snapshots of every process of the current server run,
+so counters and histograms stay correct under multi-worker gunicorn; the
+directory is cleared at server start and exited workers are folded into one
+file (see metrics_store.py).
+
+Recorded per request, labelled by route, method and the session role:
+latency, request body (upload) bytes, response bytes and the number of SQL
+statements issued. SQL statement counts and time are also kept as totals via
+SQLAlchemy engine events.
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request, session
+from sqlalchemy import event
+
+from metrics_store import METRICS_DIR, collect, snapshot_path, write_snapshot
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'civic_http_requests_total': ('counter', 'HTTP requests by route, method, role and status.', None),
+    'civic_http_request_duration_seconds': ('histogram', 'Request latency in seconds.', LATENCY_BUCKETS),
+    'civic_http_request_bytes': ('histogram', 'Request body (upload) size in bytes.', SIZE_BUCKETS),
+    'civic_http_response_bytes': ('histogram', 'Response payload size in bytes.', SIZE_BUCKETS),
+    'civic_db_queries_per_request': ('histogram', 'SQL statements issued per request.', QUERY_BUCKETS),
+    'civic_db_statements_total': ('counter', 'SQL statements executed.', None),
+    'civic_db_statement_seconds_total': ('counter', 'Time spent executing SQL statements.', None),
+    'civic_fragment_cache_total': ('counter', 'Dashboard cards served from the fragment cache (hit) or rendered (miss).', None),
+}
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of counters and histograms"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._values = {}  # (name, labels) -> float, or [bucket counts..., sum, count] for histograms
+        self._last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def flush(self, force=False):
+        """Write this process's snapshot, at most once per FLUSH_INTERVAL_SECONDS unless forced"""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL_SECONDS:
+            return
+        self._last_flush = now
+        with self._lock:
+            snapshot = [[name, list(labels), value] for (name, labels), value in self._values.items()]
+        write_snapshot(snapshot_path(os.getpid(), self.directory), snapshot)
+
+
+registry = MetricsRegistry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+def format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+
+def render(merged):
+    """Render merged metrics in the Prometheus text exposition format"""
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (n, labels), value in merged.items() if n == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in series:
+            if metric_type == 'histogram':
+                for bound, count in zip(buckets, value):
+                    lines.append(f'{name}_bucket{format_labels(labels, ("le", bound))} {count}')
+                lines.append(f'{name}_bucket{format_labels(labels, ("le", "+Inf"))} {value[-1]}')
+                lines.append(f'{name}_sum{format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_count{format_labels(labels)} {value[-1]}')
+            else:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_metrics():
+    registry.flush(force=True)
+    return render(collect(registry.directory))
+
+
+# ==================== HOOKS ====================
+
+def before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+
+
+def after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    labels = {'route': route, 'method': request.method, 'role': session.get('role') or 'anonymous'}
+
+    registry.inc('civic_http_requests_total', dict(labels, status=str(response.status_code)))
+    registry.observe('civic_http_request_duration_seconds', labels, time.perf_counter() - started)
+    registry.observe('civic_http_request_bytes', labels, request.content_length or 0)
+    registry.observe('civic_http_response_bytes', labels, response.content_length or 0)
+    registry.observe('civic_db_queries_per_request', labels, g.pop('sql_statements', 0))
+    registry.flush()
+    return response
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_started'] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('metrics_started', time.perf_counter())
+    in_request = has_request_context()
+    if in_request and 'sql_statements' in g:
+        g.sql_statements += 1
+    labels = {'context': 'request' if in_request else 'background'}
+    registry.inc('civic_db_statements_total', labels)
+    registry.inc('civic_db_statement_seconds_total', labels, elapsed)
+
+
+def init_metrics(app, engine):
+    """Install the request hooks on `app` and the statement timers on `engine`"""
+    app.before_request(before_request)
+    app.after_request(after_request)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,91 @@
+"""
+Metric snapshot files shared by the processes of one server run.
+
+Every process writes its counters and histograms to
+``METRICS_DIR/metrics_<pid>.json`` (see metrics.py) and ``/metrics`` adds up
+every ``metrics_*.json`` there. This module owns those files:
+
+* ``clear_snapshots`` empties the directory when the server starts, so
+  counters begin at zero rather than at the previous run's totals;
+* ``retire_snapshot`` folds an exited worker's snapshot into
+  ``metrics_dead.json`` and deletes it, so a replacement worker that reuses
+  the pid cannot overwrite (and so subtract) what the old one counted.
+
+gunicorn.conf.py calls both from the master, and ``python app.py`` clears the
+directory before serving. It imports nothing from the app, so the master can
+use it without creating the registry's locks before gevent patches a worker.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+
+METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'civic_metrics')
+DEAD_NAME = 'metrics_dead.json'  # everything counted by workers that have exited
+
+
+def snapshot_path(pid, directory=METRICS_DIR):
+    return os.path.join(directory, f'metrics_{pid}.json')
+
+
+def write_snapshot(path, snapshot):
+    """Replace the snapshot at `path` atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """[[name, labels, value], ...] from `path`, or [] when it is missing or half-written"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def merge(merged, snapshot):
+    """Add `snapshot` into `merged`: (name, labels) -> value or histogram buckets"""
+    for name, labels, value in snapshot:
+        key = (name, tuple(tuple(label) for label in labels))
+        if isinstance(value, list):
+            current = merged.setdefault(key, [0] * len(value))
+            merged[key] = [a + b for a, b in zip(current, value)]
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def collect(directory=METRICS_DIR):
+    """Merge every snapshot in `directory`, including that of exited workers"""
+    merged = {}
+    for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+        merge(merged, read_snapshot(path))
+    return merged
+
+
+def clear_snapshots(directory=METRICS_DIR):
+    """Delete the snapshots of a previous server run"""
+    for path in glob.glob(os.path.join(directory, 'metrics_*.json*')):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def retire_snapshot(pid, directory=METRICS_DIR):
+    """Fold the snapshot of exited process `pid` into the dead-workers file and delete it"""
+    path = snapshot_path(pid, directory)
+    snapshot = read_snapshot(path)
+    if snapshot:
+        dead_path = os.path.join(directory, DEAD_NAME)
+        merged = merge(merge({}, read_snapshot(dead_path)), snapshot)
+        write_snapshot(dead_path, [[name, list(labels), value] for (name, labels), value in merged.items()])
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,460 @@
+"""
+Versioned schema migrations for the main database and every complaint shard.
+
+``db.create_all()`` still creates tables that do not exist yet; changes to
+existing tables are migrations, numbered in MIGRATIONS. Each database keeps
+its own progress in ``schema_migration`` (one row per version) and
+``schema_migration_step`` (one checkpoint per backfill), so a shard added
+later or a database restored from an old backup catches up by itself.
+
+A migration has two parts:
+
+* ``schema`` - cheap DDL such as ADD COLUMN, applied at start-up before the
+  app serves requests. Adding a nullable column (or one with a constant
+  default) only changes the catalogue on both SQLite and PostgreSQL, whatever
+  the table's size. On PostgreSQL each statement runs under
+  MIGRATION_LOCK_TIMEOUT and is retried, so an ALTER waiting behind a long
+  transaction never holds every writer up behind it.
+* ``online`` - backfills and index builds, run by the ``run_migrations``
+  background job while the app serves traffic. Backfills walk the table in id
+  order, MIGRATION_BATCH_SIZE rows per short transaction that also saves the
+  last id done, and pause MIGRATION_BATCH_PAUSE between batches; a run stops
+  after MIGRATION_MAX_BATCHES and comes back a few seconds later, and an
+  interrupted run resumes from its checkpoint. PostgreSQL builds indexes
+  with CREATE INDEX CONCURRENTLY (an invalid index left by an interrupted
+  build is dropped and built again). SQLite has no concurrent build, so there
+  an index is one statement holding the write lock, run after the backfills.
+
+Code must not depend on a migration's online part having finished: derived
+columns are kept up to date for new writes by the models and filled in for
+old rows by the backfill.
+
+Usage:
+  python migrations.py          - Apply every pending migration, online parts included, and exit
+  python migrations.py status   - Migration progress of each database
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, Float, Integer, LargeBinary, MetaData, String, Table,
+                        Text, and_, bindparam, inspect, insert, literal, or_, select, text, true, update)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from logs import get_logger, log_event
+from models import db, BackgroundJob
+from shards import engines
+from tasks import enqueue, task
+from utils import parse_coordinates
+
+logger = get_logger('migrations')
+
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 1000))
+MIGRATION_BATCH_PAUSE = float(os.environ.get('MIGRATION_BATCH_PAUSE', 0.05))
+MIGRATION_MAX_BATCHES = int(os.environ.get('MIGRATION_MAX_BATCHES', 200))
+MIGRATION_LOCK_TIMEOUT = os.environ.get('MIGRATION_LOCK_TIMEOUT', '5s')
+MIGRATION_DDL_RETRIES = 5
+MIGRATION_BACKLOG_INTERVAL = 5
+
+metadata = MetaData()
+
+migration_table = Table(
+    'schema_migration', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(200)),
+    Column('applied_at', DateTime),  # schema part
+    Column('completed_at', DateTime, nullable=True),  # online part
+)
+
+step_table = Table(
+    'schema_migration_step', metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('step', String(100), primary_key=True),
+    Column('position', BigInteger, default=0),  # last id done
+    Column('rows_done', BigInteger, default=0),
+    Column('completed_at', DateTime, nullable=True),
+    Column('updated_at', DateTime),
+)
+
+
+def lock_timed_out(error):
+    """True for errors that mean the statement gave up waiting for a lock"""
+    return (getattr(error.orig, 'pgcode', None) == '55P03'
+            or 'database is locked' in str(error.orig))
+
+
+class Migrator:
+    """Applies migration steps to one database"""
+
+    def __init__(self, name, engine, max_batches=None):
+        self.name = name
+        self.engine = engine
+        self.postgresql = engine.dialect.name == 'postgresql'
+        self.batches_left = max_batches  # None = no limit
+        self.version = None
+
+    def quote(self, identifier):
+        return self.engine.dialect.identifier_preparer.quote(identifier)
+
+    def columns(self, table):
+        """Column names of `table`, or None when this database has no such table"""
+        inspector = inspect(self.engine)
+        if not inspector.has_table(table):
+            return None
+        return {column['name'] for column in inspector.get_columns(table)}
+
+    def run_ddl(self, statement):
+        """Run one DDL statement in its own transaction, retrying while it cannot get its lock"""
+        for attempt in range(MIGRATION_DDL_RETRIES):
+            try:
+                with self.engine.begin() as conn:
+                    if self.postgresql:
+                        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'")
+                    conn.exec_driver_sql(statement)
+                return
+            except DBAPIError as e:
+                if not lock_timed_out(e) or attempt == MIGRATION_DDL_RETRIES - 1:
+                    raise
+                log_event(logger, 'migration_lock_wait', 'DDL timed out waiting for a lock; retrying',
+                          database=self.name, attempt=attempt + 1)
+                time.sleep(2 ** attempt)
+
+    def add_column(self, table, column, column_type, default=None):
+        """ALTER TABLE ... ADD COLUMN unless the column (or the table) is missing from this database"""
+        columns = self.columns(table)
+        if columns is None or column in columns:
+            return
+        dialect = self.engine.dialect
+        statement = (f'ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(column)} '
+                     f'{column_type.compile(dialect=dialect)}')
+        if default is not None:
+            statement += ' DEFAULT ' + str(literal(default, column_type).compile(
+                dialect=dialect, compile_kwargs={'literal_binds': True}
+            ))
+        try:
+            self.run_ddl(statement)
+        except DBAPIError:
+            # Another process starting up at the same time may have added it first
+            if column not in (self.columns(table) or ()):
+                raise
+
+    def create_index(self, name, table, columns):
+        """Build an index if missing; on PostgreSQL without blocking writes. Returns True"""
+        if self.columns(table) is None:
+            return True
+        column_list = ', '.join(self.quote(column) for column in columns)
+        if not self.postgresql:
+            self.run_ddl(f'CREATE INDEX IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({column_list})')
+            return True
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            valid = conn.execute(text(
+                'SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name'
+            ), {'name': name}).scalar()
+            if valid:
+                return True
+            if valid is False:
+                # Left behind by an interrupted concurrent build
+                conn.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS {self.quote(name)}')
+            conn.exec_driver_sql(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({column_list})'
+            )
+        log_event(logger, 'migration_index_built', f'Built index {name} on {self.name}',
+                  database=self.name, index=name)
+        return True
+
+    def backfill(self, table, columns, fill, pending=None):
+        """Update rows of `table` in id order, one checkpointed batch per transaction.
+
+        `fill(row)` returns the values to set on a row read with `columns`;
+        `pending(table)` may narrow the rows read. Returns True once every row
+        was visited, False when the batch budget ran out first.
+        """
+        step = f'backfill {table}'
+        if self.columns(table) is None:
+            return True
+        checkpoint = and_(step_table.c.version == self.version, step_table.c.step == step)
+        try:
+            with self.engine.begin() as conn:
+                if conn.execute(select(step_table.c.step).where(checkpoint)).first() is None:
+                    conn.execute(insert(step_table).values(
+                        version=self.version, step=step, position=0, rows_done=0, updated_at=datetime.now()
+                    ))
+        except IntegrityError:
+            pass  # started by another runner at the same time
+        target = Table(table, MetaData(), autoload_with=self.engine, resolve_fks=False)
+
+        while True:
+            with self.engine.begin() as conn:
+                progress = conn.execute(select(step_table).where(checkpoint)).one()
+                if progress.completed_at:
+                    return True
+                if self.batches_left == 0:
+                    return False
+                rows = conn.execute(
+                    select(target.c.id, *(target.c[column] for column in columns)).where(
+                        target.c.id > progress.position, pending(target) if pending else true()
+                    ).order_by(target.c.id).limit(MIGRATION_BATCH_SIZE)
+                ).all()
+                if rows:
+                    conn.execute(update(target).where(target.c.id == bindparam('row_id')),
+                                 [dict(fill(row), row_id=row.id) for row in rows])
+                finished = len(rows) < MIGRATION_BATCH_SIZE
+                conn.execute(update(step_table).where(checkpoint).values(
+                    position=rows[-1].id if rows else progress.position,
+                    rows_done=step_table.c.rows_done + len(rows),
+                    completed_at=datetime.now() if finished else None,
+                    updated_at=datetime.now(),
+                ))
+            if self.batches_left is not None:
+                self.batches_left -= 1
+            if finished:
+                log_event(logger, 'migration_backfilled', f'Backfilled {table} on {self.name}',
+                          database=self.name, table=table, version=self.version)
+                return True
+            time.sleep(MIGRATION_BATCH_PAUSE)
+
+
+class Migration:
+    def __init__(self, version, name, schema, online=None):
+        self.version = version
+        self.name = name
+        self.schema = schema
+        self.online = online
+
+
+# ==================== MIGRATIONS ====================
+
+# Columns added to existing databases before migrations were versioned
+BASELINE_COLUMNS = [
+    ('complaint', 'photo_path', String(255), None),
+    ('complaint', 'photo_data', LargeBinary(), None),
+    ('complaint', 'evidence_path', String(255), None),
+    ('complaint', 'priority', String(10), 'medium'),
+    ('complaint', 'verified_by', Integer(), None),
+    ('complaint', 'assigned_to', Integer(), None),
+    ('complaint', 'resolved_at', DateTime(), None),
+    ('complaint', 'resolution_notes', Text(), None),
+    ('complaint', 'is_fake', Boolean(), False),
+    ('complaint', 'forwarded_department', String(100), None),
+    ('complaint', 'resolved_photo_path', String(255), None),
+    ('complaint', 'resolved_coordinates', String(50), None),
+    ('complaint', 'phone', String(15), None),
+    ('complaint', 'reporter_name', String(100), None),
+    ('complaint', 'suggested_department', String(100), None),
+    ('complaint', 'routing_confidence', Float(), None),
+    ('complaint', 'risk_score', Float(), None),
+    ('complaint', 'photo_hash', String(32), None),
+    ('user', 'is_active', Boolean(), True),
+    ('user', 'session_version', Integer(), 0),
+    ('user', 'updated_at', DateTime(), None),
+]
+
+BASELINE_INDEXES = [
+    ('ix_complaint_status_updated_at', 'complaint', ('status', 'updated_at')),
+    ('ix_complaint_pincode_risk_score', 'complaint', ('pincode', 'risk_score')),
+    ('ix_complaint_photo_hash', 'complaint', ('photo_hash',)),
+    ('ix_user_updated_at', 'user', ('updated_at',)),
+]
+
+
+def baseline_columns(m):
+    for table, column, column_type, default in BASELINE_COLUMNS:
+        m.add_column(table, column, column_type, default)
+
+
+def baseline_indexes(m):
+    return all(m.create_index(name, table, columns) for name, table, columns in BASELINE_INDEXES)
+
+
+COORDINATE_TABLES = ('complaint', 'archived_complaint')
+COORDINATE_COLUMNS = ('latitude', 'longitude', 'resolved_latitude', 'resolved_longitude')
+
+
+def coordinate_columns(m):
+    for table in COORDINATE_TABLES:
+        for column in COORDINATE_COLUMNS:
+            m.add_column(table, column, Float())
+
+
+def numeric_coordinates(row):
+    lat, lng = parse_coordinates(row.coordinates) or (None, None)
+    resolved_lat, resolved_lng = parse_coordinates(row.resolved_coordinates) or (None, None)
+    return {'latitude': lat, 'longitude': lng, 'resolved_latitude': resolved_lat, 'resolved_longitude': resolved_lng}
+
+
+def coordinates_missing(table):
+    return or_(
+        and_(table.c.coordinates.isnot(None), table.c.latitude.is_(None)),
+        and_(table.c.resolved_coordinates.isnot(None), table.c.resolved_latitude.is_(None)),
+    )
+
+
+def backfill_coordinates(m):
+    return all(
+        m.backfill(table, ('coordinates', 'resolved_coordinates'), numeric_coordinates, coordinates_missing)
+        for table in COORDINATE_TABLES
+    ) and m.create_index('ix_complaint_latitude_longitude', 'complaint', ('latitude', 'longitude'))
+
+
+ROUTING_TABLES = ('complaint', 'archived_complaint')
+
+
+def auto_forwarded_column(m):
+    for table in ROUTING_TABLES:
+        m.add_column(table, 'auto_forwarded', Boolean(), False)
+
+
+def routed_by_model(table):
+    # Officers' forwards always set verified_by; the routing model's never did
+    return and_(
+        table.c.forwarded_department.isnot(None),
+        table.c.forwarded_department == table.c.suggested_department,
+        table.c.verified_by.is_(None),
+        table.c.auto_forwarded.isnot(True),
+    )
+
+
+def backfill_auto_forwarded(m):
+    return all(
+        m.backfill(table, ('auto_forwarded',), lambda row: {'auto_forwarded': True}, routed_by_model)
+        for table in ROUTING_TABLES
+    )
+
+
+MIGRATIONS = [
+    Migration(1, 'Columns and indexes added before versioned migrations', baseline_columns, baseline_indexes),
+    Migration(2, 'Numeric latitude/longitude next to coordinate strings', coordinate_columns, backfill_coordinates),
+    Migration(3, 'Flag complaints forwarded by the routing model', auto_forwarded_column, backfill_auto_forwarded),
+]
+
+
+# ==================== RUNNING ====================
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        return {row.version: row for row in conn.execute(select(migration_table))}
+
+
+def apply_schema(name, engine):
+    """Apply the schema part of every migration this database has not had; returns their versions"""
+    metadata.create_all(engine)
+    done = applied_versions(engine)
+    migrator = Migrator(name, engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        migrator.version = migration.version
+        migration.schema(migrator)
+        now = datetime.now()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(migration_table).values(
+                    version=migration.version, name=migration.name, applied_at=now,
+                    completed_at=None if migration.online else now
+                ))
+        except IntegrityError:
+            continue  # applied by another process starting at the same time
+        applied.append(migration.version)
+    return applied
+
+
+def run_online(migrator):
+    """Run the online parts still pending on the migrator's database; returns True when none is left"""
+    by_version = {migration.version: migration for migration in MIGRATIONS}
+    for version, row in sorted(applied_versions(migrator.engine).items()):
+        if row.completed_at or version not in by_version:
+            continue
+        migrator.version = version
+        if not by_version[version].online(migrator):
+            return False
+        with migrator.engine.begin() as conn:
+            conn.execute(update(migration_table).where(migration_table.c.version == version).values(
+                completed_at=datetime.now()
+            ))
+        log_event(logger, 'migration_completed', f'Migration {version} complete on {migrator.name}',
+                  database=migrator.name, version=version)
+    return True
+
+
+def migrate_schema(main_engine):
+    """Bring the schema of the main database and every shard up to date (start-up)"""
+    for name, engine in engines(main_engine).items():
+        applied = apply_schema(name, engine)
+        if applied:
+            log_event(logger, 'migration_applied', f'Applied migrations {applied} to {name}',
+                      database=name, versions=applied)
+
+
+def migrate_online(main_engine, max_batches=None):
+    """Run pending online parts on every database within `max_batches` batches; returns True when all are done"""
+    batches_left = max_batches
+    for name, engine in engines(main_engine).items():
+        migrator = Migrator(name, engine, batches_left)
+        if not run_online(migrator):
+            return False
+        batches_left = migrator.batches_left
+    return True
+
+
+def online_pending(main_engine):
+    return any(row.completed_at is None
+               for engine in engines(main_engine).values()
+               for row in applied_versions(engine).values())
+
+
+def schedule_migrations(delay_seconds=0):
+    """Queue a run of the pending online parts unless one is already waiting"""
+    if not online_pending(db.engine):
+        return
+    waiting = BackgroundJob.query.filter_by(task='run_migrations', status='queued').first()
+    if not waiting:
+        enqueue('run_migrations', delay_seconds=delay_seconds)
+
+
+@task('run_migrations')
+def run_migrations():
+    if not migrate_online(db.engine, MIGRATION_MAX_BATCHES):
+        enqueue('run_migrations', delay_seconds=MIGRATION_BACKLOG_INTERVAL)
+    db.session.commit()
+
+
+def status(main_engine):
+    """(database, version, name, applied_at, completed_at, [step rows]) for every applied migration"""
+    result = []
+    for name, engine in engines(main_engine).items():
+        with engine.connect() as conn:
+            steps = conn.execute(select(step_table).order_by(step_table.c.version, step_table.c.step)).all()
+        for version, row in sorted(applied_versions(engine).items()):
+            result.append((name, version, row.name, row.applied_at, row.completed_at,
+                           [step for step in steps if step.version == version]))
+    return result
+
+
+def main(argv):
+    from app import app
+
+    # Importing the app applied the schema parts
+    with app.app_context():
+        if len(argv) > 1 and argv[1] == 'status':
+            for name, version, title, applied_at, completed_at, steps in status(db.engine):
+                state = f'complete {completed_at:%Y-%m-%d %H:%M}' if completed_at else 'online part pending'
+                print(f"{name:<16} {version:>3}  {title} - {state}")
+                for step in steps:
+                    print(f"{'':<21}{step.step}: {step.rows_done} rows, "
+                          f"{'done' if step.completed_at else f'at id {step.position}'}")
+            return 0
+        if len(argv) > 1:
+            print(__doc__.split('Usage:')[1].rstrip())
+            return 1
+        migrate_online(db.engine)
+    print(f"✓ Every database is at migration {MIGRATIONS[-1].version}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run as the imported module, whose task registration and shard engines the app uses
+    import migrations
+    sys.exit(migrations.main(sys.argv))
@@ -0,0 +1,230 @@
+"""
+Database models for the Civic Issues Reporting and Resolution System
+"""
+
+from datetime import datetime
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
+
+from shards import session_options
+from utils import parse_coordinates
+
+# Complaints are routed across district shards when SHARD_MAP is set (see shards.py)
+db = SQLAlchemy(session_options=session_options())
+
+# ==================== DATABASE MODELS ====================
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    phone = db.Column(db.String(10), unique=True, nullable=True)
+    user_id = db.Column(db.String(50), unique=True, nullable=True)
+    password = db.Column(db.String(255), nullable=True)
+    role = db.Column(db.String(20), nullable=False)  # citizen, municipal, dept, police
+    name = db.Column(db.String(100))
+    department = db.Column(db.String(100), nullable=True)
+    pincode = db.Column(db.String(6), nullable=True)
+    is_active = db.Column(db.Boolean, default=True)
+    # Sessions store the version they were issued under; bumping it revokes them
+    session_version = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, index=True)
+    complaints = db.relationship('Complaint', backref='reporter', lazy=True, foreign_keys='Complaint.reporter_id')
+
+class OTP(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    phone = db.Column(db.String(10), unique=True)
+    otp_code = db.Column(db.String(6))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    expires_at = db.Column(db.DateTime)
+
+class ComplaintColumns:
+    """Columns shared by live complaints and their archived copies"""
+    complaint_id = db.Column(db.String(32), unique=True)
+    reporter_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    phone = db.Column(db.String(15), nullable=True)
+    title = db.Column(db.String(100), nullable=False)
+    complaint_type = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.Text)
+    district = db.Column(db.String(50))
+    pincode = db.Column(db.String(6))
+    location = db.Column(db.String(200))
+    coordinates = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='submitted')  # submitted, assigned, resolved
+    priority = db.Column(db.String(10), default='medium')
+    photo_path = db.Column(db.String(255))
+    photo_data = db.Column(db.LargeBinary)
+    evidence_path = db.Column(db.String(255))
+    resolved_photo_path = db.Column(db.String(255))
+    resolved_coordinates = db.Column(db.String(50))
+    forwarded_department = db.Column(db.String(100), nullable=True)
+    suggested_department = db.Column(db.String(100), nullable=True)
+    routing_confidence = db.Column(db.Float, nullable=True)
+    auto_forwarded = db.Column(db.Boolean, default=False)  # forwarded by the routing model, not an officer
+    risk_score = db.Column(db.Float, nullable=True)
+    photo_hash = db.Column(db.String(32), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    verified_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    resolution_notes = db.Column(db.Text)
+    is_fake = db.Column(db.Boolean, default=False)
+    reporter_name = db.Column(db.String(100))
+    # Numeric copies of coordinates / resolved_coordinates for distance queries
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    resolved_latitude = db.Column(db.Float, nullable=True)
+    resolved_longitude = db.Column(db.Float, nullable=True)
+
+    @validates('coordinates', 'resolved_coordinates')
+    def split_coordinates(self, key, value):
+        prefix = 'resolved_' if key == 'resolved_coordinates' else ''
+        lat, lng = parse_coordinates(value) or (None, None)
+        setattr(self, prefix + 'latitude', lat)
+        setattr(self, prefix + 'longitude', lng)
+        return value
+
+class Complaint(ComplaintColumns, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    fake_investigation = db.relationship('FakeInvestigation', backref='complaint', lazy=True, uselist=False)
+    __table_args__ = (
+        db.Index('ix_complaint_status_updated_at', 'status', 'updated_at'),
+        db.Index('ix_complaint_pincode_risk_score', 'pincode', 'risk_score'),
+        db.Index('ix_complaint_latitude_longitude', 'latitude', 'longitude'),
+    )
+
+class FakeInvestigationColumns:
+    investigated_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    reason = db.Column(db.Text)
+    evidence = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+class FakeInvestigation(FakeInvestigationColumns, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'), unique=True)
+
+class ReporterStats(db.Model):
+    """Running fake-risk features for one reporter account or phone number"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(40), unique=True, nullable=False)  # reporter:<user id> or phone:<number>
+    submissions = db.Column(db.Integer, default=0)
+    fake_count = db.Column(db.Integer, default=0, index=True)
+    velocity = db.Column(db.Float, default=0.0)  # exponentially decayed submission count
+    last_submitted_at = db.Column(db.DateTime, nullable=True)
+    coord_count = db.Column(db.Integer, default=0)
+    mean_lat = db.Column(db.Float, default=0.0)
+    mean_lng = db.Column(db.Float, default=0.0)
+    coord_m2 = db.Column(db.Float, default=0.0)  # sum of squared distances from the mean, km^2
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class BackgroundJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text)  # JSON-encoded keyword arguments
+    status = db.Column(db.String(20), default='queued')  # queued, running, failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    run_at = db.Column(db.DateTime, default=datetime.now)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (db.Index('ix_background_job_status_run_at', 'status', 'run_at'),)
+
+class Setting(db.Model):
+    """State a background job keeps between runs, such as a scan watermark"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(50), unique=True, nullable=False)
+    value = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(100), nullable=False)  # phone:<number> or user:<id>
+    channel = db.Column(db.String(20), nullable=False)  # sms, inbox
+    address = db.Column(db.String(100), nullable=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'), nullable=True)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, sent
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_notification_status_id', 'status', 'id'),)
+
+class IdempotencyRecord(db.Model):
+    """Response of an operation synced from a device's outbox, replayed when the device retries its key"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False)  # JSON-encoded response body
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='uq_idempotency_record_user_key'),)
+
+# ==================== EVENT LOG ====================
+# Append-only history of complaint transitions (see events.py); rows are never updated
+
+class ComplaintEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # log position: consumers read in id order
+    complaint_id = db.Column(db.Integer, nullable=False)  # no foreign key: events outlive archival
+    action = db.Column(db.String(20), nullable=False)  # submit, forward, assign, start_work, update_status, resolve, mark_fake, report_fake, escalate
+    actor_id = db.Column(db.Integer, nullable=True)  # user id; None for the system (routing, SLA escalation)
+    from_status = db.Column(db.String(20), nullable=True)
+    to_status = db.Column(db.String(20), nullable=True)
+    department = db.Column(db.String(100), nullable=True)
+    payload = db.Column(db.Text, nullable=True)  # compact JSON of the action's details (notes, reason, priority, ...)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    __table_args__ = (db.Index('ix_complaint_event_complaint_id_id', 'complaint_id', 'id'),)
+
+class ComplaintSnapshot(db.Model):
+    """A complaint's state folded from its events up to last_event_id"""
+    id = db.Column(db.Integer, primary_key=True)
+    complaint_id = db.Column(db.Integer, unique=True, nullable=False)
+    last_event_id = db.Column(db.Integer, nullable=False)
+    event_count = db.Column(db.Integer, default=0)
+    state = db.Column(db.Text, nullable=False)  # JSON
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class EventCursor(db.Model):
+    """Position of a consumer (snapshots, rollups, replication, ...) in the event log"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    position = db.Column(db.Integer, default=0, nullable=False)  # id of the last event consumed
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+# ==================== RESOLUTION CHECKS ====================
+
+class ResolutionCheck(db.Model):
+    """Automated checks of a complaint's resolution proof (see verification.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    complaint_id = db.Column(db.Integer, unique=True, nullable=False)  # no foreign key: checks outlive archival
+    event_id = db.Column(db.Integer, nullable=False)  # the resolve event checked
+    department = db.Column(db.String(100), nullable=True)
+    pincode = db.Column(db.String(6), nullable=True)
+    distance_km = db.Column(db.Float, nullable=True)  # complaint coordinates to resolution coordinates
+    resolve_hours = db.Column(db.Float, nullable=True)
+    resolve_z = db.Column(db.Float, nullable=True)  # robust z-score of log time-to-resolve within the department
+    photo_similarity = db.Column(db.Float, nullable=True)  # 1 = before and after photos look the same
+    flags = db.Column(db.String(100), nullable=True)  # comma-separated: far_from_site, too_fast, same_photo, no_location, no_photo
+    status = db.Column(db.String(20), default='ok')  # ok, flagged, cleared, confirmed
+    reviewed_by = db.Column(db.Integer, nullable=True)
+    reviewed_at = db.Column(db.DateTime, nullable=True)
+    checked_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (db.Index('ix_resolution_check_status_pincode', 'status', 'pincode'),)
+
+# ==================== ARCHIVE ====================
+# Closed complaints moved out of the live tables by archive.py; rows keep their ids
+
+class ArchivedComplaint(ComplaintColumns, db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    archived_at = db.Column(db.DateTime, default=datetime.now)
+    reporter = db.relationship('User', foreign_keys='ArchivedComplaint.reporter_id')
+    fake_investigation = db.relationship('ArchivedFakeInvestigation', backref='complaint', lazy=True, uselist=False)
+    __table_args__ = (
+        db.Index('ix_archived_complaint_reporter_id', 'reporter_id'),
+        db.Index('ix_archived_complaint_pincode', 'pincode'),
+    )
+
+class ArchivedFakeInvestigation(FakeInvestigationColumns, db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    complaint_id = db.Column(db.Integer, db.ForeignKey('archived_complaint.id'), unique=True)
@@ -0,0 +1,254 @@
+"""
+Notification fan-out for complaint transitions.
+
+Request handlers call ``queue_fan_out()`` before committing a transition.
+Everything after that runs in the background job queue:
+
+1. ``fan_out_notifications`` resolves recipients (the reporter, every
+   department officer for forwards, and supervisors for SLA escalations) and
+   bulk-inserts ``Notification`` rows.
+2. ``dispatch_notifications`` runs after a short coalescing window, merges
+   each recipient's pending rows into one digest and delivers the digests
+   through the recipient's channel in batches, under a per-channel rate limit.
+
+Channels wrap a gateway object with a ``send_batch(channel, messages)``
+method. ``LoggingGateway`` is the default stand-in for a real provider and
+``FakeGateway`` records deliveries in memory for tests.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from logs import get_logger, log_event
+from models import db, BackgroundJob, Complaint, Notification, User
+from tasks import enqueue, task
+
+logger = get_logger('notifications')
+
+COALESCE_SECONDS = int(os.environ.get('NOTIFICATION_COALESCE_SECONDS', 30))
+DISPATCH_BATCH_SIZE = int(os.environ.get('NOTIFICATION_DISPATCH_BATCH', 5000))
+DIGEST_MAX_ITEMS = 5
+
+# Transitions that notify someone, and who
+NOTIFY_REPORTER = {'forward', 'resolve'}
+NOTIFY_DEPARTMENT = {'forward', 'escalate'}
+# Escalations of complaints not yet forwarded go to the pincode's municipal officers
+NOTIFY_MUNICIPAL = {'escalate'}
+
+
+# ==================== GATEWAYS AND CHANNELS ====================
+
+class LoggingGateway:
+    """Default gateway: logs each message (stand-in for an SMS/push provider)"""
+
+    def send_batch(self, channel, messages):
+        for address, text in messages:
+            log_event(logger, 'notification_sent', text, channel=channel, address=address)
+
+
+class FakeGateway:
+    """In-memory gateway for tests; records every delivered (channel, address, text) and each batch's size"""
+
+    def __init__(self):
+        self.sent = []
+        self.batches = []
+
+    def send_batch(self, channel, messages):
+        self.batches.append(len(messages))
+        self.sent.extend((channel, address, text) for address, text in messages)
+
+
+class TokenBucket:
+    """Blocking token bucket limiting deliveries per second"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, count=1):
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                time.sleep((count - self.tokens) / self.rate)
+
+
+class Channel:
+    """Delivers messages through a gateway in batches, under a rate limit"""
+
+    def __init__(self, name, gateway, batch_size=100, rate_per_second=100):
+        self.name = name
+        self.gateway = gateway
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate_per_second, burst=max(rate_per_second, batch_size))
+
+    def deliver(self, messages):
+        for start in range(0, len(messages), self.batch_size):
+            chunk = messages[start:start + self.batch_size]
+            self.bucket.take(len(chunk))
+            self.gateway.send_batch(self.name, chunk)
+
+
+CHANNELS = {}
+
+
+def register_channel(channel):
+    """Add or replace a delivery channel (e.g. with a FakeGateway in tests)"""
+    CHANNELS[channel.name] = channel
+    return channel
+
+
+# Bulk SMS providers accept around 100k messages a minute
+register_channel(Channel('sms', LoggingGateway(), rate_per_second=int(os.environ.get('SMS_RATE_PER_SECOND', 1700))))
+register_channel(Channel('inbox', LoggingGateway(), batch_size=1000, rate_per_second=5000))
+
+
+# ==================== FAN-OUT ====================
+
+def queue_fan_out(events):
+    """Queue notifications for transition events; call before the transition commits"""
+    events = [
+        {'complaint_id': e['complaint_id'], 'action': e['action'], 'department': e.get('department')}
+        for e in events if e['action'] in NOTIFY_REPORTER | NOTIFY_DEPARTMENT | NOTIFY_MUNICIPAL
+    ]
+    if events:
+        enqueue('fan_out_notifications', events=events)
+
+
+def reporter_message(complaint, action):
+    if action == 'forward':
+        return f"Your complaint {complaint.complaint_id} has been forwarded to {complaint.forwarded_department}."
+    return f"Your complaint {complaint.complaint_id} has been resolved."
+
+
+def officer_message(complaint, action):
+    if action == 'escalate':
+        return (f"Complaint {complaint.complaint_id} ({complaint.complaint_type}) has breached its SLA. "
+                f"Priority raised to {complaint.priority}.")
+    return f"New complaint {complaint.complaint_id} ({complaint.complaint_type}) at {complaint.location}, {complaint.pincode}."
+
+
+@task('fan_out_notifications')
+def fan_out_notifications(events):
+    """Resolve recipients for each event and store one pending Notification per recipient"""
+    complaint_ids = {e['complaint_id'] for e in events}
+    complaints = {c.id: c for c in Complaint.query.filter(Complaint.id.in_(complaint_ids))}
+
+    reporter_ids = {c.reporter_id for c in complaints.values()}
+    reporters = {u.id: u for u in User.query.filter(User.id.in_(reporter_ids))}
+
+    departments = {e['department'] for e in events if e['action'] in NOTIFY_DEPARTMENT and e.get('department')}
+    officers = {}
+    if departments:
+        for officer in User.query.filter(User.role == 'dept', User.department.in_(departments)):
+            officers.setdefault(officer.department, []).append(officer)
+
+    pincodes = {
+        complaints[e['complaint_id']].pincode for e in events
+        if e['action'] in NOTIFY_MUNICIPAL and not e.get('department') and e['complaint_id'] in complaints
+    }
+    municipal_officers = {}
+    if pincodes:
+        for officer in User.query.filter(User.role == 'municipal', User.pincode.in_(pincodes)):
+            municipal_officers.setdefault(officer.pincode, []).append(officer)
+
+    now = datetime.now()
+    rows = []
+    for event in events:
+        complaint = complaints.get(event['complaint_id'])
+        if not complaint:
+            continue
+        if event['action'] in NOTIFY_REPORTER:
+            reporter = reporters.get(complaint.reporter_id)
+            phone = complaint.phone or (reporter.phone if reporter else None)
+            if phone:
+                rows.append({
+                    'recipient': f'phone:{phone}', 'channel': 'sms', 'address': phone,
+                    'complaint_id': complaint.id, 'message': reporter_message(complaint, event['action']),
+                    'status': 'pending', 'created_at': now,
+                })
+        recipients = []
+        if event['action'] in NOTIFY_DEPARTMENT and event.get('department'):
+            recipients = officers.get(event['department'], [])
+        elif event['action'] in NOTIFY_MUNICIPAL:
+            recipients = municipal_officers.get(complaint.pincode, [])
+        for officer in recipients:
+            channel, address = ('sms', officer.phone) if officer.phone else ('inbox', officer.user_id)
+            rows.append({
+                'recipient': f'user:{officer.id}', 'channel': channel, 'address': address,
+                'complaint_id': complaint.id, 'message': officer_message(complaint, event['action']),
+                'status': 'pending', 'created_at': now,
+            })
+
+    if rows:
+        db.session.execute(insert(Notification), rows)
+        schedule_dispatch()
+    db.session.commit()
+
+
+def schedule_dispatch(delay_seconds=COALESCE_SECONDS):
+    """Queue a dispatch run unless one is already waiting to collect the same burst"""
+    waiting = BackgroundJob.query.filter_by(task='dispatch_notifications', status='queued').first()
+    if not waiting:
+        enqueue('dispatch_notifications', delay_seconds=delay_seconds)
+
+
+# ==================== DISPATCH ====================
+
+def build_digest(messages):
+    if len(messages) == 1:
+        return messages[0]
+    shown = ' '.join(messages[:DIGEST_MAX_ITEMS])
+    more = len(messages) - DIGEST_MAX_ITEMS
+    suffix = f" (+{more} more)" if more > 0 else ''
+    return f"{len(messages)} updates: {shown}{suffix}"
+
+
+@task('dispatch_notifications')
+def dispatch_notifications(limit=DISPATCH_BATCH_SIZE):
+    """Send pending notifications as one digest per recipient and channel"""
+    pending = db.session.query(
+        Notification.id, Notification.channel, Notification.recipient,
+        Notification.address, Notification.message
+    ).filter(Notification.status == 'pending').order_by(Notification.id).limit(limit).all()
+
+    digests = {}
+    for row in pending:
+        digest = digests.setdefault((row.channel, row.recipient), {'address': row.address, 'ids': [], 'messages': []})
+        digest['ids'].append(row.id)
+        digest['messages'].append(row.message)
+
+    by_channel = {}
+    for (channel, _), digest in digests.items():
+        by_channel.setdefault(channel, []).append(digest)
+
+    delivered_ids = []
+    try:
+        for channel_name, channel_digests in by_channel.items():
+            channel = CHANNELS[channel_name]
+            for start in range(0, len(channel_digests), channel.batch_size):
+                chunk = channel_digests[start:start + channel.batch_size]
+                channel.deliver([(d['address'], build_digest(d['messages'])) for d in chunk])
+                delivered_ids.extend(i for d in chunk for i in d['ids'])
+    finally:
+        # Record what went out even if a gateway fails, so retries never re-send it
+        if delivered_ids:
+            Notification.query.filter(Notification.id.in_(delivered_ids)).update(
+                {'status': 'sent', 'sent_at': datetime.now()}, synchronize_session=False
+            )
+            db.session.commit()
+
+    if len(pending) == limit:
+        enqueue('dispatch_notifications')
+        db.session.commit()
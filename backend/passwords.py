@@ -0,0 +1,134 @@
+"""
+Password hashing policy and bounded verification.
+
+PASSWORD_HASH_METHOD selects the algorithm and cost in Werkzeug's format,
+e.g. ``pbkdf2:sha256:600000`` or ``scrypt:32768:8:1``. Stored hashes record
+the method they were made with; ``needs_rehash`` compares it with the
+policy, and a successful login upgrades an outdated hash.
+
+Hashing is CPU-bound and holds the GIL, so a burst of logins would stall
+every other request in the same worker. Request-time hashing
+(``verify_password``, ``rehash_password``) therefore runs in a
+small process pool (PASSWORD_POOL_WORKERS processes per web process; 0
+hashes inline). At most PASSWORD_MAX_PENDING hashes may be queued or running
+per web process; a login that cannot get a slot within
+PASSWORD_QUEUE_TIMEOUT seconds (default: immediately) fails with
+``VerifierBusy`` and is answered 503 + Retry-After instead of holding a
+request thread while it waits. If a pool process dies (e.g. killed for
+memory) the pool is replaced and the hash retried once on the new one.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from logs import get_logger, log_event
+
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', 2))
+# Keep this below the web worker's thread count so waiting logins never hold every thread
+PASSWORD_MAX_PENDING = int(os.environ.get('PASSWORD_MAX_PENDING', max(PASSWORD_POOL_WORKERS, 1) * 2))
+# Waiting for a slot holds a request thread too, so by default busy logins fail at once
+PASSWORD_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_QUEUE_TIMEOUT', 0))
+# Pool processes run at lower CPU priority so page requests win when cores are scarce
+PASSWORD_POOL_NICE = int(os.environ.get('PASSWORD_POOL_NICE', 10))
+
+logger = get_logger('passwords')
+
+
+class VerifierBusy(Exception):
+    """Too many password hashes are already queued in this process"""
+
+
+_slots = threading.BoundedSemaphore(PASSWORD_MAX_PENDING)
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def lower_priority():
+    if PASSWORD_POOL_NICE and hasattr(os, 'nice'):
+        os.nice(PASSWORD_POOL_NICE)
+
+
+def get_pool():
+    """This process's hashing pool, created on first use (and again after a fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # forkserver children start clean: the web process has threads (logging, jobs) that fork would copy mid-lock
+                context = multiprocessing.get_context('forkserver' if os.name == 'posix' else 'spawn')
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS, mp_context=context,
+                                            initializer=lower_priority)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def discard_pool(pool):
+    """Stop using a broken pool; the next get_pool() starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_bounded(fn, *args):
+    """Run a hashing call in the pool (or inline), holding one of the pending slots"""
+    if not _slots.acquire(timeout=PASSWORD_QUEUE_TIMEOUT):
+        raise VerifierBusy()
+    try:
+        if PASSWORD_POOL_WORKERS <= 0:
+            return fn(*args)
+        pool = get_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A dead pool process breaks the whole executor: every later submit would fail too
+            log_event(logger, 'password_pool_broken', 'Password hashing pool broke; starting a new one',
+                      level=logging.WARNING)
+            discard_pool(pool)
+            return get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """Hash inline under the current policy (seeding, scripts); request handlers use rehash_password"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def rehash_password(password):
+    return run_bounded(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    if not password_hash or password is None:
+        return False
+    return run_bounded(check_password_hash, password_hash, password)
+
+
+def normalize_method(method):
+    """`method` with the defaults Werkzeug fills in, as recorded in its hashes ('scrypt' -> 'scrypt:32768:8:1')"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        return 'scrypt:' + ':'.join(args or ('32768', '8', '1'))
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+# Method prefix of hashes made under the current policy, e.g. 'pbkdf2:sha256:600000'
+POLICY_PREFIX = normalize_method(PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != POLICY_PREFIX
@@ -0,0 +1,199 @@
+"""
+Cached user principals and request authorization.
+
+A principal is the slice of a ``User`` row that authorization needs: role,
+department, pincode, active flag and session version. Principals are kept in
+two layers:
+
+* ``g.principal`` for the rest of the current request;
+* a per-process LRU (PRINCIPAL_CACHE_SIZE entries) whose entries live for at
+  most PRINCIPAL_CACHE_TTL seconds.
+
+Changes made through the ORM in this process evict the user's entry when the
+transaction commits. Other processes learn about changes by polling, at most
+once every PRINCIPAL_SYNC_INTERVAL seconds, for users whose ``updated_at``
+moved; a request therefore costs no query once its principal is cached.
+
+Sessions carry the ``session_version`` of the user at login. Bumping it
+(``revoke_sessions``) or deactivating the user invalidates every existing
+session of that user, without a per-request lookup.
+
+Usage:
+  python principals.py revoke <user id>      - Log the user out everywhere
+  python principals.py deactivate <user id>  - Block the user and log them out
+  python principals.py activate <user id>
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g, jsonify, redirect, session, url_for
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import db, User
+
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', 300))
+PRINCIPAL_SYNC_INTERVAL = float(os.environ.get('PRINCIPAL_SYNC_INTERVAL', 2))
+# Re-read this much history each sync so rows committed late are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+Principal = namedtuple('Principal', 'id role name phone department pincode is_active session_version')
+
+
+def load_principal(user_id):
+    row = db.session.query(
+        User.id, User.role, User.name, User.phone, User.department, User.pincode, User.is_active, User.session_version
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    return Principal(row.id, row.role, row.name, row.phone, row.department, row.pincode,
+                     row.is_active is not False, row.session_version or 0)
+
+
+class PrincipalCache:
+    """Thread-safe LRU of principals with a TTL and change polling"""
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL, sync_interval=PRINCIPAL_SYNC_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()  # user id -> (principal, expires at)
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._next_sync = 0.0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        if now >= self._next_sync:
+            self.sync(now)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+        principal = load_principal(user_id)
+        if principal is not None:
+            with self._lock:
+                self._entries[user_id] = (principal, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def sync(self, now=None):
+        """Evict users changed (in any process) since the previous sync"""
+        self._next_sync = (now or time.monotonic()) + self.sync_interval
+        if self._watermark is None:
+            # Nothing is cached before the first sync, so only the starting point matters
+            self._watermark = datetime.now()
+            return
+        changed = db.session.query(User.id, User.updated_at).filter(
+            User.updated_at >= self._watermark - SYNC_OVERLAP
+        ).all()
+        if changed:
+            self.invalidate(*(row.id for row in changed))
+            self._watermark = max(self._watermark, max(row.updated_at for row in changed))
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def track_user_change(mapper, connection, target):
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def evict_changed_users(orm_session):
+    changed = orm_session.info.pop('changed_user_ids', None)
+    if changed:
+        principal_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_changed_users(orm_session):
+    orm_session.info.pop('changed_user_ids', None)
+
+
+# ==================== AUTHORIZATION ====================
+
+def current_principal():
+    """The logged-in principal, or None when there is no valid session"""
+    if 'principal' in g:
+        return g.principal
+    principal = None
+    user_id = session.get('user_id')
+    if user_id is not None:
+        principal = principal_cache.get(user_id)
+        # Deactivated users, revoked sessions and role changes all require a new login
+        if principal and (not principal.is_active
+                          or session.get('session_version', 0) != principal.session_version
+                          or session.get('role') != principal.role):
+            principal = None
+    g.principal = principal
+    return principal
+
+
+def start_session(user):
+    """Start a fresh login session for `user`"""
+    session.clear()
+    session['user_id'] = user.id
+    session['role'] = user.role
+    session['name'] = user.name
+    session['session_version'] = user.session_version or 0
+
+
+def authorize(*roles):
+    """Require a valid, unrevoked session, and one of `roles` when given"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            principal = current_principal()
+            if principal is None:
+                session.clear()
+                return redirect(url_for('index'))
+            if roles and principal.role not in roles:
+                return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def revoke_sessions(user):
+    """Invalidate every existing session of `user` (takes effect on commit)"""
+    user.session_version = (user.session_version or 0) + 1
+    user.updated_at = datetime.now()
+
+
+if __name__ == '__main__':
+    commands = ('revoke', 'deactivate', 'activate')
+    if len(sys.argv) != 3 or sys.argv[1] not in commands:
+        print(__doc__.split('Usage:')[1].rstrip())
+        sys.exit(1)
+    from app import app
+    with app.app_context():
+        user = db.session.get(User, int(sys.argv[2]))
+        if not user:
+            sys.exit(f"No user with id {sys.argv[2]}")
+        if sys.argv[1] in ('deactivate', 'activate'):
+            user.is_active = sys.argv[1] == 'activate'
+        revoke_sessions(user)
+        db.session.commit()
+        print(f"✓ {sys.argv[1]}: user {user.id} ({user.name}), existing sessions revoked")
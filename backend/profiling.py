@@ -0,0 +1,210 @@
+"""
+Opt-in request profiling and slow-request capture.
+
+A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or is
+picked by PROFILE_SAMPLE_RATE. While it runs, a shared sampler thread reads
+its stack every PROFILE_INTERVAL_MS via ``sys._current_frames()`` and counts
+folded stacks (``outer;inner;leaf count``, the input format of flamegraph.pl
+and speedscope).
+
+When SLOW_REQUEST_MS is set, every request also keeps a trace of its SQL
+statements. A request slower than the threshold, or explicitly profiled via
+the header, is written to PROFILE_DIR as ``<id>.json`` (route, timings, SQL
+trace) plus ``<id>.folded`` when stacks were sampled. Only the newest
+PROFILE_RING_SIZE captures are kept.
+
+Stack sampling needs one OS thread per request. Under gevent workers
+every request is a greenlet on the same thread, so ``sys._current_frames()``
+cannot tell them apart; there the sampler is not started (a warning is
+logged once), and requests are still captured with their timings and SQL
+trace.
+
+With none of these settings the hooks are not installed at all.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+from logs import get_logger, log_event
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'profiles'
+)
+PROFILE_RING_SIZE = int(os.environ.get('PROFILE_RING_SIZE', 200))
+MAX_SQL_TRACE = 500
+
+logger = get_logger('profiling')
+
+
+class StackSampler:
+    """One background thread sampling the stacks of all currently profiled threads"""
+
+    def __init__(self, interval_seconds):
+        self.interval = interval_seconds
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._thread = None
+        self._pid = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[fold_stack(frame)] += 1
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+stack_sampling = True  # cleared by init_profiling() under gevent
+
+
+def profiling_enabled():
+    return bool(PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0 or SLOW_REQUEST_MS > 0)
+
+
+def greenlet_worker():
+    """Whether gevent has patched threading, making requests greenlets that share one OS thread"""
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('threading'))
+
+
+# ==================== CAPTURE RING ====================
+
+def write_capture(record, stacks):
+    """Write one capture and drop the oldest beyond PROFILE_RING_SIZE"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, record['id'])
+    if stacks:
+        with open(base + '.folded', 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    with open(base + '.json', 'w') as f:
+        json.dump(record, f, indent=1)
+
+    captures = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    for name in captures[:-PROFILE_RING_SIZE] if len(captures) > PROFILE_RING_SIZE else []:
+        for suffix in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+# ==================== HOOKS ====================
+
+def before_request():
+    requested = PROFILE_TOKEN and request.headers.get('X-Profile') == PROFILE_TOKEN
+    g.profile_requested = bool(requested)
+    g.profile_sampled = bool(requested or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE))
+    g.profile_started = time.perf_counter()
+    g.sql_trace = [] if SLOW_REQUEST_MS > 0 or g.profile_sampled else None
+    if g.profile_sampled and stack_sampling:
+        sampler.start(threading.get_ident())
+
+
+def after_request(response):
+    started = g.pop('profile_started', None)
+    if started is None:
+        return response
+    stacks = sampler.stop(threading.get_ident()) if g.profile_sampled and stack_sampling else None
+    duration_ms = (time.perf_counter() - started) * 1000
+    slow = SLOW_REQUEST_MS > 0 and duration_ms >= SLOW_REQUEST_MS
+    if not (slow or g.profile_requested or (stacks and g.profile_sampled)):
+        return response
+
+    # Ids sort by time, which keeps the ring's "oldest first" cheap
+    capture_id = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{uuid.uuid4().hex[:6]}"
+    sql_trace = g.pop('sql_trace', None) or []
+    write_capture({
+        'id': capture_id,
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 3),
+        'slow': slow,
+        'sql_count': len(sql_trace),
+        'sql_ms': round(sum(ms for _, ms in sql_trace), 3),
+        'sql': [{'statement': statement, 'ms': round(ms, 3)} for statement, ms in sql_trace],
+        'samples': sum(stacks.values()) if stacks else 0,
+    }, stacks)
+    if g.profile_requested:
+        response.headers['X-Profile-Id'] = capture_id
+    return response
+
+
+def teardown_request(exc):
+    # after_request is skipped when a view raises; never leave the thread registered
+    if g.get('profile_sampled') and stack_sampling:
+        sampler.stop(threading.get_ident())
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['profile_started'] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('profile_started', None)
+    # Statements also run outside requests (start-up, background jobs)
+    trace = g.get('sql_trace') if started is not None and has_app_context() else None
+    if trace is not None and len(trace) < MAX_SQL_TRACE:
+        trace.append((statement, (time.perf_counter() - started) * 1000))
+
+
+def init_profiling(app, engine):
+    """Install the profiling hooks; a no-op unless profiling is configured"""
+    global stack_sampling
+    if not profiling_enabled():
+        return False
+    if greenlet_worker():
+        stack_sampling = False
+        if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0:
+            log_event(logger, 'profile_sampling_disabled',
+                      'Stack sampling is not supported under gevent; captures will have no stacks',
+                      level=logging.WARNING)
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    return True
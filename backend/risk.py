@@ -0,0 +1,239 @@
+"""
+Fake-complaint risk scoring.
+
+Every submission is scored against running aggregates kept per reporter
+account and per phone number in ``ReporterStats``:
+
+* prior fake rate, from complaints later marked fake by a department or police;
+* submission velocity, an exponentially decayed count of recent submissions;
+* coordinate spread, the RMS distance (km) of past complaint locations from
+  their centroid, updated with Welford's online algorithm;
+* photo reuse, the number of earlier complaints carrying the same photo hash.
+
+The aggregates are updated incrementally in the submitting transaction (and
+can be rebuilt from history with ``python risk.py rebuild``), so
+scoring is two primary-key lookups, one indexed count and a handful of
+arithmetic operations. The result is stored in ``Complaint.risk_score``.
+"""
+
+import base64
+import hashlib
+import math
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, ArchivedComplaint, Complaint, ReporterStats, User
+from utils import parse_coordinates
+
+VELOCITY_HALF_LIFE_HOURS = 24
+WIDE_SPREAD_KM = 50
+# Logistic weights: risk = sigmoid(bias + sum(weight * feature))
+RISK_WEIGHTS = {
+    'bias': -3.0,
+    'fake_rate': 5.0,
+    'log_velocity': 0.8,
+    'wide_spread': 0.7,
+    'photo_reused': 2.5,
+}
+# Submissions scoring at or above this are never auto-forwarded; they wait for a reviewer
+AUTO_FORWARD_MAX_RISK = float(os.environ.get('RISK_AUTO_FORWARD_MAX', 0.5))
+KM_PER_DEGREE = 111.0
+PHOTO_SAMPLE_BYTES = 64 * 1024
+
+
+def photo_fingerprint(photo_data):
+    """Cheap fingerprint of a base64 photo: its length plus its first and last 64 KB"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(photo_data)).encode())
+    digest.update(photo_data[:PHOTO_SAMPLE_BYTES].encode())
+    digest.update(photo_data[-PHOTO_SAMPLE_BYTES:].encode())
+    return digest.hexdigest()
+
+
+def photo_file_fingerprint(path):
+    """photo_fingerprint() of the base64 encoding of the file at `path`, reading only its ends"""
+    groups = -(-os.path.getsize(path) // 3)  # base64 encodes each 3 bytes as 4 characters
+    sample_groups = PHOTO_SAMPLE_BYTES // 4
+    with open(path, 'rb') as f:
+        head = f.read(sample_groups * 3)
+        f.seek(max(groups - sample_groups, 0) * 3)
+        tail = f.read()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(groups * 4).encode())
+    digest.update(base64.b64encode(head)[:PHOTO_SAMPLE_BYTES])
+    digest.update(base64.b64encode(tail)[-PHOTO_SAMPLE_BYTES:])
+    return digest.hexdigest()
+
+
+def stats_keys(reporter_id, phone):
+    keys = [f'reporter:{reporter_id}']
+    if phone:
+        keys.append(f'phone:{phone}')
+    return keys
+
+
+def create_stats(keys):
+    """Insert the missing stats rows for `keys`, race-free"""
+    insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+    db.session.execute(
+        insert(ReporterStats).values([{'key': key} for key in keys]).on_conflict_do_nothing(index_elements=['key'])
+    )
+
+
+def load_stats(keys):
+    """Fetch (creating if missing) the stats rows for `keys`, race-free"""
+    create_stats(keys)
+    return ReporterStats.query.filter(ReporterStats.key.in_(keys)).all()
+
+
+def decayed_velocity(stats, now):
+    if not stats.last_submitted_at:
+        return 0.0
+    hours = max((now - stats.last_submitted_at).total_seconds() / 3600, 0)
+    return (stats.velocity or 0.0) * 0.5 ** (hours / VELOCITY_HALF_LIFE_HOURS)
+
+
+def spread_km(stats):
+    if not stats.coord_count:
+        return 0.0
+    return math.sqrt((stats.coord_m2 or 0.0) / stats.coord_count)
+
+
+def score(stats_rows, photo_reuse_count, now):
+    """Risk in [0, 1] from the aggregates as they were before this submission"""
+    fake_rate = max(((s.fake_count or 0) / ((s.submissions or 0) + 2) for s in stats_rows), default=0.0)
+    velocity = max((decayed_velocity(s, now) for s in stats_rows), default=0.0)
+    spread = max((spread_km(s) for s in stats_rows), default=0.0)
+    z = (RISK_WEIGHTS['bias']
+         + RISK_WEIGHTS['fake_rate'] * fake_rate
+         + RISK_WEIGHTS['log_velocity'] * math.log1p(velocity)
+         + RISK_WEIGHTS['wide_spread'] * (spread > WIDE_SPREAD_KM)
+         + RISK_WEIGHTS['photo_reused'] * (photo_reuse_count > 0))
+    return 1 / (1 + math.exp(-z))
+
+
+def record_submission(stats, coordinates, now):
+    stats.velocity = decayed_velocity(stats, now) + 1
+    stats.last_submitted_at = now
+    stats.submissions = (stats.submissions or 0) + 1
+    if coordinates:
+        lat, lng = coordinates
+        stats.coord_count = (stats.coord_count or 0) + 1
+        delta_lat = lat - (stats.mean_lat or 0.0)
+        delta_lng = lng - (stats.mean_lng or 0.0)
+        stats.mean_lat = (stats.mean_lat or 0.0) + delta_lat / stats.coord_count
+        stats.mean_lng = (stats.mean_lng or 0.0) + delta_lng / stats.coord_count
+        # Welford update on an equirectangular projection, in km^2
+        cos_lat = math.cos(math.radians(lat))
+        stats.coord_m2 = (stats.coord_m2 or 0.0) + (
+            delta_lat * (lat - stats.mean_lat)
+            + delta_lng * (lng - stats.mean_lng) * cos_lat ** 2
+        ) * KM_PER_DEGREE ** 2
+
+
+def assess_submission(complaint, photo_data=None):
+    """Score `complaint` (not yet flushed) and fold it into its reporter's aggregates"""
+    now = datetime.now()
+    if photo_data:
+        complaint.photo_hash = photo_fingerprint(photo_data)
+    photo_reuse_count = 0
+    if complaint.photo_hash:
+        # Old photos resubmitted count too, so the archive is checked as well
+        photo_reuse_count = sum(model.query.filter_by(photo_hash=complaint.photo_hash).count()
+                                for model in (Complaint, ArchivedComplaint))
+
+    stats_rows = load_stats(stats_keys(complaint.reporter_id, complaint.phone))
+    complaint.risk_score = score(stats_rows, photo_reuse_count, now)
+    coordinates = parse_coordinates(complaint.coordinates)
+    for stats in stats_rows:
+        record_submission(stats, coordinates, now)
+    return complaint.risk_score
+
+
+def record_fakes(complaint_ids):
+    """Count newly confirmed fakes against their reporters; call once per complaint"""
+    complaints = db.session.query(Complaint.reporter_id, Complaint.phone).filter(Complaint.id.in_(complaint_ids)).all()
+    increments = {}
+    for complaint in complaints:
+        for key in stats_keys(complaint.reporter_id, complaint.phone):
+            increments[key] = increments.get(key, 0) + 1
+    if not increments:
+        return
+    create_stats(list(increments))
+    keys_by_increment = {}
+    for key, increment in increments.items():
+        keys_by_increment.setdefault(increment, []).append(key)
+    # Incremented in SQL, so concurrent mark-fake transactions cannot lose each other's counts
+    for increment, keys in keys_by_increment.items():
+        db.session.execute(
+            update(ReporterStats).where(ReporterStats.key.in_(keys))
+            .values(fake_count=func.coalesce(ReporterStats.fake_count, 0) + increment),
+            execution_options={'synchronize_session': False},
+        )
+
+
+def repeat_offenders(limit=50):
+    """Reporters and phone numbers ranked by confirmed fakes, then fake rate"""
+    rows = ReporterStats.query.filter(ReporterStats.fake_count > 0).order_by(
+        ReporterStats.fake_count.desc(),
+        (ReporterStats.fake_count * 1.0 / func.nullif(ReporterStats.submissions, 0)).desc()
+    ).limit(limit).all()
+
+    user_ids = [int(r.key.split(':', 1)[1]) for r in rows if r.key.startswith('reporter:')]
+    users = {u.id: u for u in User.query.filter(User.id.in_(user_ids))} if user_ids else {}
+
+    result = []
+    for r in rows:
+        kind, value = r.key.split(':', 1)
+        user = users.get(int(value)) if kind == 'reporter' else None
+        result.append({
+            'kind': kind,
+            'reporter_id': int(value) if kind == 'reporter' else None,
+            'phone': value if kind == 'phone' else (user.phone if user else None),
+            'name': user.name if user else None,
+            'submissions': r.submissions or 0,
+            'fake_count': r.fake_count,
+            'fake_rate': round(r.fake_count / max(r.submissions or 0, 1), 3),
+            'last_submitted_at': r.last_submitted_at.strftime('%Y-%m-%d %H:%M:%S') if r.last_submitted_at else None,
+        })
+    return result
+
+
+def rebuild_stats():
+    """Recompute every reporter's aggregates from the complaint history, archive included"""
+    ReporterStats.query.delete()
+    stats_by_key = {}
+    history = union_all(*(
+        select(model.reporter_id, model.phone, model.coordinates, model.created_at, model.is_fake)
+        for model in (Complaint, ArchivedComplaint)
+    )).subquery()
+    complaints = db.session.execute(
+        select(history).order_by(history.c.created_at).execution_options(yield_per=1000)
+    )
+    for complaint in complaints:
+        coordinates = parse_coordinates(complaint.coordinates)
+        for key in stats_keys(complaint.reporter_id, complaint.phone):
+            stats = stats_by_key.setdefault(key, ReporterStats(
+                key=key, submissions=0, fake_count=0, velocity=0.0,
+                coord_count=0, mean_lat=0.0, mean_lng=0.0, coord_m2=0.0
+            ))
+            record_submission(stats, coordinates, complaint.created_at or datetime.now())
+            if complaint.is_fake:
+                stats.fake_count += 1
+    db.session.add_all(stats_by_key.values())
+    db.session.commit()
+    print(f"✓ Rebuilt risk features for {len(stats_by_key)} reporters and phone numbers")
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        from app import app
+        with app.app_context():
+            rebuild_stats()
+    else:
+        print("Usage: python risk.py rebuild  - Recompute reporter features from history")
@@ -0,0 +1,194 @@
+"""
+Automatic department routing for new complaints.
+
+Two sources vote on the department for a complaint:
+
+* the rules table (``utils.DEPARTMENT_ROUTING_RULES``), compiled once into a
+  dict keyed by (complaint_type, pincode prefix) and matched longest prefix
+  first;
+* an optional multinomial Naive Bayes classifier over the description,
+  trained offline on historical forwards and loaded once per process.
+
+A department's confidence is the rule confidence when there is no
+classifier, otherwise the mean of the rule's vote and the classifier's
+probability. With ROUTING_AUTO_FORWARD=1 a complaint is forwarded at submit
+time when the classifier alone gives the predicted department at least
+ROUTING_AUTO_FORWARD_CONFIDENCE and the submission's fake-risk score is
+below RISK_AUTO_FORWARD_MAX (see risk.py); a rule hit never forwards by itself.
+Auto-forwarded complaints are flagged and left out of training, so the
+model never learns from its own decisions.
+
+Usage:
+  python routing.py train  - Train the classifier from forwarded complaints
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import select, union_all
+
+from models import db, ArchivedComplaint, Complaint
+from utils import DEPARTMENT_ROUTING_RULES
+
+MODEL_PATH = Path(os.environ.get(
+    'ROUTING_MODEL_PATH',
+    Path(__file__).resolve().parent.parent / 'database' / 'routing_model.json'
+))
+AUTO_FORWARD = os.environ.get('ROUTING_AUTO_FORWARD', '0') == '1'
+AUTO_FORWARD_CONFIDENCE = float(os.environ.get('ROUTING_AUTO_FORWARD_CONFIDENCE', 0.9))
+MAX_VOCABULARY = 5000
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'near', 'not', 'of', 'on', 'the', 'there', 'this', 'to', 'was', 'with'
+}
+
+
+def tokenize(text):
+    return [w for w in re.findall(r'\w+', (text or '').lower()) if w not in STOPWORDS and not w.isdigit()]
+
+
+class TextClassifier:
+    """Multinomial Naive Bayes over description tokens"""
+
+    def __init__(self, log_priors, log_likelihoods, unknown_log_likelihoods):
+        self.log_priors = log_priors
+        self.log_likelihoods = log_likelihoods
+        self.unknown_log_likelihoods = unknown_log_likelihoods
+
+    @classmethod
+    def train(cls, samples):
+        """Fit from (description, department) pairs"""
+        class_counts = Counter()
+        word_counts = {}
+        vocabulary = Counter()
+        for text, department in samples:
+            tokens = tokenize(text)
+            class_counts[department] += 1
+            word_counts.setdefault(department, Counter()).update(tokens)
+            vocabulary.update(tokens)
+
+        words = [w for w, _ in vocabulary.most_common(MAX_VOCABULARY)]
+        total = sum(class_counts.values())
+        log_priors = {d: math.log(n / total) for d, n in class_counts.items()}
+        log_likelihoods = {}
+        unknown = {}
+        for department, counts in word_counts.items():
+            denominator = sum(counts[w] for w in words) + len(words) + 1
+            log_likelihoods[department] = {w: math.log((counts[w] + 1) / denominator) for w in words if counts[w]}
+            unknown[department] = math.log(1 / denominator)
+        return cls(log_priors, log_likelihoods, unknown)
+
+    def predict_proba(self, text):
+        tokens = tokenize(text)
+        scores = {}
+        for department, prior in self.log_priors.items():
+            likelihoods = self.log_likelihoods[department]
+            missing = self.unknown_log_likelihoods[department]
+            scores[department] = prior + sum(likelihoods.get(t, missing) for t in tokens)
+        top = max(scores.values())
+        exp_scores = {d: math.exp(s - top) for d, s in scores.items()}
+        total = sum(exp_scores.values())
+        return {d: s / total for d, s in exp_scores.items()}
+
+    def to_dict(self):
+        return {
+            'log_priors': self.log_priors,
+            'log_likelihoods': self.log_likelihoods,
+            'unknown_log_likelihoods': self.unknown_log_likelihoods,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['log_priors'], data['log_likelihoods'], data['unknown_log_likelihoods'])
+
+
+class DepartmentRouter:
+    """Predicts the department for a complaint from its type, pincode and description"""
+
+    def __init__(self, rules=DEPARTMENT_ROUTING_RULES, classifier=None):
+        self.rules = {(complaint_type, prefix): (department, confidence)
+                      for complaint_type, prefix, department, confidence in rules}
+        self.classifier = classifier
+
+    def match_rule(self, complaint_type, pincode):
+        pincode = pincode or ''
+        for length in range(len(pincode), -1, -1):
+            rule = self.rules.get((complaint_type, pincode[:length]))
+            if rule:
+                return rule
+        return None, 0.0
+
+    def predict(self, complaint_type, pincode, description):
+        """
+        Return (department, confidence, model confidence); department is None when
+        nothing matches. Model confidence is the classifier's probability for that
+        department alone, 0.0 without a classifier.
+        """
+        rule_department, rule_confidence = self.match_rule(complaint_type, pincode)
+        if not self.classifier:
+            return rule_department, rule_confidence, 0.0
+
+        probabilities = self.classifier.predict_proba(description)
+        candidates = set(probabilities) | ({rule_department} if rule_department else set())
+        scores = {
+            d: ((rule_confidence if d == rule_department else 0.0) + probabilities.get(d, 0.0)) / 2
+            for d in candidates
+        }
+        department = max(scores, key=scores.get)
+        return department, scores[department], probabilities.get(department, 0.0)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return this process's router, loading the trained classifier on first use"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                classifier = None
+                if MODEL_PATH.exists():
+                    with open(MODEL_PATH) as f:
+                        classifier = TextClassifier.from_dict(json.load(f))
+                _router = DepartmentRouter(classifier=classifier)
+    return _router
+
+
+def train_model(path=MODEL_PATH):
+    """Train the classifier on complaints (live and archived) forwarded by an officer and not marked fake"""
+    samples = db.session.execute(union_all(*(
+        select(model.description, model.forwarded_department).where(
+            model.forwarded_department.isnot(None),
+            model.forwarded_department != '',
+            model.is_fake.isnot(True),
+            model.auto_forwarded.isnot(True)
+        )
+        for model in (Complaint, ArchivedComplaint)
+    ))).all()
+    if not samples:
+        print("No forwarded complaints to train on.")
+        return None
+    classifier = TextClassifier.train(samples)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(classifier.to_dict(), f)
+    print(f"✓ Trained routing model on {len(samples)} complaints ({len(classifier.log_priors)} departments): {path}")
+    return classifier
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'train':
+        from app import app
+        with app.app_context():
+            train_model()
+    else:
+        print("Usage: python routing.py train")
@@ -0,0 +1,70 @@
+"""
+Serving profile: database pool settings and request body buffering.
+
+The app runs under any of gunicorn's sync, gthread or gevent workers
+(gunicorn.conf.py picks one from WEB_WORKER_CLASS). Under gevent the worker
+is cooperative: while a greenlet waits on the network, e.g. for the rest of
+a slow mobile upload, the worker serves other requests. Two things keep that
+true here:
+
+* request bodies are read in full before the view runs, so the slow part of
+  an upload happens before authorization touches the database and no pooled
+  connection is held while the client is still sending;
+* the SQLAlchemy pool is bounded for many concurrent greenlets (DB_POOL_SIZE +
+  DB_MAX_OVERFLOW connections per process, waiting at most DB_POOL_TIMEOUT
+  seconds for one) and checks connections before reuse.
+
+PostgreSQL is the database to pair with gevent (gunicorn.conf.py makes
+psycopg2 cooperative when psycogreen is installed). SQLite works, but its
+calls cannot yield: a write waiting on SQLite's lock stalls every request in
+that worker until the lock frees. File databases are therefore switched to
+SQLITE_JOURNAL_MODE (default WAL), where readers never wait for writers and
+only writes contend.
+"""
+
+import os
+
+from flask import request
+from sqlalchemy.exc import OperationalError
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+
+
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`"""
+    if database_uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def buffer_request_body():
+    """Read the whole body up front (subject to MAX_CONTENT_LENGTH) so views never wait on the client"""
+    if request.content_length or request.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        request.get_data(cache=True)
+
+
+def set_journal_mode(engine):
+    """Switch a SQLite file database to SQLITE_JOURNAL_MODE (persistent, so once per database is enough)"""
+    if engine.dialect.name != 'sqlite' or not engine.url.database or engine.url.database == ':memory:':
+        return
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    except OperationalError:
+        pass  # Another process holds the database right now; it switches it, or the next start does
+
+
+def init_serving(app, engine):
+    app.before_request(buffer_request_body)
+    if SQLITE_JOURNAL_MODE:
+        set_journal_mode(engine)
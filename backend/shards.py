@@ -0,0 +1,678 @@
+"""
+District sharding of the complaint store.
+
+With SHARD_MAP pointing at a JSON map, the ``complaint`` and
+``archived_complaint`` tables are spread over one database per district, so
+complaint writes in different districts stop queueing on a single SQLite
+writer lock. Everything else (users, jobs, notifications, risk stats, fake
+investigations) stays on the main database (DATABASE_URL), which is also the
+shard for districts the map does not name.
+
+  {"shards":    {"chennai": "sqlite:///shards/chennai.db", ...},
+   "districts": {"Chennai": "chennai", ...}}
+
+Relative SQLite paths are resolved against the map's directory. Without
+SHARD_MAP nothing changes: one database, the default session.
+
+Routing happens in the session (SQLAlchemy's horizontal sharding), so the
+views and jobs query Complaint as before:
+
+* a new complaint goes to its district's shard and gets an id encoding that
+  district (ID_BASE + sequence * ID_STRIDE + district slot, the sequence kept
+  per district in ``shard_sequence``), so a lookup by id reads one shard;
+* queries restricted by id, district, pincode or reporter read only the
+  shards holding them; pincodes and reporters are resolved through
+  ``shard_directory`` on the main database, which records every
+  (pincode/reporter, district) pair as complaints are filed;
+* anything else (police or municipal with no pincode, SLA scans, training)
+  fans out to every shard. Results are merged as one query would return
+  them: re-sorted on ORDER BY columns that are in the result, LIMIT/OFFSET
+  applied to the merged rows, and COUNT/SUM/MAX/MIN with no GROUP BY
+  combined into one row. Bulk UPDATE/DELETE report the summed rowcount.
+
+Limits: a transaction spanning shards commits on each separately (no
+atomicity across databases), foreign keys into the sharded tables are not
+enforced, GROUP BY fans out to one group per shard, and complaints filed
+before sharding keep their plain ids, which are looked up shard by shard.
+The main database still takes the bookkeeping each request writes (jobs,
+notifications, risk stats), so it stays the ceiling for submissions.
+
+The map is read at start-up. To change it, stop the web and worker
+processes, run ``move`` (or edit the map and run ``rebalance``), start them.
+
+Usage:
+  python shards.py init               - Give every district its own SQLite shard and move rows there
+  python shards.py status             - Complaints per shard and district
+  python shards.py move DISTRICT SHARD [URL] - Put DISTRICT on SHARD (a new SQLite file unless URL), then rebalance
+  python shards.py rebalance          - Move rows that are not on their district's shard
+"""
+
+import json
+import os
+import re
+import sys
+
+from sqlalchemy import (BigInteger, Column, Integer, MetaData, String, Table, UniqueConstraint,
+                        create_engine, event, func, insert, make_url, select, text, update)
+from sqlalchemy.ext.horizontal_shard import ShardedSession, set_shard_id
+from sqlalchemy.orm import Mapper
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Label, UnaryExpression
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.selectable import AliasedReturnsRows, Select
+from sqlalchemy.sql.util import find_tables
+
+from logs import get_logger, log_event
+from serving import SQLITE_JOURNAL_MODE, engine_options, set_journal_mode
+from utils import DISTRICTS
+
+logger = get_logger('shards')
+
+SHARD_MAP = os.environ.get('SHARD_MAP', '')
+SHARD_REBALANCE_BATCH_SIZE = int(os.environ.get('SHARD_REBALANCE_BATCH_SIZE', 500))
+MAIN_SHARD = 'main'
+SHARDED_TABLES = ('complaint', 'archived_complaint')
+ID_BASE = 1 << 40
+ID_STRIDE = 64  # > len(DISTRICTS); slot 0 is for districts outside the list
+
+# Bookkeeping tables: shard_sequence lives on every shard, shard_directory on main
+metadata = MetaData()
+sequence_table = Table(
+    'shard_sequence', metadata,
+    Column('slot', Integer, primary_key=True),
+    Column('value', BigInteger, nullable=False, default=0),
+)
+directory_table = Table(
+    'shard_directory', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(10), nullable=False),  # pincode, reporter
+    Column('value', String(50), nullable=False),
+    Column('district', String(50), nullable=False),  # '' when the complaint had none
+    UniqueConstraint('kind', 'value', 'district', name='uq_shard_directory_kind_value_district'),
+)
+# Complaint column -> directory kind
+DIRECTORY_COLUMNS = {'pincode': 'pincode', 'reporter_id': 'reporter'}
+
+shard_urls = {}  # shard name -> database URL (main excluded)
+district_shards = {}  # district -> shard name
+_engines = {}  # shard name -> Engine (main excluded)
+_recorded = set()  # directory entries known to be committed
+
+
+class ShardingError(Exception):
+    """A statement the shard router cannot place"""
+
+
+# ==================== SHARD MAP ====================
+
+def resolve_url(url, base):
+    """`url` with a relative SQLite path made relative to `base`"""
+    url = make_url(url)
+    if url.drivername.startswith('sqlite') and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(base, url.database))
+    return url.render_as_string(hide_password=False)
+
+
+def load_map(path):
+    """(shard name -> URL, district -> shard name) from the map at `path`; empty if it does not exist yet"""
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path) as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    urls = {name: resolve_url(url, base) for name, url in data.get('shards', {}).items() if name != MAIN_SHARD}
+    districts = data.get('districts', {})
+    unknown = set(districts.values()) - set(urls) - {MAIN_SHARD}
+    if unknown:
+        raise ValueError(f"{path}: districts mapped to undefined shards {sorted(unknown)}")
+    return urls, districts
+
+
+def configure(path=SHARD_MAP):
+    """(Re)load the shard map and open an engine per shard"""
+    urls, districts = load_map(path)
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
+    shard_urls.clear()
+    shard_urls.update(urls)
+    district_shards.clear()
+    district_shards.update(districts)
+    for name, url in urls.items():
+        _engines[name] = create_engine(url, **engine_options(url))
+
+
+def sharding_enabled():
+    return bool(SHARD_MAP)
+
+
+def shard_names():
+    """Every shard, main first"""
+    return [MAIN_SHARD] + list(_engines)
+
+
+def shard_for_district(district):
+    return district_shards.get(district or '', MAIN_SHARD)
+
+
+def district_slot(district):
+    """Position of `district` in DISTRICTS plus one; 0 for anything else"""
+    try:
+        return DISTRICTS.index(district) + 1
+    except ValueError:
+        return 0
+
+
+def shard_for_id(complaint_id):
+    """Shard holding the complaint with this id, or None for ids given out before sharding"""
+    if not isinstance(complaint_id, int) or complaint_id < ID_BASE:
+        return None
+    slot = (complaint_id - ID_BASE) % ID_STRIDE
+    return shard_for_district(DISTRICTS[slot - 1] if 0 < slot <= len(DISTRICTS) else None)
+
+
+def pinned(shard_id):
+    """Execution options running a statement on one shard (ignored when sharding is off)"""
+    return {'shard_id': shard_id} if shard_id else {}
+
+
+# ==================== ROUTING ====================
+
+def conjuncts(clause):
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for inner in clause.clauses:
+            yield from conjuncts(inner)
+    elif clause is not None:
+        yield clause
+
+
+def bound_values(parameter, parameters):
+    if parameter.callable is None and parameter.value is None and parameter.key in parameters:
+        value = parameters[parameter.key]
+    else:
+        value = parameter.effective_value
+    return list(value) if parameter.expanding else [value]
+
+
+def criteria_shards(session, where, parameters):
+    """Shards a WHERE clause can match through its AND-ed id/district/pincode/reporter tests, or None for all"""
+    chosen = None
+    for clause in conjuncts(where):
+        if not isinstance(clause, BinaryExpression) or clause.operator not in (operators.eq, operators.in_op):
+            continue
+        column, parameter = clause.left, clause.right
+        if not isinstance(parameter, BindParameter) or getattr(getattr(column, 'table', None), 'name', None) \
+                not in SHARDED_TABLES:
+            continue
+        values = bound_values(parameter, parameters)
+        if column.name == 'id':
+            found = {shard_for_id(value) for value in values}
+            shards = None if None in found else found
+        elif column.name == 'district':
+            shards = {shard_for_district(value) for value in values}
+        elif column.name in DIRECTORY_COLUMNS:
+            shards = directory_shards(session, DIRECTORY_COLUMNS[column.name], values)
+        else:
+            continue
+        if shards is not None:
+            chosen = shards if chosen is None else chosen & shards
+    return chosen
+
+
+def directory_shards(session, kind, values):
+    """Shards holding complaints with these pincodes/reporters, or None when one was never recorded"""
+    values = {str(value) for value in values if value is not None}
+    if not values:
+        return set()
+    rows = session.execute(
+        select(directory_table.c.value, directory_table.c.district).where(
+            directory_table.c.kind == kind, directory_table.c.value.in_(values)
+        ),
+        bind_arguments={'shard_id': MAIN_SHARD}
+    ).all()
+    if {row.value for row in rows} != values:
+        return None
+    return {shard_for_district(row.district) for row in rows}
+
+
+def statement_shards(session, statement, parameters):
+    """Shards a statement on the sharded tables must run on"""
+    while isinstance(statement, Select) and statement.whereclause is None:
+        # SELECT count(*) FROM (SELECT ...) and the like: the criteria are inside
+        froms = statement.get_final_froms()
+        if len(froms) != 1 or not isinstance(froms[0], AliasedReturnsRows):
+            break
+        inner = froms[0]
+        while isinstance(inner, AliasedReturnsRows):
+            inner = inner.element
+        statement = inner
+    shards = criteria_shards(session, getattr(statement, 'whereclause', None), parameters or {})
+    if shards is None:
+        return shard_names()
+    # A contradiction matches nothing; main answers it as well as any shard
+    return [name for name in shard_names() if name in shards] or [MAIN_SHARD]
+
+
+def touches_sharded_tables(statement):
+    return any(table.name in SHARDED_TABLES for table in find_tables(statement, include_crud=True))
+
+
+def choose_shard(mapper, instance, clause=None, **kw):
+    """Shard for a new object (or another statement given no shard)"""
+    if instance is not None and mapper.local_table.name in SHARDED_TABLES:
+        return shard_for_district(instance.district)
+    if mapper is not None and mapper.local_table.name not in SHARDED_TABLES:
+        return MAIN_SHARD
+    raise ShardingError(f'Cannot choose a shard for {mapper or clause}; pass execution_options(shard_id=...)')
+
+
+def choose_identity(mapper, primary_key, **kw):
+    """Shards to look in for the row with `primary_key`"""
+    if mapper.local_table.name not in SHARDED_TABLES:
+        return [MAIN_SHARD]
+    shard = shard_for_id(primary_key[0])
+    return [shard] if shard else shard_names()
+
+
+def choose_execute(orm_context):
+    if not touches_sharded_tables(orm_context.statement):
+        return [MAIN_SHARD]
+    return statement_shards(orm_context.session, orm_context.statement, orm_context.parameters)
+
+
+# ==================== FAN-OUT ====================
+
+AGGREGATES = {'count': sum, 'sum': sum, 'max': max, 'min': min}
+
+
+def requested_shard(orm_context):
+    """The shard a statement was pinned to, if any"""
+    for option in orm_context._non_compile_orm_options:
+        if isinstance(option, set_shard_id):
+            return option.shard_id
+    options = None
+    if orm_context.is_select:
+        options = orm_context.load_options
+    elif orm_context.is_update or orm_context.is_delete:
+        options = orm_context.update_delete_options
+    if options is not None and options._identity_token is not None:
+        return options._identity_token
+    for source in (orm_context.execution_options, orm_context.bind_arguments):
+        if source.get('shard_id'):
+            return source['shard_id']
+    return None
+
+
+def run_on(orm_context, shard_id, statement=None):
+    bind_arguments = dict(orm_context.bind_arguments, shard_id=shard_id)
+    orm_context.update_execution_options(identity_token=shard_id)
+    if statement is None:
+        return orm_context.invoke_statement(bind_arguments=bind_arguments)
+    return orm_context.invoke_statement(statement=statement, bind_arguments=bind_arguments)
+
+
+def aggregate_combiners(statement):
+    """One combining function per column when `statement` only aggregates, else None"""
+    if not isinstance(statement, Select) or statement._group_by_clauses:
+        return None
+    combiners = []
+    for column in statement.selected_columns:
+        element = column.element if isinstance(column, Label) else column
+        if not isinstance(element, FunctionElement) or element.name.lower() not in AGGREGATES:
+            return None
+        combiners.append(AGGREGATES[element.name.lower()])
+    return combiners
+
+
+def combine(rows, combiners):
+    combined = []
+    for index, combiner in enumerate(combiners):
+        values = [row[index] for row in rows if row[index] is not None]
+        combined.append(combiner(values) if values else None)
+    return [tuple(combined)]
+
+
+def sort_rows(rows, keys, order_by):
+    """Sort merged rows the way ORDER BY sorted each shard's; False if a sort column is not in the result"""
+    getters = []
+    for clause in order_by:
+        descending, nulls_first = False, None
+        while isinstance(clause, UnaryExpression):
+            if clause.modifier is operators.desc_op:
+                descending = True
+            elif clause.modifier in (operators.nulls_first_op, operators.nullsfirst_op):
+                nulls_first = True
+            elif clause.modifier in (operators.nulls_last_op, operators.nullslast_op):
+                nulls_first = False
+            clause = clause.element
+        name = getattr(clause, 'key', None) or getattr(clause, 'name', None)
+        if name in keys:
+            index = keys.index(name)
+            getter = lambda row, index=index: row[index]
+        elif len(keys) == 1 and name:
+            # A single ORM entity: sort on its attribute
+            getter = lambda row, name=name: getattr(row[0], name, None)
+        else:
+            return False
+        # NULL sorts lowest unless NULLS FIRST/LAST says otherwise
+        getters.append((getter, descending, descending if nulls_first is None else nulls_first is False))
+    for getter, descending, nulls_last in reversed(getters):
+        present = [row for row in rows if getter(row) is not None]
+        missing = [row for row in rows if getter(row) is None]
+        present.sort(key=getter, reverse=descending)
+        rows[:] = present + missing if nulls_last else missing + present
+    return True
+
+
+def fan_out(orm_context, shard_ids):
+    """Run a SELECT on every shard in `shard_ids` and merge the results"""
+    statement = orm_context.statement
+    limit = offset = None
+    if hasattr(statement, '_limit') and (statement._limit is not None or statement._offset):
+        limit, offset = statement._limit, statement._offset or 0
+        # Every shard returns its first offset + limit rows; the merge picks from those
+        statement = statement.offset(None).limit(None if limit is None else offset + limit)
+    results = [run_on(orm_context, shard_id, statement).freeze() for shard_id in shard_ids]
+    keys = list(results[0]().keys())
+    rows = [tuple(row) for result in results for row in result().all()]
+
+    combiners = aggregate_combiners(statement)
+    if combiners:
+        rows = combine(rows, combiners)
+    elif getattr(statement, '_order_by_clauses', ()):
+        sort_rows(rows, keys, statement._order_by_clauses)
+    if offset:
+        rows = rows[offset:]
+    if limit is not None:
+        rows = rows[:limit]
+    return results[0].with_new_rows(rows)()
+
+
+def execute_on_shards(orm_context):
+    """do_orm_execute hook: run the statement on its shard(s)"""
+    shard_id = requested_shard(orm_context)
+    if shard_id is not None:
+        return run_on(orm_context, shard_id)
+    shard_ids = orm_context.session.execute_chooser(orm_context)
+    if len(shard_ids) == 1:
+        return run_on(orm_context, shard_ids[0])
+    if orm_context.is_select:
+        return fan_out(orm_context, shard_ids)
+    if orm_context.is_update or orm_context.is_delete:
+        results = [run_on(orm_context, shard_id) for shard_id in shard_ids]
+        return results[0].merge(*results[1:])
+    raise ShardingError('Statement would run on every shard; pass execution_options(shard_id=...)')
+
+
+class ShardedFlaskSession(ShardedSession):
+    """Flask-SQLAlchemy session over the main database and the complaint shards"""
+
+    def __init__(self, db, query_cls=None, **kwargs):
+        self._db = db
+        super().__init__(
+            shard_chooser=choose_shard,
+            identity_chooser=choose_identity,
+            execute_chooser=choose_execute,
+            shards={MAIN_SHARD: db.engine, **_engines},
+            **kwargs
+        )
+
+
+# Class-level hooks run before ShardedSession's own per-session one
+event.listen(ShardedFlaskSession, 'do_orm_execute', execute_on_shards, retval=True)
+
+
+def session_options():
+    """session_options for SQLAlchemy(): the sharded session when SHARD_MAP is set"""
+    return {'class_': ShardedFlaskSession} if sharding_enabled() else {}
+
+
+# ==================== WRITES ====================
+
+def next_complaint_id(connection, district):
+    """Take the next id for a complaint in `district` from its shard's sequence"""
+    slot = district_slot(district)
+    connection.execute(update(sequence_table).where(sequence_table.c.slot == slot).values(
+        value=sequence_table.c.value + 1
+    ))
+    value = connection.execute(select(sequence_table.c.value).where(sequence_table.c.slot == slot)).scalar()
+    return ID_BASE + value * ID_STRIDE + slot
+
+
+def assign_complaint_id(mapper, connection, target):
+    if mapper.local_table.name == 'complaint' and target.id is None:
+        target.id = next_complaint_id(connection, target.district)
+
+
+def directory_entries(session):
+    entries = set()
+    for instance in session.new:
+        table = getattr(getattr(instance, '__table__', None), 'name', None)
+        if table not in SHARDED_TABLES:
+            continue
+        for column, kind in DIRECTORY_COLUMNS.items():
+            value = getattr(instance, column)
+            if value is not None:
+                entries.add((kind, str(value), instance.district or ''))
+    return entries
+
+
+def record_directory(session, flush_context, instances):
+    """Add the pincode/reporter -> district pairs of new complaints to the directory"""
+    entries = directory_entries(session) - _recorded - session.info.get('shard_directory', set())
+    for kind, value, district in sorted(entries):
+        session.execute(text(
+            "INSERT INTO shard_directory (kind, value, district) VALUES (:kind, :value, :district) "
+            "ON CONFLICT (kind, value, district) DO NOTHING"
+        ), {'kind': kind, 'value': value, 'district': district}, bind_arguments={'shard_id': MAIN_SHARD})
+    session.info.setdefault('shard_directory', set()).update(entries)
+
+
+def directory_committed(session):
+    _recorded.update(session.info.pop('shard_directory', ()))
+
+
+def directory_rolled_back(session):
+    session.info.pop('shard_directory', None)
+
+
+event.listen(ShardedFlaskSession, 'before_flush', record_directory)
+event.listen(ShardedFlaskSession, 'after_commit', directory_committed)
+event.listen(ShardedFlaskSession, 'after_rollback', directory_rolled_back)
+
+
+# ==================== SETUP ====================
+
+def create_shard_tables(engine, tables, main=False):
+    """Create the sharded tables and the bookkeeping ones on a shard's database"""
+    tables[0].metadata.create_all(engine, tables=tables)
+    metadata.create_all(engine, tables=[sequence_table, directory_table] if main else [sequence_table])
+    with engine.begin() as conn:
+        present = set(conn.execute(select(sequence_table.c.slot)).scalars())
+        missing = [{'slot': slot, 'value': 0} for slot in range(len(DISTRICTS) + 1) if slot not in present]
+        if missing:
+            conn.execute(insert(sequence_table), missing)
+    if SQLITE_JOURNAL_MODE:
+        set_journal_mode(engine)
+
+
+def init_shards(app):
+    """Open the shards and route the session across them; a no-op unless SHARD_MAP is set"""
+    if not sharding_enabled():
+        return False
+    db = app.extensions['sqlalchemy']
+    configure()
+    tables = [db.metadata.tables[name] for name in SHARDED_TABLES]
+    with app.app_context():
+        create_shard_tables(db.engine, tables, main=True)
+    for engine in _engines.values():
+        create_shard_tables(engine, tables)
+    if not event.contains(Mapper, 'before_insert', assign_complaint_id):
+        event.listen(Mapper, 'before_insert', assign_complaint_id)
+    log_event(logger, 'shards_ready', f'Complaints sharded over {len(shard_names())} databases',
+              shards=len(shard_names()), districts=len(district_shards))
+    return True
+
+
+# ==================== REBALANCING ====================
+
+def engines(main_engine):
+    return {MAIN_SHARD: main_engine, **_engines}
+
+
+def move_district_rows(table, district, source, target, batch_size=SHARD_REBALANCE_BATCH_SIZE):
+    """Copy `district`'s rows of `table` from `source` to `target`, then delete them from `source`"""
+    match = table.c.district == district if district is not None else table.c.district.is_(None)
+    moved = 0
+    while True:
+        with source.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(
+                select(table).where(match).order_by(table.c.id).limit(batch_size)
+            )]
+        if not rows:
+            return moved
+        ids = [row['id'] for row in rows]
+        with target.begin() as conn:
+            # Rows copied by an interrupted earlier run are already there
+            present = set(conn.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+            copies = [row for row in rows if row['id'] not in present]
+            if copies:
+                conn.execute(insert(table), copies)
+        with source.begin() as conn:
+            conn.execute(table.delete().where(table.c.id.in_(ids)))
+        moved += len(rows)
+
+
+def carry_sequence(district, source, target):
+    """Make `target` continue `district`'s id sequence from where `source` left it"""
+    slot = district_slot(district)
+    with source.connect() as conn:
+        value = conn.execute(select(sequence_table.c.value).where(sequence_table.c.slot == slot)).scalar() or 0
+    with target.begin() as conn:
+        conn.execute(update(sequence_table).where(
+            sequence_table.c.slot == slot, sequence_table.c.value < value
+        ).values(value=value))
+
+
+def rebuild_directory(main_engine, tables):
+    """Record the pincode/reporter -> district pairs of every stored complaint"""
+    entries = set()
+    for engine in engines(main_engine).values():
+        with engine.connect() as conn:
+            for table in tables:
+                for column, kind in DIRECTORY_COLUMNS.items():
+                    rows = conn.execute(select(table.c[column], table.c.district).where(
+                        table.c[column].isnot(None)
+                    ).distinct())
+                    entries.update((kind, str(value), district or '') for value, district in rows)
+    with main_engine.begin() as conn:
+        for kind, value, district in sorted(entries):
+            conn.execute(text(
+                "INSERT INTO shard_directory (kind, value, district) VALUES (:kind, :value, :district) "
+                "ON CONFLICT (kind, value, district) DO NOTHING"
+            ), {'kind': kind, 'value': value, 'district': district})
+    return len(entries)
+
+
+def rebalance(main_engine, tables):
+    """Move every row that is not on its district's shard; returns {(source, target): rows}"""
+    all_engines = engines(main_engine)
+    moves = {}
+    for source_name, source in all_engines.items():
+        for table in tables:
+            with source.connect() as conn:
+                districts = list(conn.execute(select(table.c.district).distinct()).scalars())
+            for district in districts:
+                target_name = shard_for_district(district)
+                if target_name == source_name:
+                    continue
+                carry_sequence(district, source, all_engines[target_name])
+                count = move_district_rows(table, district, source, all_engines[target_name])
+                moves[(source_name, target_name)] = moves.get((source_name, target_name), 0) + count
+                log_event(logger, 'shard_rows_moved', f'Moved {count} {table.name} rows of {district}',
+                          table=table.name, district=district, source=source_name, target=target_name, count=count)
+    rebuild_directory(main_engine, tables)
+    return moves
+
+
+def status(main_engine, tables):
+    """[(shard, district, live rows, archived rows)] for every district stored anywhere"""
+    rows = []
+    for name, engine in engines(main_engine).items():
+        counts = {}
+        with engine.connect() as conn:
+            for index, table in enumerate(tables):
+                for district, count in conn.execute(
+                    select(table.c.district, func.count()).group_by(table.c.district)
+                ):
+                    counts.setdefault(district, [0] * len(tables))[index] = count
+        rows += [(name, district, *count) for district, count in sorted(counts.items(), key=lambda item: item[0] or '')]
+    return rows
+
+
+def slug(district):
+    return re.sub(r'[^a-z0-9]+', '_', district.lower()).strip('_')
+
+
+def write_map(path, urls, districts):
+    with open(path, 'w') as f:
+        json.dump({'shards': urls, 'districts': districts}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def read_raw_map(path):
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('shards', {}), data.get('districts', {})
+
+
+def main(argv):
+    if not SHARD_MAP:
+        print("Set SHARD_MAP to the shard map's path (the same value the app runs with)")
+        return 1
+    command = argv[1] if len(argv) > 1 else 'status'
+    urls, districts = read_raw_map(SHARD_MAP)
+    if command == 'init':
+        if districts:
+            print(f"{SHARD_MAP} already maps districts; use move or rebalance")
+            return 1
+        urls = {slug(district): f'sqlite:///shards/{slug(district)}.db' for district in DISTRICTS}
+        districts = {district: slug(district) for district in DISTRICTS}
+    elif command == 'move' and len(argv) in (4, 5):
+        district, shard = argv[2], argv[3]
+        if shard != MAIN_SHARD and (len(argv) == 5 or shard not in urls):
+            urls[shard] = argv[4] if len(argv) == 5 else f'sqlite:///shards/{shard}.db'
+        districts[district] = shard
+    elif command not in ('status', 'rebalance'):
+        print(__doc__)
+        return 1
+    if command in ('init', 'move'):
+        os.makedirs(os.path.join(os.path.dirname(os.path.abspath(SHARD_MAP)), 'shards'), exist_ok=True)
+        write_map(SHARD_MAP, urls, districts)
+
+    from app import app
+    from models import db
+
+    # Importing the app opened every shard in the map just written
+    with app.app_context():
+        tables = [db.metadata.tables[name] for name in SHARDED_TABLES]
+        main_engine = db.engine
+        if command == 'status':
+            print(f"{'shard':<20} {'district':<20} {'live':>8} {'archived':>8}")
+            for name, district, live, archived in status(main_engine, tables):
+                print(f"{name:<20} {district or '-':<20} {live:>8} {archived:>8}")
+            return 0
+        moves = rebalance(main_engine, tables)
+    for (source, target), count in sorted(moves.items()):
+        print(f"  {source} -> {target}: {count} rows")
+    print(f"✓ Every district is on its shard ({len(shard_names())} databases)")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run as the imported module, whose map and engines the app uses
+    import shards
+    sys.exit(shards.main(sys.argv))
@@ -0,0 +1,60 @@
+"""
+Multi-process stress test for the complaint ID allocator.
+
+Spawns several processes that allocate IDs concurrently from one shared
+SQLite database and checks that no ID is handed out twice and that each
+process sees its IDs in strictly increasing order.
+
+Usage: python stress_complaint_ids.py [processes] [ids_per_process] [block_size]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from utils import ComplaintIdAllocator
+
+
+def allocate_ids(db_url, count, block_size):
+    engine = create_engine(db_url, connect_args={'timeout': 30})
+    allocator = ComplaintIdAllocator(engine, block_size=block_size)
+    return [allocator.allocate() for _ in range(count)]
+
+
+def sort_key(complaint_id):
+    _, timestamp, sequence = complaint_id.split('-')
+    return timestamp, int(sequence)
+
+
+def run(processes=8, ids_per_process=5000, block_size=100):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = 'sqlite:///' + os.path.join(tmp, 'ids.db')
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            batches = pool.starmap(allocate_ids, [(db_url, ids_per_process, block_size)] * processes)
+        elapsed = time.perf_counter() - started
+
+    all_ids = [complaint_id for batch in batches for complaint_id in batch]
+    duplicates = len(all_ids) - len(set(all_ids))
+    unordered = sum(
+        1 for batch in batches
+        for previous, current in zip(batch, batch[1:])
+        if sort_key(current) <= sort_key(previous)
+    )
+
+    print(f"Allocated {len(all_ids)} IDs in {processes} processes in {elapsed:.2f}s "
+          f"({len(all_ids) / elapsed:.0f} IDs/s, block size {block_size})")
+    print(f"Duplicates: {duplicates}")
+    print(f"Out-of-order IDs within a process: {unordered}")
+    return duplicates == 0 and unordered == 0
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:4]]
+    ok = run(*args)
+    print("✓ Stress test passed" if ok else "✗ Stress test failed")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,138 @@
+"""
+Batched, idempotent sync for the dashboard's offline outbox.
+
+While a phone is offline the dashboard keeps complaint submissions and status
+updates in an IndexedDB outbox, each with a client-generated key. When it
+reconnects it sends the whole outbox in one request:
+
+  POST /api/sync  {"operations": [
+      {"key": "<uuid>", "type": "submit_complaint", "data": {...submit body...}},
+      {"key": "<uuid>", "type": "update_status", "complaint_id": 7, "data": {...}}
+  ]}
+  -> {"success": true, "results": [{"key", "status", "body", "replayed"}, ...]}
+
+Every operation runs exactly like its single endpoint, and all accepted
+operations commit in one transaction together with an IdempotencyRecord per
+key holding the operation's response. A retried batch (the device never saw
+the response) replays the stored responses instead of filing duplicates. Two
+copies of a batch racing each other collide on the records' unique key; the
+loser rolls back and answers from the winner's records.
+
+Server errors are not stored, so those operations can simply be retried.
+Records older than IDEMPOTENCY_TTL_HOURS are deleted by the
+``expire_idempotency_records`` job.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from logs import get_logger, log_event
+from models import db, BackgroundJob, IdempotencyRecord
+from tasks import enqueue, task
+
+logger = get_logger('sync')
+
+SYNC_MAX_OPERATIONS = int(os.environ.get('SYNC_MAX_OPERATIONS', 100))
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', 72))
+IDEMPOTENCY_GC_INTERVAL = int(os.environ.get('IDEMPOTENCY_GC_INTERVAL', 3600))
+KEY_MAX_LENGTH = 64
+
+
+class SyncError(Exception):
+    """A malformed batch, rejected as a whole with HTTP 400"""
+
+
+def parse_operations(data, handlers):
+    """Validate a batch body and return its operations"""
+    operations = (data or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise SyncError('operations must be a non-empty list')
+    if len(operations) > SYNC_MAX_OPERATIONS:
+        raise SyncError(f'At most {SYNC_MAX_OPERATIONS} operations per batch')
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise SyncError(f'Operation {index} must be an object')
+        key = operation.get('key')
+        if not isinstance(key, str) or not 0 < len(key) <= KEY_MAX_LENGTH:
+            raise SyncError(f'Operation {index} needs a key of at most {KEY_MAX_LENGTH} characters')
+        if operation.get('type') not in handlers:
+            raise SyncError(f"Operation {index} has unknown type {operation.get('type')!r}")
+        if not isinstance(operation.get('data', {}), dict):
+            raise SyncError(f'Operation {index} data must be an object')
+    return operations
+
+
+def stored_results(user_id, keys):
+    records = IdempotencyRecord.query.filter(
+        IdempotencyRecord.user_id == user_id, IdempotencyRecord.key.in_(keys)
+    ).all()
+    return {record.key: (json.loads(record.response), record.status_code) for record in records}
+
+
+def apply_operations(user_id, operations, handlers):
+    stored = stored_results(user_id, list({operation['key'] for operation in operations}))
+    results = []
+    for operation in operations:
+        key = operation['key']
+        replayed = key in stored
+        if replayed:
+            body, status = stored[key]
+        else:
+            body, status = handlers[operation['type']](operation)
+            if status < 500:
+                db.session.add(IdempotencyRecord(user_id=user_id, key=key, status_code=status,
+                                                 response=json.dumps(body)))
+                # A key repeated later in the same batch replays this result
+                stored[key] = (body, status)
+        results.append({'key': key, 'status': status, 'body': body, 'replayed': replayed})
+    return results
+
+
+def run_batch(user_id, operations, handlers):
+    """
+    Apply a batch of operations in one transaction and return one result per
+    operation, in order. `handlers` maps each operation type to a function
+    taking the operation and returning (response body, HTTP status) after
+    staging its changes in the session without committing; a handler that
+    rejects an operation must not have staged anything.
+    """
+    for attempt in range(2):
+        try:
+            results = apply_operations(user_id, operations, handlers)
+            schedule_expiry()
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent copy of this batch stored the same keys first (the
+            # conflict can surface at any autoflush); answer from its records
+            db.session.rollback()
+            if attempt:
+                raise
+            log_event(logger, 'sync_conflict', 'Concurrent retry of a sync batch', user_id=user_id)
+            continue
+        applied = sum(1 for result in results if not result['replayed'] and result['status'] < 400)
+        log_event(logger, 'sync_batch', f'Synced {len(results)} operations', user_id=user_id,
+                  operations=len(results), applied=applied)
+        return results
+
+
+# ==================== RECORD EXPIRY ====================
+
+def schedule_expiry():
+    """Queue an expiry run unless one is already waiting"""
+    waiting = BackgroundJob.query.filter_by(task='expire_idempotency_records', status='queued').first()
+    if not waiting:
+        enqueue('expire_idempotency_records', delay_seconds=IDEMPOTENCY_GC_INTERVAL)
+
+
+@task('expire_idempotency_records')
+def expire_idempotency_records():
+    cutoff = datetime.now() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    deleted = IdempotencyRecord.query.filter(IdempotencyRecord.created_at < cutoff).delete(synchronize_session=False)
+    if deleted:
+        log_event(logger, 'idempotency_expired', f'Deleted {deleted} idempotency records', count=deleted)
+    if IdempotencyRecord.query.first():
+        enqueue('expire_idempotency_records', delay_seconds=IDEMPOTENCY_GC_INTERVAL)
+        db.session.commit()
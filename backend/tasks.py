@@ -0,0 +1,206 @@
+"""
+Background job queue for side effects that should not run inside a request.
+
+Jobs are rows in the ``background_job`` table. ``enqueue()`` adds the row to
+the caller's session, so a job becomes visible to workers only when the
+request commits its own changes, and is rolled back together with them.
+Workers claim due jobs, run the registered handler and delete the row on
+success; failures are retried with exponential backoff until
+``max_attempts`` is reached, after which the job is kept as ``failed``.
+
+Run a dedicated worker with ``python worker.py``. When no dedicated worker is
+deployed (EMBEDDED_WORKER=1, the default), each web process that enqueues a
+job starts a daemon thread that drains the queue in the background.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from flask import current_app
+
+from logs import get_logger, log_event
+from models import db, BackgroundJob, Complaint
+
+logger = get_logger('tasks')
+
+POLL_INTERVAL_SECONDS = float(os.environ.get('WORKER_POLL_INTERVAL', 1.0))
+BATCH_SIZE = int(os.environ.get('WORKER_BATCH_SIZE', 20))
+EMBEDDED_WORKER = os.environ.get('EMBEDDED_WORKER', '1') == '1'
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+STALE_LOCK_MINUTES = 10
+
+TASKS = {}
+
+_embedded_lock = threading.Lock()
+_embedded_pid = None
+
+
+def task(name):
+    """Register a function as the handler for jobs named `name`"""
+    def decorator(f):
+        TASKS[name] = f
+        return f
+    return decorator
+
+
+def enqueue(name, delay_seconds=0, max_attempts=5, **payload):
+    """Add a job to the current session; it is queued when the caller commits"""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+    job = BackgroundJob(
+        task=name,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts,
+        run_at=datetime.now() + timedelta(seconds=delay_seconds)
+    )
+    db.session.add(job)
+    if EMBEDDED_WORKER:
+        start_embedded_worker(current_app._get_current_object())
+    return job
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number `attempts`, with jitter"""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# ==================== WORKER ====================
+
+def claim_jobs(worker_id, limit=BATCH_SIZE):
+    """Mark up to `limit` due jobs as running for this worker and return them"""
+    now = datetime.now()
+
+    # Jobs left running by a crashed worker become eligible again
+    BackgroundJob.query.filter(
+        BackgroundJob.status == 'running',
+        BackgroundJob.locked_at < now - timedelta(minutes=STALE_LOCK_MINUTES)
+    ).update({'status': 'queued', 'locked_by': None, 'locked_at': None}, synchronize_session=False)
+
+    due_ids = [row.id for row in db.session.query(BackgroundJob.id).filter(
+        BackgroundJob.status == 'queued',
+        BackgroundJob.run_at <= now
+    ).order_by(BackgroundJob.run_at).limit(limit)]
+
+    claimed_ids = []
+    for job_id in due_ids:
+        # The status guard makes the claim safe against other workers
+        claimed = BackgroundJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'locked_by': worker_id, 'locked_at': now},
+            synchronize_session=False
+        )
+        if claimed:
+            claimed_ids.append(job_id)
+    db.session.commit()
+
+    if not claimed_ids:
+        return []
+    return BackgroundJob.query.filter(BackgroundJob.id.in_(claimed_ids)).order_by(BackgroundJob.run_at).all()
+
+
+def run_job(job):
+    """Run one claimed job; returns True on success"""
+    job_id = job.id
+    try:
+        handler = TASKS.get(job.task)
+        if handler is None:
+            raise LookupError(f"Unknown task: {job.task}")
+        handler(**json.loads(job.payload or '{}'))
+        db.session.delete(job)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job_id)
+        job.attempts = (job.attempts or 0) + 1
+        job.last_error = f"{type(e).__name__}: {e}"
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.now() + timedelta(seconds=backoff_delay(job.attempts))
+        db.session.commit()
+        log_event(logger, 'job_failed', f"Job {job.task} failed: {e}", logging.WARNING,
+                  job_id=job_id, task=job.task, attempts=job.attempts, final=job.status == 'failed')
+        return False
+
+
+def run_pending(worker_id=None, limit=BATCH_SIZE):
+    """Claim and run one batch of due jobs; returns the number processed"""
+    worker_id = worker_id or worker_name()
+    jobs = claim_jobs(worker_id, limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+def run_worker(app, once=False):
+    """Process jobs until interrupted (or until the queue is empty if `once`)"""
+    worker_id = worker_name()
+    with app.app_context():
+        while True:
+            try:
+                processed = run_pending(worker_id)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('Worker error', extra={'fields': {'worker_id': worker_id}})
+                processed = 0
+            finally:
+                db.session.remove()
+            if once and not processed:
+                return
+            if not processed:
+                time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def start_embedded_worker(app):
+    """Start a daemon worker thread in this process, once per process"""
+    global _embedded_pid
+    with _embedded_lock:
+        if _embedded_pid == os.getpid():
+            return
+        _embedded_pid = os.getpid()
+        threading.Thread(target=run_worker, args=(app,), name='embedded-job-worker', daemon=True).start()
+
+
+# ==================== TASKS ====================
+
+@task('send_sms')
+def send_sms(phone, message):
+    # In production, send SMS via gateway (see SMS_* settings in .env.example)
+    log_event(logger, 'sms_sent', message, phone=phone)
+
+
+@task('save_photo')
+def save_photo(path, data, column='photo_path'):
+    """Decode a base64 photo and write it to `path`"""
+    try:
+        photo_bytes = base64.b64decode(data)
+    except (binascii.Error, ValueError) as e:
+        # Retrying cannot fix a corrupt upload; drop the dangling reference instead
+        log_event(logger, 'photo_decode_failed', f"Error decoding photo: {e}", logging.WARNING, path=path)
+        Complaint.query.filter(getattr(Complaint, column) == path).update(
+            {column: None}, synchronize_session=False
+        )
+        db.session.commit()
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(photo_bytes)
+
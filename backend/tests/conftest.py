@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before app.py is first imported: a throwaway database and upload directory, no worker threads,
+# no trained routing model
+_scratch = tempfile.mkdtemp(prefix='civic-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_scratch, 'civic.db')
+os.environ['EMBEDDED_WORKER'] = '0'
+os.environ['ROUTING_MODEL_PATH'] = os.path.join(_scratch, 'routing_model.json')
+os.environ['UPLOAD_SESSION_DIR'] = os.path.join(_scratch, 'uploads')
+
+
+@pytest.fixture
+def app():
+    from app import app
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def sign_in(client):
+    """Make `client` send the session of `user`, with e.g. pincode= or department= as entered at login"""
+    def sign_in(user, **values):
+        with client.session_transaction() as session:
+            session.clear()
+            session.update(user_id=user.id, role=user.role, session_version=user.session_version or 0, **values)
+        # Requests share the fixture's app context, so drop the principal the last request cached in g
+        g.pop('principal', None)
+        return client
+    return sign_in
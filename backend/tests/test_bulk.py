@@ -0,0 +1,112 @@
+from sqlalchemy import event
+
+from app import BULK_MAX_IDS, parse_bulk_ids
+from models import db, Complaint, ComplaintEvent, ReporterStats, User
+
+
+def make_complaints(count, **values):
+    reporter = User.query.filter_by(role='citizen').first()
+    complaints = [
+        Complaint(reporter_id=reporter.id, title='Roads', complaint_type='Roads', district='Chennai',
+                  pincode=values.pop('pincode', '600001'), location='Ward 1', **values)
+        for _ in range(count)
+    ]
+    db.session.add_all(complaints)
+    db.session.commit()
+    return [c.id for c in complaints]
+
+
+def test_parse_bulk_ids():
+    assert parse_bulk_ids({'complaint_ids': [3, '1', 3, 2, 1]}) == [3, 1, 2]
+    assert parse_bulk_ids({'complaint_ids': list(range(BULK_MAX_IDS // 2)) * 2}) == list(range(BULK_MAX_IDS // 2))
+    assert parse_bulk_ids({'complaint_ids': [1, 'x']}) is None
+    assert parse_bulk_ids({'complaint_ids': []}) is None
+    assert parse_bulk_ids({'complaint_ids': list(range(BULK_MAX_IDS + 1))}) is None
+    assert parse_bulk_ids(None) is None
+
+
+def test_bulk_forward(app, sign_in):
+    ids = make_complaints(3, status='submitted')
+    elsewhere = make_complaints(1, status='submitted', pincode='600002')[0]
+    officer = User.query.filter_by(user_id='MUN001').first()
+    client = sign_in(officer, pincode='600001')
+
+    response = client.post('/api/complaints/bulk/forward', json={
+        'complaint_ids': ids + [ids[0], elsewhere, 999999], 'department': 'Municipal Corporation'
+    })
+
+    body = response.get_json()
+    assert response.status_code == 200 and body['updated'] == 3
+    assert [r['message'] for r in body['results']] == ['Updated'] * 3 + ['Unauthorized', 'Complaint not found']
+    db.session.expire_all()
+    for complaint_id in ids:
+        complaint = db.session.get(Complaint, complaint_id)
+        assert (complaint.status, complaint.forwarded_department, complaint.verified_by) == \
+            ('assigned', 'Municipal Corporation', officer.id)
+    assert db.session.get(Complaint, elsewhere).status == 'submitted'
+    assert ComplaintEvent.query.filter(ComplaintEvent.complaint_id.in_(ids), ComplaintEvent.action == 'forward').count() == 3
+
+
+def test_bulk_mark_fake_skips_fakes_and_other_departments(app, sign_in):
+    fresh = make_complaints(2, status='assigned', forwarded_department='Municipal Corporation')
+    already_fake = make_complaints(1, status='resolved', forwarded_department='Municipal Corporation', is_fake=True)
+    other_department = make_complaints(1, status='assigned', forwarded_department='Electrical Board')
+    client = sign_in(User.query.filter_by(user_id='DEPT001').first(), department='Municipal Corporation')
+
+    response = client.post('/api/complaints/bulk/mark-fake', json={
+        'complaint_ids': fresh + already_fake + other_department, 'reason': 'Duplicate'
+    })
+
+    body = response.get_json()
+    assert body['updated'] == 2
+    assert [r['message'] for r in body['results'][2:]] == ['Already marked as fake', 'Unauthorized']
+    db.session.expire_all()
+    for complaint_id in fresh:
+        complaint = db.session.get(Complaint, complaint_id)
+        assert complaint.is_fake and complaint.status == 'resolved'
+        assert complaint.resolution_notes == 'REPORTED AS FAKE: Duplicate'
+    assert not db.session.get(Complaint, other_department[0]).is_fake
+
+
+def test_bulk_scope_matches_complaint_list(app, sign_in):
+    # A department officer without a pincode only sees forwarded complaints, as in their list
+    not_forwarded = make_complaints(1, status='submitted', forwarded_department='Municipal Corporation')
+    forwarded = make_complaints(1, status='assigned', forwarded_department='Municipal Corporation')
+    client = sign_in(User.query.filter_by(user_id='DEPT001').first(), department='Municipal Corporation')
+
+    body = client.post('/api/complaints/bulk/start-work', json={'complaint_ids': not_forwarded + forwarded}).get_json()
+
+    assert [r['message'] for r in body['results']] == ['Unauthorized', 'Updated']
+    db.session.expire_all()
+    assert db.session.get(Complaint, not_forwarded[0]).status == 'submitted'
+
+
+def test_bulk_mark_fake_loses_race(app, sign_in):
+    complaint_id = make_complaints(1, status='assigned', forwarded_department='Municipal Corporation')[0]
+    reporter_key = f"reporter:{db.session.get(Complaint, complaint_id).reporter_id}"
+    fakes_before = db.session.scalar(db.select(ReporterStats.fake_count).filter_by(key=reporter_key)) or 0
+    client = sign_in(User.query.filter_by(user_id='DEPT001').first(), department='Municipal Corporation')
+
+    raced = []
+
+    def concurrent_mark_fake(conn, cursor, statement, parameters, context, executemany):
+        # Another request marks the complaint fake after this one read it, before its UPDATE
+        if statement.startswith('UPDATE complaint SET') and not raced:
+            raced.append(cursor.execute('UPDATE complaint SET is_fake = 1 WHERE id = ?', (complaint_id,)))
+    event.listen(db.engine, 'before_cursor_execute', concurrent_mark_fake)
+    try:
+        body = client.post('/api/complaints/bulk/mark-fake', json={'complaint_ids': [complaint_id]}).get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', concurrent_mark_fake)
+
+    assert raced
+    assert body['updated'] == 0
+    assert body['results'][0]['message'] == 'Changed by another request; reload and retry'
+    assert (db.session.scalar(db.select(ReporterStats.fake_count).filter_by(key=reporter_key)) or 0) == fakes_before
+    assert not ComplaintEvent.query.filter_by(complaint_id=complaint_id, action='mark_fake').count()
+
+
+def test_bulk_rejects_malformed_ids(app, sign_in):
+    client = sign_in(User.query.filter_by(user_id='MUN001').first(), pincode='600001')
+    response = client.post('/api/complaints/bulk/forward', json={'complaint_ids': ['abc'], 'department': 'X'})
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+from sqlalchemy import create_engine
+
+from utils import ComplaintIdAllocator
+
+
+def sequence(complaint_id):
+    return int(complaint_id.rsplit('-', 1)[1])
+
+
+def test_allocators_share_no_ids(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    first, second = ComplaintIdAllocator(engine, block_size=5), ComplaintIdAllocator(engine, block_size=5)
+
+    ids = {'first': [], 'second': []}
+    for _ in range(12):
+        ids['first'].append(first.allocate())
+        ids['second'].append(second.allocate())
+
+    every_id = ids['first'] + ids['second']
+    assert len(set(every_id)) == len(every_id) == 24
+    assert all(complaint_id.startswith('CMP-') for complaint_id in every_id)
+    for allocated in ids.values():
+        assert [sequence(i) for i in allocated] == sorted(sequence(i) for i in allocated)
+    # Blocks of five are reserved alternately, one UPDATE per block
+    assert [sequence(i) for i in ids['first']] == [1, 2, 3, 4, 5, 11, 12, 13, 14, 15, 21, 22]
+    assert [sequence(i) for i in ids['second']] == [6, 7, 8, 9, 10, 16, 17, 18, 19, 20, 26, 27]
+
+
+def test_block_is_dropped_after_fork(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    allocator = ComplaintIdAllocator(engine, block_size=10)
+    assert sequence(allocator.allocate()) == 1
+
+    allocator._pid = -1  # as seen by a forked child
+    assert sequence(allocator.allocate()) == 11
@@ -0,0 +1,22 @@
+import pytest
+
+from logs import redact, redact_text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('OTP for 9876543210: 123456', 'OTP for ********10: [REDACTED]'),
+    ('Your one-time code: 482913', 'Your one-time code: [REDACTED]'),
+    ('otp=4821 sent', 'otp=[REDACTED] sent'),
+    ('Verification code 55443322', 'Verification code [REDACTED]'),
+    ('Login from +91 9876543210', 'Login from ********10'),
+    ('Complaint CMP-20261019045303-000001 submitted', 'Complaint CMP-20261019045303-000001 submitted'),
+    ('Order 1234 shipped', 'Order 1234 shipped'),
+])
+def test_redact_text(text, expected):
+    assert redact_text(text) == expected
+
+
+def test_redact_fields():
+    assert redact({'otp': '123456', 'phone': '9876543210', 'attempts': 3}) == {
+        'otp': '[REDACTED]', 'phone': '********10', 'attempts': 3,
+    }
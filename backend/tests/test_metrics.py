@@ -0,0 +1,38 @@
+import os
+
+from metrics_store import DEAD_NAME, clear_snapshots, collect, retire_snapshot, snapshot_path, write_snapshot
+
+REQUESTS = ('civic_http_requests_total', (('status', '200'),))
+
+
+def requests_snapshot(count, latency_buckets):
+    return [[REQUESTS[0], [list(label) for label in REQUESTS[1]], count],
+            ['civic_http_request_duration_seconds', [], latency_buckets]]
+
+
+def test_exited_worker_counts_survive_pid_reuse(tmp_path):
+    directory = str(tmp_path)
+    write_snapshot(snapshot_path(101, directory), requests_snapshot(5, [5, 0.5, 5]))
+    write_snapshot(snapshot_path(102, directory), requests_snapshot(3, [3, 0.3, 3]))
+
+    retire_snapshot(101, directory)
+    # A new worker gets the old pid and starts counting from zero
+    write_snapshot(snapshot_path(101, directory), requests_snapshot(1, [1, 0.1, 1]))
+    retire_snapshot(102, directory)
+
+    merged = collect(directory)
+    assert merged[REQUESTS] == 9
+    assert merged[('civic_http_request_duration_seconds', ())] == [9, 0.9, 9]
+    assert sorted(os.listdir(directory)) == sorted([DEAD_NAME, 'metrics_101.json'])
+
+
+def test_server_start_clears_previous_run(tmp_path):
+    directory = str(tmp_path)
+    write_snapshot(snapshot_path(101, directory), requests_snapshot(5, [5, 0.5, 5]))
+    retire_snapshot(101, directory)
+    write_snapshot(snapshot_path(102, directory), requests_snapshot(3, [3, 0.3, 3]))
+
+    clear_snapshots(directory)
+
+    assert collect(directory) == {}
+    assert os.listdir(directory) == []
@@ -0,0 +1,53 @@
+import time
+
+from models import db, Complaint, Notification, User
+from notifications import CHANNELS, Channel, FakeGateway, dispatch_notifications, fan_out_notifications
+
+
+def test_channel_batches_under_rate_limit():
+    gateway = FakeGateway()
+    channel = Channel('sms', gateway, batch_size=20, rate_per_second=200)
+    messages = [(f'98000{n:05d}', f'message {n}') for n in range(500)]
+
+    started = time.monotonic()
+    channel.deliver(messages)
+    elapsed = time.monotonic() - started
+
+    assert gateway.batches == [20] * 25
+    assert [(address, text) for _, address, text in gateway.sent] == messages
+    # The first 200 go out as a burst, the other 300 at 200 a second
+    assert 1.4 <= elapsed < 3
+
+
+def test_fan_out_and_dispatch_through_fake_gateway(app, monkeypatch):
+    sms, inbox = FakeGateway(), FakeGateway()
+    monkeypatch.setitem(CHANNELS, 'sms', Channel('sms', sms, batch_size=2, rate_per_second=1000))
+    monkeypatch.setitem(CHANNELS, 'inbox', Channel('inbox', inbox, batch_size=10, rate_per_second=1000))
+
+    officer = User(user_id='FANOUT001', role='dept', name='Officer', department='Fan-out Dept')
+    reporters = [User(phone=f'97000000{n:02d}', role='citizen', name=f'Reporter {n}') for n in range(5)]
+    db.session.add_all([officer, *reporters])
+    db.session.flush()
+    complaints = [
+        Complaint(complaint_id=f'FANOUT-{n}', reporter_id=reporter.id, title='Roads', complaint_type='Roads',
+                  pincode='600001', location='Ward 1', status='assigned', forwarded_department='Fan-out Dept')
+        for n, reporter in enumerate(reporters)
+    ]
+    db.session.add_all(complaints)
+    db.session.commit()
+
+    fan_out_notifications([
+        {'complaint_id': c.id, 'action': 'forward', 'department': 'Fan-out Dept'} for c in complaints
+    ])
+    dispatch_notifications()
+
+    # One SMS per reporter, in batches of at most 2
+    assert sorted(address for _, address, _ in sms.sent) == sorted(r.phone for r in reporters)
+    assert sms.batches == [2, 2, 1]
+    # The officer's five messages are merged into one inbox digest
+    assert len(inbox.sent) == 1
+    _, address, text = inbox.sent[0]
+    assert address == 'FANOUT001' and text.startswith('5 updates:')
+    assert Notification.query.filter(
+        Notification.complaint_id.in_([c.id for c in complaints]), Notification.status != 'sent'
+    ).count() == 0
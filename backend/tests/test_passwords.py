@@ -0,0 +1,25 @@
+import os
+import signal
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import passwords
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha512', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_normalize_method_matches_werkzeug(method):
+    assert passwords.normalize_method(method) == generate_password_hash('x', method=method).split('$', 1)[0]
+
+
+@pytest.mark.skipif(passwords.PASSWORD_POOL_WORKERS <= 0, reason='hashing runs inline')
+def test_broken_pool_is_replaced():
+    password_hash = generate_password_hash('secret', method='pbkdf2:sha256:1000')
+    assert passwords.verify_password(password_hash, 'secret')
+    pool = passwords.get_pool()
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    assert passwords.verify_password(password_hash, 'secret')
+    assert passwords.get_pool() is not pool
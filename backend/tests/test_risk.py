@@ -0,0 +1,28 @@
+from models import db, Complaint, ReporterStats, User
+from risk import load_stats, record_fakes
+
+
+def fake_count(key):
+    return db.session.scalar(db.select(ReporterStats.fake_count).filter_by(key=key)) or 0
+
+
+def test_record_fakes_increments_in_sql(app):
+    reporter = User.query.filter_by(phone='9876543211').first()
+    complaints = [Complaint(reporter_id=reporter.id, phone='9000000001', title='Roads', complaint_type='Roads',
+                            district='Chennai', pincode='600001', location='Ward 1') for _ in range(2)]
+    db.session.add_all(complaints)
+    db.session.commit()
+    reporter_key = f'reporter:{reporter.id}'
+    before = fake_count(reporter_key)
+
+    # This session holds the reporter's stats row (as after scoring a submission)
+    # when another transaction counts a fake
+    held = load_stats([reporter_key])  # noqa: F841 - kept in the identity map on purpose
+    db.session.execute(db.update(ReporterStats).filter_by(key=reporter_key)
+                       .values(fake_count=ReporterStats.fake_count + 1),
+                       execution_options={'synchronize_session': False})
+    record_fakes([c.id for c in complaints])
+    db.session.commit()
+
+    assert fake_count(reporter_key) == before + 3
+    assert fake_count('phone:9000000001') == 2
@@ -0,0 +1,27 @@
+from routing import DepartmentRouter, TextClassifier
+
+SAMPLES = [
+    ('Street light not working', 'Electrical Board'),
+    ('Transformer sparking after rain', 'Electrical Board'),
+    ('Garbage not collected for a week', 'Municipal Corporation'),
+    ('Pothole on the main road', 'Municipal Corporation'),
+]
+
+
+def test_predict_scores_description_once():
+    classifier = TextClassifier.train(SAMPLES)
+    calls = []
+    predict_proba = classifier.predict_proba
+    classifier.predict_proba = lambda text: calls.append(text) or predict_proba(text)
+    router = DepartmentRouter(classifier=classifier)
+
+    department, confidence, model_confidence = router.predict('Electricity', '600001', 'Street light sparking')
+
+    assert department == 'Electrical Board'
+    assert calls == ['Street light sparking']
+    assert model_confidence == predict_proba('Street light sparking')['Electrical Board']
+    assert 0.0 < confidence <= 1.0
+
+
+def test_predict_without_classifier_uses_rules_only():
+    assert DepartmentRouter().predict('Electricity', '600001', 'No power') == ('Electrical Board', 0.95, 0.0)
@@ -0,0 +1,52 @@
+from models import Complaint, IdempotencyRecord, User
+
+
+def submit(key, **values):
+    data = {'type': 'Pothole', 'district': 'Chennai', 'pincode': '600001', 'location': 'Anna Salai',
+            'description': 'Deep pothole near the bus stop', **values}
+    return {'key': key, 'type': 'submit_complaint', 'data': data}
+
+
+def test_sync_replays_retried_operations(app, sign_in):
+    citizen = User.query.filter_by(phone='9876543210').first()
+    client = sign_in(citizen, phone=citizen.phone)
+    before = Complaint.query.count()
+    batch = {'operations': [submit('sync-1'), submit('sync-2'), {'key': 'sync-3', 'type': 'submit_complaint', 'data': {'type': 'Pothole'}},
+                            submit('sync-1')]}
+
+    response = client.post('/api/sync', json=batch)
+
+    results = response.get_json()['results']
+    assert response.status_code == 200
+    assert [(r['key'], r['status'], r['replayed']) for r in results] == [
+        ('sync-1', 200, False), ('sync-2', 200, False), ('sync-3', 400, False), ('sync-1', 200, True),
+    ]
+    assert results[3]['body'] == results[0]['body']
+    assert Complaint.query.count() == before + 2
+
+    # The whole batch again, as after a dropped connection: nothing is applied twice
+    retry = client.post('/api/sync', json=batch).get_json()['results']
+    assert [r['replayed'] for r in retry] == [True, True, True, True]
+    assert [r['body'] for r in retry] == [r['body'] for r in results]
+    assert Complaint.query.count() == before + 2
+    assert IdempotencyRecord.query.filter(IdempotencyRecord.key.in_(['sync-1', 'sync-2', 'sync-3'])).count() == 3
+
+
+def test_sync_keys_are_per_user(app, sign_in):
+    first, second = User.query.filter(User.phone.in_(['9876543210', '9876543211'])).order_by(User.phone)
+    before = Complaint.query.count()
+
+    sign_in(first, phone=first.phone).post('/api/sync', json={'operations': [submit('shared-key')]})
+    result = sign_in(second, phone=second.phone).post('/api/sync', json={'operations': [submit('shared-key')]}).get_json()['results'][0]
+
+    assert result['status'] == 200 and not result['replayed']
+    assert Complaint.query.count() == before + 2
+
+
+def test_sync_rejects_malformed_batches(app, sign_in):
+    citizen = User.query.filter_by(phone='9876543210').first()
+    client = sign_in(citizen, phone=citizen.phone)
+
+    for body in [{}, {'operations': []}, {'operations': [{'key': '', 'type': 'submit_complaint'}]},
+                 {'operations': [{'key': 'z', 'type': 'unknown'}]}]:
+        assert client.post('/api/sync', json=body).status_code == 400
@@ -0,0 +1,65 @@
+from models import db, Complaint, User
+
+PRIVATE_FIELDS = {'reason', 'notes', 'actor_id'}
+
+
+def user(**filters):
+    return User.query.filter_by(**filters).first()
+
+
+def fields(timeline):
+    """Every key of the folded state, the events and their details"""
+    keys = set(timeline['state'])
+    for event in timeline['events']:
+        keys |= set(event) | set(event['details'])
+    return keys
+
+
+def fake_complaint(sign_in):
+    """A complaint submitted by the first citizen, forwarded and then marked fake with a reason"""
+    owner = user(phone='9876543210')
+    response = sign_in(owner, phone=owner.phone).post('/api/complaint/submit', json={
+        'type': 'Pothole', 'district': 'Chennai', 'pincode': '600001', 'location': 'Anna Salai',
+        'description': 'Deep pothole near the bus stop',
+    })
+    assert response.status_code == 200
+    complaint_id = db.session.query(db.func.max(Complaint.id)).scalar()
+    sign_in(user(user_id='MUN001'), pincode='600001').post(
+        f'/api/complaint/{complaint_id}/forward', json={'department': 'Municipal Corporation'})
+    sign_in(user(user_id='DEPT001'), pincode='600001', department='Municipal Corporation').post(
+        f'/api/complaint/{complaint_id}/mark-fake', json={'reason': 'Photo taken from another city'})
+    return complaint_id
+
+
+def test_owner_sees_timeline_without_private_fields(app, sign_in):
+    complaint_id = fake_complaint(sign_in)
+    owner = user(phone='9876543210')
+
+    response = sign_in(owner, phone=owner.phone).get(f'/api/complaint/{complaint_id}/timeline')
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [event['action'] for event in body['events']] == ['submit', 'forward', 'mark_fake']
+    assert not fields(body) & PRIVATE_FIELDS
+    assert 'Photo taken from another city' not in response.get_data(as_text=True)
+
+
+def test_officials_see_full_timeline(app, sign_in):
+    complaint_id = fake_complaint(sign_in)
+
+    for official, values in [('MUN001', {'pincode': '600001'}), ('POLICE001', {'pincode': '600001'})]:
+        response = sign_in(user(user_id=official), **values).get(f'/api/complaint/{complaint_id}/timeline')
+        assert response.status_code == 200
+        assert PRIVATE_FIELDS <= fields(response.get_json())
+
+
+def test_timeline_is_scoped_like_detail(app, sign_in):
+    complaint_id = fake_complaint(sign_in)
+    other = user(phone='9876543211')
+
+    for principal, values in [(other, {'phone': other.phone}),
+                              (user(user_id='DEPT002'), {'pincode': '600001', 'department': 'Electrical Board'}),
+                              (user(user_id='MUN001'), {'pincode': '600002'})]:
+        client = sign_in(principal, **values)
+        assert client.get(f'/api/complaint/{complaint_id}/timeline').status_code == 404
+        assert client.get(f'/api/complaint/{complaint_id}/detail').status_code == 404
@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+import uploads
+from models import User
+
+PHOTO = bytes(range(256)) * 48  # three chunks
+CHUNK = 4096
+
+
+def start(client, **headers):
+    response = client.post('/api/uploads', headers={'Tus-Resumable': '1.0.0', 'Upload-Length': str(len(PHOTO)), **headers})
+    assert response.status_code == 201
+    return response.get_json()['upload_id'], response.headers['Location']
+
+
+def patch(client, url, offset, data):
+    return client.patch(url, data=data, headers={
+        'Tus-Resumable': '1.0.0', 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': str(offset),
+    })
+
+
+@pytest.fixture
+def citizen(app, sign_in):
+    owner = User.query.filter_by(phone='9876543210').first()
+    return owner, sign_in(owner, phone=owner.phone)
+
+
+def test_upload_in_chunks(citizen):
+    owner, client = citizen
+    checksum = 'sha256 ' + base64.b64encode(hashlib.sha256(PHOTO).digest()).decode()
+    upload_id, url = start(client, **{'Upload-Checksum': checksum})
+
+    for offset in range(0, len(PHOTO), CHUNK):
+        response = patch(client, url, offset, PHOTO[offset:offset + CHUNK])
+        assert response.status_code == 204
+        assert int(response.headers['Upload-Offset']) == min(offset + CHUNK, len(PHOTO))
+
+    with open(uploads.finished_upload(upload_id, owner.id), 'rb') as f:
+        assert f.read() == PHOTO
+    assert patch(client, url, 0, PHOTO[:CHUNK]).status_code == 409
+
+
+def head(client, url, upload_id, owner):
+    response = client.head(url, headers={'Tus-Resumable': '1.0.0'})
+    assert response.headers['Upload-Offset'] == str(len(PHOTO))
+
+
+def retry_last_patch(client, url, upload_id, owner):
+    response = patch(client, url, len(PHOTO), b'')
+    assert response.status_code == 204 and response.headers['Upload-Offset'] == str(len(PHOTO))
+
+
+def submit(client, url, upload_id, owner):
+    assert uploads.finished_upload(upload_id, owner.id)
+
+
+@pytest.mark.parametrize('finish', [head, retry_last_patch, submit])
+def test_upload_assembled_after_interrupted_request(citizen, monkeypatch, finish):
+    owner, client = citizen
+    upload_id, url = start(client)
+    for offset in range(0, len(PHOTO) - CHUNK, CHUNK):
+        assert patch(client, url, offset, PHOTO[offset:offset + CHUNK]).status_code == 204
+
+    # The request storing the last chunk dies after publishing it, before assembly completes
+    def interrupted(upload_id, info):
+        raise OSError('worker timed out')
+    with monkeypatch.context() as patched:
+        patched.setattr(uploads, 'assemble', interrupted)
+        last = len(PHOTO) - CHUNK
+        with pytest.raises(OSError):
+            uploads.append_chunk(upload_id, uploads.read_info(upload_id, owner.id), last, PHOTO[last:])
+    directory = uploads.upload_dir(upload_id)
+    assert uploads.DATA_NAME not in os.listdir(directory)
+
+    finish(client, url, upload_id, owner)
+    assert sorted(os.listdir(directory)) == sorted([uploads.INFO_NAME, uploads.DATA_NAME])
+    with open(uploads.finished_upload(upload_id, owner.id), 'rb') as f:
+        assert f.read() == PHOTO
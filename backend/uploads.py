@@ -0,0 +1,383 @@
+"""
+Resumable photo uploads (the core of the tus 1.0 protocol).
+
+A phone on a flaky connection uploads a photo in pieces and, after a dropped
+connection, asks how much arrived and continues from there instead of
+resending the whole photo:
+
+  POST   /api/uploads       Upload-Length: <bytes>
+                            Upload-Checksum: sha256 <base64 digest of the file> (optional)
+                            -> 201, Location: /api/uploads/<id>
+  HEAD   /api/uploads/<id>  -> Upload-Offset: <bytes received>, Upload-Length
+  PATCH  /api/uploads/<id>  Content-Type: application/offset+octet-stream
+                            Upload-Offset: <bytes received so far>
+                            Upload-Checksum: <sha256|sha1|md5> <base64 digest of the chunk> (optional)
+                            -> 204, Upload-Offset: <new offset>
+  DELETE /api/uploads/<id>  abandon the upload
+
+A finished upload's id is passed to /api/complaint/submit as
+``photo_upload_id`` (or to update-status as ``resolved_photo_upload_id``)
+instead of a base64 ``photo``; raw bytes are also a quarter smaller.
+
+Each upload is a directory under UPLOAD_SESSION_DIR holding info.json and one
+file per chunk, named by its offset. Chunks are published with an exclusive
+hard link, so when a client retries a chunk whose response it never saw while
+the first attempt is still running, exactly one of the two is kept and the
+other gets 409. The offset is the length of the contiguous chain of chunks,
+so every web process sees the same value and it survives restarts. The chunk
+that completes the upload concatenates the chunks into one file, checks the
+whole-file checksum and removes them; if that request dies first, the next
+HEAD, PATCH or submission that finds every chunk stored assembles it. Uploads idle for UPLOAD_EXPIRY_HOURS
+are deleted by the ``collect_expired_uploads`` job.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from email.utils import formatdate
+from pathlib import Path
+
+from flask import jsonify, make_response, request, session, url_for
+
+from logs import get_logger, log_event
+from models import db, BackgroundJob, Complaint
+from principals import authorize
+from tasks import enqueue, task
+
+logger = get_logger('uploads')
+
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'uploads'
+)
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 12 * 1024 * 1024))
+UPLOAD_EXPIRY_HOURS = float(os.environ.get('UPLOAD_EXPIRY_HOURS', 24))
+UPLOAD_GC_INTERVAL = int(os.environ.get('UPLOAD_GC_INTERVAL', 3600))
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,checksum,expiration'
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+CHECKSUM_MISMATCH = 460  # status code of the tus checksum extension
+CHUNK_SUFFIX = '.chunk'
+DATA_NAME = 'data'
+INFO_NAME = 'info.json'
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """A request the upload protocol rejects, with the status code to answer"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ==================== STORAGE ====================
+
+def upload_dir(upload_id):
+    if not isinstance(upload_id, str) or not UPLOAD_ID_PATTERN.match(upload_id):
+        return None
+    return os.path.join(UPLOAD_SESSION_DIR, upload_id)
+
+
+def read_info(upload_id, owner):
+    """The upload's info, or None if it does not exist or belongs to someone else"""
+    directory = upload_dir(upload_id)
+    try:
+        with open(os.path.join(directory or '', INFO_NAME)) as f:
+            info = json.load(f)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return info if info['owner'] == owner else None
+
+
+def parse_checksum(header):
+    """(algorithm, digest) from an Upload-Checksum header, or None when absent"""
+    if not header:
+        return None
+    algorithm, _, encoded = header.strip().partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f'Unsupported checksum algorithm; use one of {", ".join(CHECKSUM_ALGORITHMS)}')
+    try:
+        return algorithm, base64.b64decode(encoded.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError('Malformed Upload-Checksum header')
+
+
+def chunk_sizes(directory):
+    """Offset -> size of every stored chunk"""
+    return {
+        int(name[:-len(CHUNK_SUFFIX)]): os.path.getsize(os.path.join(directory, name))
+        for name in os.listdir(directory) if name.endswith(CHUNK_SUFFIX)
+    }
+
+
+def received_bytes(directory, length):
+    if os.path.exists(os.path.join(directory, DATA_NAME)):
+        return length
+    sizes = chunk_sizes(directory)
+    offset = 0
+    while offset in sizes:
+        offset += sizes[offset]
+    return offset
+
+
+def expires_at(directory):
+    return os.stat(directory).st_mtime + UPLOAD_EXPIRY_HOURS * 3600
+
+
+def create_upload(owner, length, checksum=None):
+    """Start an upload of `length` bytes; returns its id"""
+    if length <= 0:
+        raise UploadError('Upload-Length must be positive')
+    if length > UPLOAD_MAX_BYTES:
+        raise UploadError(f'Uploads are limited to {UPLOAD_MAX_BYTES} bytes', 413)
+    upload_id = uuid.uuid4().hex
+    directory = upload_dir(upload_id)
+    os.makedirs(directory)
+    info = {'owner': owner, 'length': length, 'checksum': None}
+    if checksum:
+        info['checksum'] = [checksum[0], base64.b64encode(checksum[1]).decode()]
+    with open(os.path.join(directory, INFO_NAME), 'w') as f:
+        json.dump(info, f)
+    return upload_id
+
+
+def append_chunk(upload_id, info, offset, data, checksum=None):
+    """Store `data` at `offset`; returns the new offset"""
+    directory = upload_dir(upload_id)
+    current = complete_upload(upload_id, info)
+    if offset != current:
+        raise UploadError(f'Upload-Offset {offset} does not match the {current} bytes received', 409)
+    if offset + len(data) > info['length']:
+        raise UploadError('Chunk extends past Upload-Length')
+    if checksum and hashlib.new(checksum[0], data).digest() != checksum[1]:
+        raise UploadError('Chunk checksum mismatch; send it again', CHECKSUM_MISMATCH)
+    if not data:
+        return current
+
+    scratch = os.path.join(directory, f'.{uuid.uuid4().hex}.tmp')
+    with open(scratch, 'wb') as f:
+        f.write(data)
+    try:
+        # Publishing fails if a concurrent request already stored a chunk at this offset
+        os.link(scratch, os.path.join(directory, f'{offset:012d}{CHUNK_SUFFIX}'))
+    except FileExistsError:
+        raise UploadError('Another request already stored this chunk; check Upload-Offset', 409)
+    finally:
+        os.unlink(scratch)
+
+    offset += len(data)
+    if offset == info['length']:
+        assemble(upload_id, info)
+    return offset
+
+
+def complete_upload(upload_id, info):
+    """
+    Bytes received, after assembling an upload whose chunks are all stored but
+    whose data file is missing because the request storing the last chunk died
+    """
+    directory = upload_dir(upload_id)
+    received = received_bytes(directory, info['length'])
+    if received == info['length'] and not os.path.exists(os.path.join(directory, DATA_NAME)):
+        assemble(upload_id, info)
+    return received
+
+
+def assemble(upload_id, info):
+    """Concatenate the chunks into the upload's data file, checking the whole-file checksum"""
+    directory = upload_dir(upload_id)
+    offsets = sorted(chunk_sizes(directory))
+    digest = hashlib.new(info['checksum'][0]) if info.get('checksum') else None
+    # Unique per attempt: a retry may assemble while a stalled request is still at it
+    scratch = os.path.join(directory, f'.{DATA_NAME}.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(scratch, 'wb') as out:
+            for offset in offsets:
+                with open(os.path.join(directory, f'{offset:012d}{CHUNK_SUFFIX}'), 'rb') as chunk:
+                    data = chunk.read()
+                out.write(data)
+                if digest:
+                    digest.update(data)
+    except FileNotFoundError:
+        if os.path.exists(scratch):
+            os.unlink(scratch)
+        if os.path.exists(os.path.join(directory, DATA_NAME)):
+            return  # a concurrent attempt finished first and removed the chunks
+        raise
+    if digest and digest.digest() != base64.b64decode(info['checksum'][1]):
+        shutil.rmtree(directory, ignore_errors=True)
+        log_event(logger, 'upload_checksum_failed', 'Assembled upload failed its checksum', logging.WARNING,
+                  upload_id=upload_id)
+        raise UploadError('File checksum mismatch; upload the file again', CHECKSUM_MISMATCH)
+    os.replace(scratch, os.path.join(directory, DATA_NAME))
+    for offset in offsets:
+        Path(directory, f'{offset:012d}{CHUNK_SUFFIX}').unlink(missing_ok=True)
+
+
+def finished_upload(upload_id, owner):
+    """Path of the complete file of `owner`'s upload, or None"""
+    info = read_info(upload_id, owner)
+    if not info:
+        return None
+    try:
+        complete_upload(upload_id, info)
+    except (UploadError, FileNotFoundError):
+        return None
+    path = os.path.join(upload_dir(upload_id), DATA_NAME)
+    return path if os.path.exists(path) else None
+
+
+def collect_expired(now=None):
+    """Delete uploads idle for longer than UPLOAD_EXPIRY_HOURS; returns (deleted, remaining)"""
+    now = now or time.time()
+    deleted = remaining = 0
+    try:
+        names = os.listdir(UPLOAD_SESSION_DIR)
+    except FileNotFoundError:
+        return 0, 0
+    for name in names:
+        directory = upload_dir(name)
+        if not directory:
+            continue
+        try:
+            expired = expires_at(directory) <= now
+        except FileNotFoundError:
+            continue
+        if expired:
+            shutil.rmtree(directory, ignore_errors=True)
+            deleted += 1
+        else:
+            remaining += 1
+    return deleted, remaining
+
+
+def schedule_collection():
+    """Queue a collection run unless one is already waiting"""
+    waiting = BackgroundJob.query.filter_by(task='collect_expired_uploads', status='queued').first()
+    if not waiting:
+        enqueue('collect_expired_uploads', delay_seconds=UPLOAD_GC_INTERVAL)
+
+
+# ==================== TASKS ====================
+
+@task('adopt_upload')
+def adopt_upload(upload_id, path, column='photo_path'):
+    """Move a finished upload's file to `path` and delete the upload"""
+    directory = upload_dir(upload_id)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        shutil.move(os.path.join(directory, DATA_NAME), path)
+    except FileNotFoundError:
+        # Expired, or already taken by another complaint, before this job ran
+        log_event(logger, 'upload_missing', 'Finished upload no longer exists', logging.WARNING,
+                  upload_id=upload_id, path=path)
+        Complaint.query.filter(getattr(Complaint, column) == path).update(
+            {column: None}, synchronize_session=False
+        )
+        db.session.commit()
+        return
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@task('collect_expired_uploads')
+def collect_expired_uploads():
+    deleted, remaining = collect_expired()
+    if deleted:
+        log_event(logger, 'uploads_expired', f"Deleted {deleted} abandoned uploads", count=deleted)
+    if remaining:
+        enqueue('collect_expired_uploads', delay_seconds=UPLOAD_GC_INTERVAL)
+        db.session.commit()
+
+
+# ==================== ROUTES ====================
+
+def protocol_headers(response, directory=None):
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Cache-Control'] = 'no-store'
+    if directory and os.path.isdir(directory):
+        response.headers['Upload-Expires'] = formatdate(expires_at(directory), usegmt=True)
+    return response
+
+
+def error_response(error):
+    return protocol_headers(jsonify({'success': False, 'message': str(error)})), error.status
+
+
+def header_int(name):
+    try:
+        value = int(request.headers[name])
+    except (KeyError, ValueError):
+        raise UploadError(f'{name} header with a byte count is required')
+    if value < 0:
+        raise UploadError(f'{name} must not be negative')
+    return value
+
+
+def describe_protocol():
+    response = make_response('', 204)
+    response.headers.update({
+        'Tus-Version': TUS_VERSION,
+        'Tus-Extension': TUS_EXTENSIONS,
+        'Tus-Checksum-Algorithm': ','.join(CHECKSUM_ALGORITHMS),
+        'Tus-Max-Size': str(UPLOAD_MAX_BYTES),
+    })
+    return protocol_headers(response)
+
+
+@authorize()
+def start_upload():
+    try:
+        upload_id = create_upload(session['user_id'], header_int('Upload-Length'),
+                                  parse_checksum(request.headers.get('Upload-Checksum')))
+    except UploadError as e:
+        return error_response(e)
+    schedule_collection()
+    db.session.commit()
+    url = url_for('upload_resource', upload_id=upload_id)
+    response = jsonify({'success': True, 'upload_id': upload_id, 'url': url})
+    response.status_code = 201
+    response.headers['Location'] = url
+    return protocol_headers(response, upload_dir(upload_id))
+
+
+@authorize()
+def upload_resource(upload_id):
+    info = read_info(upload_id, session['user_id'])
+    if not info:
+        return error_response(UploadError('Upload not found', 404))
+    directory = upload_dir(upload_id)
+    try:
+        if request.method == 'DELETE':
+            shutil.rmtree(directory, ignore_errors=True)
+            return protocol_headers(make_response('', 204))
+        if request.method == 'PATCH':
+            if request.mimetype != 'application/offset+octet-stream':
+                raise UploadError('Content-Type must be application/offset+octet-stream', 415)
+            offset = append_chunk(upload_id, info, header_int('Upload-Offset'), request.get_data(),
+                                  parse_checksum(request.headers.get('Upload-Checksum')))
+        else:
+            offset = complete_upload(upload_id, info)
+    except FileNotFoundError:
+        # Deleted or expired while this request was running
+        return error_response(UploadError('Upload not found', 404))
+    except UploadError as e:
+        return error_response(e)
+    response = make_response('', 204 if request.method == 'PATCH' else 200)
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Upload-Length'] = str(info['length'])
+    return protocol_headers(response, directory)
+
+
+def init_uploads(app):
+    app.add_url_rule('/api/uploads', 'describe_uploads', describe_protocol, methods=['OPTIONS'])
+    app.add_url_rule('/api/uploads', 'start_upload', start_upload, methods=['POST'])
+    app.add_url_rule('/api/uploads/<upload_id>', 'upload_resource', upload_resource,
+                     methods=['HEAD', 'PATCH', 'DELETE'])
@@ -1,10 +1,15 @@
+"""
 Utility functions and constants for the Civic Issues Reporting and Resolution System
 """
 
+import os
 import re
+import threading
 from datetime import datetime
 from enum import Enum
 
+from sqlalchemy import text
+
 # ==================== CONSTANTS ====================
 
 # User Roles
@@ -31,6 +36,20 @@ class ComplaintPriority(Enum):
     URGENT = 'urgent'
 
 
+# Tamil Nadu districts. Sharded complaint ids encode a district's position
+# here (see shards.py), so new districts are appended, never inserted.
+DISTRICTS = [
+    'Ariyalur', 'Chengalpattu', 'Chennai', 'Coimbatore', 'Cuddalore',
+    'Dharmapuri', 'Dindigul', 'Erode', 'Kallakurichi', 'Kancheepuram',
+    'Kanyakumari', 'Karur', 'Krishnagiri', 'Madurai', 'Mayiladuthurai',
+    'Nagapattinam', 'Namakkal', 'Nilgiris', 'Perambalur', 'Pudukkottai',
+    'Ramanathapuram', 'Ranipet', 'Salem', 'Sivaganga', 'Tenkasi',
+    'Thanjavur', 'Theni', 'Thoothukudi', 'Tiruchirappalli', 'Tirunelveli',
+    'Tirupathur', 'Tiruppur', 'Tiruvallur', 'Tiruvannamalai', 'Tiruvarur',
+    'Vellore', 'Viluppuram', 'Virudhunagar'
+]
+
+
 # Complaint Types
 COMPLAINT_TYPES = [
     'Roads',
@@ -43,6 +62,19 @@ COMPLAINT_TYPES = [
     'Other'
 ]
 
+# Hours a complaint may wait in an open status before it is escalated
+COMPLAINT_SLA_HOURS = {
+    'Roads': 72,
+    'Water': 24,
+    'Garbage': 24,
+    'Drainage': 48,
+    'Streetlight': 48,
+    'Electricity': 24,
+    'Public Safety': 12,
+    'Other': 96
+}
+DEFAULT_SLA_HOURS = 72
+
 # Tamil Nadu Districts
 TAMIL_NADU_DISTRICTS = [
     'Ariyalur', 'Chengalpattu', 'Chennai', 'Coimbatore', 'Cuddalore',
@@ -65,6 +97,19 @@ DEPARTMENTS = [
     'Sanitation'
 ]
 
+# Automatic department routing: (complaint_type, pincode prefix, department, confidence).
+# The longest matching pincode prefix wins; '' matches every pincode.
+# Department names follow the officer login and forward forms.
+DEPARTMENT_ROUTING_RULES = [
+    ('Roads', '', 'Municipal Corporation', 0.9),
+    ('Water', '', 'Municipal Corporation', 0.9),
+    ('Garbage', '', 'Municipal Corporation', 0.95),
+    ('Drainage', '', 'Municipal Corporation', 0.95),
+    ('Streetlight', '', 'Electrical Board', 0.95),
+    ('Electricity', '', 'Electrical Board', 0.95),
+    ('Public Safety', '', 'Fire Station', 0.6),
+]
+
 # ==================== VALIDATION FUNCTIONS ====================
 
 def validate_phone(phone):
@@ -107,15 +152,91 @@ def validate_password(password):
     return True, "Password is strong"
 
 
+def parse_coordinates(coordinates):
+    """Parse 'lat, lng' into floats, or return None"""
+    try:
+        lat, lng = (float(part) for part in (coordinates or '').split(','))
+    except ValueError:
+        return None
+    return lat, lng
+
+
 # ==================== FORMATTING FUNCTIONS ====================
 
-def format_complaint_id():
-    """Generate a formatted complaint ID"""
-    from random import choices
-    import string
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_suffix = ''.join(choices(string.digits, k=4))
-    return f"CMP-{timestamp}-{random_suffix}"
+def format_complaint_id(timestamp, sequence):
+    """Format a complaint ID from its allocation time and sequence number.
+
+    IDs sort by time first, so new rows land at the right-hand edge of the
+    unique index instead of at random positions.
+    """
+    return f"CMP-{timestamp.strftime('%Y%m%d%H%M%S')}-{sequence:06d}"
+
+
+class ComplaintIdAllocator:
+    """Collision-free, time-ordered complaint ID allocator.
+
+    Each process reserves blocks of sequence numbers from the ``id_sequence``
+    table with a single UPDATE and hands them out from memory, so every ID is
+    unique across workers and hosts sharing the database while costing one
+    round trip per ``block_size`` IDs. Blocks are discarded after a fork so a
+    preloaded parent never shares its block with its children.
+    """
+
+    def __init__(self, engine, name='complaint', block_size=100):
+        self.engine = engine
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = 0
+        self._limit = 0
+        self._last_timestamp = None
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS id_sequence ("
+            "name VARCHAR(50) PRIMARY KEY, next_value BIGINT NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO id_sequence (name, next_value) VALUES (:name, 1) "
+            "ON CONFLICT (name) DO NOTHING"
+        ), {'name': self.name})
+        self._table_ready = True
+
+    def _reserve_block(self):
+        with self.engine.begin() as conn:
+            if not self._table_ready:
+                self._ensure_table(conn)
+            conn.execute(text(
+                "UPDATE id_sequence SET next_value = next_value + :size WHERE name = :name"
+            ), {'size': self.block_size, 'name': self.name})
+            limit = conn.execute(text(
+                "SELECT next_value FROM id_sequence WHERE name = :name"
+            ), {'name': self.name}).scalar()
+        self._next = limit - self.block_size
+        self._limit = limit
+        self._pid = os.getpid()
+
+    def next_sequence(self):
+        """Return the next sequence number reserved for this process"""
+        with self._lock:
+            if self._pid != os.getpid() or self._next >= self._limit:
+                self._reserve_block()
+            sequence = self._next
+            self._next += 1
+            return sequence
+
+    def allocate(self):
+        """Return a new unique complaint ID"""
+        sequence = self.next_sequence()
+        with self._lock:
+            # Never step backwards if the wall clock does
+            timestamp = datetime.now().replace(microsecond=0)
+            if self._last_timestamp and timestamp < self._last_timestamp:
+                timestamp = self._last_timestamp
+            self._last_timestamp = timestamp
+        return format_complaint_id(timestamp, sequence)
 
 
 def format_datetime(dt, format='%Y-%m-%d %H:%M:%S'):
@@ -185,6 +306,7 @@ def error_response(message, error_code=None, status_code=400):
 
 # ==================== TRANSLATION DICTIONARY ====================
 
+# The pages fetch one language at a time as JSON (see assets.py / build_assets.py)
 TRANSLATIONS = {
     'en': {
         'welcome': 'Welcome to Civic Issues Reporting and Resolution System',
@@ -197,6 +319,116 @@ TRANSLATIONS = {
         'verify': 'Verify',
         'resolved': 'Resolved',
         'pending': 'Pending',
+        # Dashboard
+        'reportTitle': 'Report New Issue',
+        'reporterName': 'Reporter Name',
+        'yourName': 'Your Name',
+        'mobileNumber': 'Mobile Number',
+        'problemType': 'Problem Type',
+        'district': 'District',
+        'pincode': 'Pincode',
+        'description': 'Description',
+        'location': 'Location',
+        'liveEvidence': 'Live Evidence Photo',
+        'startCamera': 'Start Camera',
+        'capturePhoto': 'Capture Photo',
+        'stopCamera': 'Stop Camera',
+        'submitBtn': 'Submit Complaint',
+        'myComplaints': 'My Complaints',
+        'loading': 'Loading complaints...',
+        'pincodePlaceholder': '6-digit Pincode',
+        'descPlaceholder': 'Describe the issue...',
+        'locPlaceholder': 'Area / Street Details',
+        'optTypeDefault': '-- Select Problem Type --',
+        'optTypeRoads': 'Damaged Roads',
+        'optTypeWater': 'Water Leakage',
+        'optTypeGarbage': 'Garbage Piling',
+        'optTypeDrainage': 'Drainage Cleaning',
+        'optTypeStreetlight': 'Streetlight Issue',
+        'optTypeOther': 'Other',
+        'optDistDefault': 'Select District...',
+        'locationLabel': 'Location',
+        'descLabel': 'Desc',
+        'notesLabel': 'Notes',
+        'reportedLabel': 'Reported',
+        'noComplaints': 'No complaints found',
+        'forwardedTo': 'Forwarded to',
+        'clickForDetails': 'Click to view full details →',
+        'showMap': 'Show map',
+        'loadMore': 'Load more',
+        'headerTitle': 'Dashboard',
+        'roleCitizen': 'Citizen',
+        'roleMunicipal': 'Municipal Officer',
+        'roleDept': 'Dept. Official',
+        'rolePolice': 'Police Officer',
+        'tabSubmitted': 'Submitted',
+        'tabForwarded': 'Forwarded',
+        'tabInProgress': 'In Progress',
+        'tabResolved': 'Resolved',
+        'statusSubmitted': 'Submitted',
+        'statusAssigned': 'Forwarded',
+        'statusInProgress': 'In Progress',
+        'statusResolved': 'Resolved',
+        'municipalTitle': '📋 Complaint Management',
+        'deptTitle': '🛠️ Department Workflow',
+        'policeTitle': 'Fake Complaints Under Investigation',
+        'labelSubmittedAt': 'Submitted',
+        'modalActionTitle': '⚡ Take Action',
+        'optDeptDefault': '-- Select Department to Forward --',
+        'btnForwardModal': '➤ Forward to Dept',
+        'labelUpdateState': '⚙️ Update State',
+        'labelSelectStatus': 'Select Status',
+        'btnUpdate': 'Update',
+        'btnStartWorking': '▶ Start Working',
+        'btnMarkFake': '🚩 Mark Fake',
+        'labelUpdateNotes': 'Update Progress / Resolution Notes',
+        'placeholderWorkDone': 'Describe the work done...',
+        'optStatusForwarded': '📥 Forwarded (New)',
+        'optStatusInProgress': '⚡ In Progress',
+        'optStatusResolved': '✅ Resolved',
+        'modalTitle': 'Complaint Details',
+        'reporterInfo': 'Reporter Information',
+        'modalName': 'Name',
+        'modalPhone': 'Phone',
+        'modalStatus': 'Status',
+        'complaintInfo': 'Complaint Details',
+        'modalType': 'Type',
+        'modalDist': 'District',
+        'modalPin': 'Pincode',
+        'modalLoc': 'Location',
+        'modalDesc': 'Description',
+        'modalNotes': 'Resolution Notes from Department',
+        'mapTitle': 'GPS Coordinates & Live Map',
+        'photoTitle': 'Citizen Live Captured Photo (Evidence)',
+        # Home page
+        'mainTitle': 'Civic Issues Reporting and Resolution System',
+        'mainSubtitle': 'Advanced Reporting & Resolution Platform',
+        'citizen': 'Citizen',
+        'citizenDesc': 'Report issues & track progress',
+        'municipal': 'Municipal Officer',
+        'municipalDesc': 'Verify & Forward complaints',
+        'dept': 'Dept. Official',
+        'deptDesc': 'Resolve issues & Upload Proof',
+        'police': 'Police Officer',
+        'policeDesc': 'Handle fake-report investigations',
+        'citizenLoginTitle': 'Citizen Login',
+        'phoneLabel': 'Phone Number',
+        'phonePlaceholder': 'Enter 10-digit number',
+        'otpLabel': 'Enter OTP',
+        'otpPlaceholder': 'Enter OTP sent to phone',
+        'getOtpBtn': 'Get OTP',
+        'verifyBtn': 'Verify & Login',
+        'cancel': 'Cancel',
+        'officialLoginTitle': 'Official Login',
+        'userIdLabel': 'User ID',
+        'userIdPlaceholder': 'Enter ID',
+        'passwordLabel': 'Password',
+        'passwordPlaceholder': 'Enter Password',
+        'pincodeLabel': 'Pincode',
+        'loginPincodePlaceholder': 'Enter 6-digit Pincode',
+        'deptLabel': 'Department',
+        'deptSelect': 'Select Department...',
+        'loginBtn': 'Login',
     },
     'ta': {
         'welcome': 'சிவிக் பிரச்சனைகள் புகார் மற்றும் தீர்வு முறைமைக்கு வரவேற்கிறோம்',
@@ -209,7 +441,201 @@ TRANSLATIONS = {
         'verify': 'சரிபார்க்க',
         'resolved': 'தீர்க்கப்பட்டது',
         'pending': 'நிலுவையில் உள்ள',
-    }
+        # Dashboard
+        'reportTitle': 'புதிய சிக்கலைப் புகாரளிக்கவும்',
+        'reporterName': 'அறிக்கையாளர் பெயர்',
+        'yourName': 'உங்கள் பெயர்',
+        'mobileNumber': 'மொபைல் எண்',
+        'problemType': 'சிக்கல் வகை',
+        'district': 'மாவட்டம்',
+        'pincode': 'பின் கோடு',
+        'description': 'விளக்கம்',
+        'location': 'இடம்',
+        'liveEvidence': 'நேரடி ஆதாரப் புகைப்படம்',
+        'startCamera': 'கேமராவைத் தொடங்கு',
+        'capturePhoto': 'புகைப்படம் எடு',
+        'stopCamera': 'கேமராவை நிறுத்து',
+        'submitBtn': 'புகாரைச் சமர்ப்பிக்கவும்',
+        'myComplaints': 'எனது புகார்கள்',
+        'loading': 'புகார்கள் ஏற்றப்படுகின்றன...',
+        'pincodePlaceholder': '6 இலக்க பின் கோடு',
+        'descPlaceholder': 'சிக்கலை விவரிக்கவும்...',
+        'locPlaceholder': 'பகுதி / தெரு விவரங்கள்',
+        'optTypeDefault': '-- சிக்கல் வகையைத் தேர்ந்தெடுக்கவும் --',
+        'optTypeRoads': 'சேதமடைந்த சாலைகள்',
+        'optTypeWater': 'நீர் கசிவு',
+        'optTypeGarbage': 'குப்பை குவியல்',
+        'optTypeDrainage': 'வடிகால் சோதனை',
+        'optTypeStreetlight': 'தெரு விளக்கு சிக்கல்',
+        'optTypeOther': 'மற்றவை',
+        'optDistDefault': 'மாவட்டத்தைத் தேர்ந்தெடுக்கவும்...',
+        'locationLabel': 'இடம்',
+        'descLabel': 'விவரம்',
+        'notesLabel': 'குறிப்புகள்',
+        'reportedLabel': 'புகாரளிக்கப்பட்ட தேதி',
+        'noComplaints': 'புகார்கள் எதுவும் இல்லை',
+        'forwardedTo': 'இதற்கு அனுப்பப்பட்டது',
+        'clickForDetails': 'முழு விவரங்களைக் காண கிளிக் செய்யவும் →',
+        'showMap': 'வரைபடத்தைக் காட்டு',
+        'loadMore': 'மேலும் காட்டு',
+        'headerTitle': 'முகப்பு',
+        'roleCitizen': 'குடிமகன்',
+        'roleMunicipal': 'நகராட்சி அதிகாரி',
+        'roleDept': 'துறை அதிகாரி',
+        'rolePolice': 'காவல் அதிகாரி',
+        'tabSubmitted': 'சமர்ப்பிக்கப்பட்டது',
+        'tabForwarded': 'அனுப்பப்பட்டது',
+        'tabInProgress': 'செயல்பாட்டில்',
+        'tabResolved': 'தீர்வு காணப்பட்டது',
+        'statusSubmitted': 'சமர்ப்பிக்கப்பட்டது',
+        'statusAssigned': 'அனுப்பப்பட்டது',
+        'statusInProgress': 'செயல்பாட்டில்',
+        'statusResolved': 'தீர்வு காணப்பட்டது',
+        'municipalTitle': '📋 புகார் மேலாண்மை',
+        'deptTitle': '🛠️ துறை பணிப்பாய்வு',
+        'policeTitle': 'விசாரணையில் உள்ள போலி புகார்கள்',
+        'labelSubmittedAt': 'சமர்ப்பிக்கப்பட்டது',
+        'modalActionTitle': '⚡ நடவடிக்கை எடுக்க',
+        'optDeptDefault': '-- அனுப்ப வேண்டிய துறையைத் தேர்ந்தெடுக்கவும் --',
+        'btnForwardModal': '➤ துறைக்கு அனுப்புக',
+        'labelUpdateState': '⚙️ நிலையை புதுப்பிக்கவும்',
+        'labelSelectStatus': 'நிலையைத் தேர்ந்தெடுக்கவும்',
+        'btnUpdate': 'புதுப்பிக்கவும்',
+        'btnStartWorking': '▶ வேலையைத் தொடங்கவும்',
+        'btnMarkFake': '🚩 போலி என்று குறிக்கவும்',
+        'labelUpdateNotes': 'முன்னேற்றத்தைப் புதுப்பிக்கவும் / தீர்வு குறிப்புகள்',
+        'placeholderWorkDone': 'செய்யப்பட்ட வேலையை விவரிக்கவும்...',
+        'optStatusForwarded': '📥 அனுப்பப்பட்டது (தமிழ்)',
+        'optStatusInProgress': '⚡ சுறறத்தில் உள்ளது',
+        'optStatusResolved': '✅ தீர்வு காணப்\u0ba0ட்டது',
+        'modalTitle': 'புகார் விவரங்கள்',
+        'reporterInfo': 'அறிக்கையாளர் தகவல்',
+        'modalName': 'பெயர்',
+        'modalPhone': 'தொலைபேசி',
+        'modalStatus': 'நிலை',
+        'complaintInfo': 'புகார் விவரங்கள்',
+        'modalType': 'வகை',
+        'modalDist': 'மாவட்டம்',
+        'modalPin': 'பின் கோடு',
+        'modalLoc': 'இடம்',
+        'modalDesc': 'விளக்கம்',
+        'modalNotes': 'துறையிலிருந்து தீர்வு குறிப்புகள்',
+        'mapTitle': 'ஜிபிஎஸ் ஒருங்கிணைப்புகள் மற்றும் நேரடி வரைபடம்',
+        'photoTitle': 'குடிமகன் நேரலையில் எடுத்த புகைப்படம் (ஆதாரம்)',
+        # Home page
+        'mainTitle': 'சிவிக் பிரச்சனைகள் புகார் மற்றும் தீர்வு முறைமை',
+        'mainSubtitle': 'மேம்பட்ட அறிக்கை மற்றும் தீர்வு தளம்',
+        'citizen': 'குடிமகன்',
+        'citizenDesc': 'சிக்கல்களைப் புகாரளிக்கவும் & முன்னேற்றத்தைக் கண்காணிக்கவும்',
+        'municipal': 'நகராட்சி அதிகாரி',
+        'municipalDesc': 'புகார்களை சரிபார்த்து முன்னனுப்பவும்',
+        'dept': 'துறை அதிகாரி',
+        'deptDesc': 'சிக்கல்களைத் தீர்க்கவும் & ஆதாரத்தைப் பதிவேற்றவும்',
+        'police': 'காவல் அதிகாரி',
+        'policeDesc': 'போலி புகார் விசாரணைகளைக் கையாளவும்',
+        'citizenLoginTitle': 'குடிமகன் உள்நுழைவு',
+        'phoneLabel': 'தொலைபேசி எண்',
+        'phonePlaceholder': '10 இலக்க எண்ணை உள்ளிடவும்',
+        'otpLabel': 'OTP-ஐ உள்ளிடவும்',
+        'otpPlaceholder': 'தொலைபேசிக்கு அனுப்பப்பட்ட OTP-ஐ உள்ளிடவும்',
+        'getOtpBtn': 'OTP பெறவும்',
+        'verifyBtn': 'சரிபார்த்து உள்நுழையவும்',
+        'cancel': 'ரத்து',
+        'officialLoginTitle': 'அதிகாரி உள்நுழைவு',
+        'userIdLabel': 'பயனர் ஐடி',
+        'userIdPlaceholder': 'ஐடியை உள்ளிடவும்',
+        'passwordLabel': 'கடவுச்சொல்',
+        'passwordPlaceholder': 'கடவுச்சொல்லை உள்ளிடவும்',
+        'pincodeLabel': 'அஞ்சல் குறியீடு (Pincode)',
+        'loginPincodePlaceholder': '6 இலக்க எண்ணை உள்ளிடவும்',
+        'deptLabel': 'துறை',
+        'deptSelect': 'துறையைத் தேர்ந்தெடுக்கவும்...',
+        'loginBtn': 'உள்நுழை',
+    },
+    'hi': {
+        # Dashboard
+        'reportTitle': 'नई शिकायत दर्ज करें',
+        'reporterName': 'रिपोर्टर का नाम',
+        'yourName': 'आपका नाम',
+        'mobileNumber': 'मोबाइल नंबर',
+        'problemType': 'समस्या का प्रकार',
+        'district': 'जिला',
+        'pincode': 'पिनकोड',
+        'description': 'विवरण',
+        'location': 'स्थान',
+        'liveEvidence': 'लाइव प्रमाण फोटो',
+        'startCamera': 'कैमरा शुरू करें',
+        'capturePhoto': 'फोटो खींचें',
+        'stopCamera': 'कैमरा बंद करें',
+        'submitBtn': 'शिकायत जमा करें',
+        'myComplaints': 'मेरी शिकायतें',
+        'loading': 'शिकायतें लोड हो रही हैं...',
+        'pincodePlaceholder': '6-अंकों का पिनकोड',
+        'descPlaceholder': 'समस्या का वर्णन करें...',
+        'locPlaceholder': 'क्षेत्र / सड़क का विवरण',
+        'optTypeDefault': '-- समस्या का प्रकार चुनें --',
+        'optTypeRoads': 'खराब सड़कें',
+        'optTypeWater': 'पानी का रिसाव',
+        'optTypeGarbage': 'कचरे का ढेर',
+        'optTypeDrainage': 'नाली की सफाई',
+        'optTypeStreetlight': 'स्ट्रीटलाइट की समस्या',
+        'optTypeOther': 'अन्य',
+        'optDistDefault': 'जिला चुनें...',
+        'locationLabel': 'स्थान',
+        'descLabel': 'विवरण',
+        'notesLabel': 'नोट्स',
+        'reportedLabel': 'रिपोर्ट किया गया',
+        'noComplaints': 'कोई शिकायत नहीं मिली',
+        'forwardedTo': 'को भेजा गया',
+        'clickForDetails': 'पूरा विवरण देखने के लिए क्लिक करें →',
+        'showMap': 'नक्शा दिखाएं',
+        'loadMore': 'और दिखाएं',
+        'headerTitle': 'डैशबोर्ड',
+        'logout': 'लॉगआउट',
+        'roleCitizen': 'नागरिक',
+        'roleMunicipal': 'नगर पालिका अधिकारी',
+        'roleDept': 'विभाग अधिकारी',
+        'rolePolice': 'पुलिस अधिकारी',
+        'tabSubmitted': 'जमा की गई',
+        'tabForwarded': 'भेजी गई',
+        'tabInProgress': 'प्रगति पर',
+        'tabResolved': 'समाधान हो गया',
+        'statusSubmitted': 'जमा की गई',
+        'statusAssigned': 'भेजी गई',
+        'statusInProgress': 'प्रगति पर',
+        'statusResolved': 'समाधान हो गया',
+        'municipalTitle': '📋 शिकायत प्रबंधन',
+        'deptTitle': '🛠️ विभाग कार्यप्रवाह',
+        'policeTitle': 'जांच के अधीन फर्जी शिकायतें',
+        'labelSubmittedAt': 'जमा की गई',
+        'modalActionTitle': '⚡ कार्रवाई करें',
+        'optDeptDefault': '-- भेजने के लिए विभाग चुनें --',
+        'btnForwardModal': '➤ विभाग को भेजें',
+        'labelUpdateState': '⚙️ स्थिति अपडेट करें',
+        'labelSelectStatus': 'स्थिति चुनें',
+        'btnUpdate': 'अपडेट करें',
+        'btnStartWorking': '▶ काम शुरू करें',
+        'btnMarkFake': '🚩 फर्जी चिह्नित करें',
+        'labelUpdateNotes': 'प्रगति / समाधान नोट्स अपडेट करें',
+        'placeholderWorkDone': 'किए गए कार्य का वर्णन करें...',
+        'optStatusForwarded': '📥 भेजी गई (नई)',
+        'optStatusInProgress': '⚡ प्रगति पर',
+        'optStatusResolved': '✅ समाधान हो गया',
+        'modalTitle': 'शिकायत का विवरण',
+        'reporterInfo': 'रिपोर्टर की जानकारी',
+        'modalName': 'नाम',
+        'modalPhone': 'फोन',
+        'modalStatus': 'स्थिति',
+        'complaintInfo': 'शिकायत का विवरण',
+        'modalType': 'प्रकार',
+        'modalDist': 'जिला',
+        'modalPin': 'पिनकोड',
+        'modalLoc': 'स्थान',
+        'modalDesc': 'विवरण',
+        'modalNotes': 'विभाग से समाधान नोट्स',
+        'mapTitle': 'जीपीएस निर्देशांक और लाइव मैप',
+        'photoTitle': 'नागरिक द्वारा ली गई लाइव फोटो (प्रमाण)',
+    },
 }
 
 
@@ -0,0 +1,331 @@
+"""
+Automated checks of resolution proofs.
+
+A department resolves a complaint with a photo and the GPS position it was
+taken at (update_status() in app.py), but nothing on the server looked at
+them. The ``verify_resolutions`` job consumes the event log (events.py)
+under the ``verification`` cursor and checks every newly resolved complaint
+in vectorized (numpy) passes over the whole batch:
+
+* distance: haversine distance between the complaint's coordinates and the
+  resolution's, flagged ``far_from_site`` beyond VERIFY_MAX_DISTANCE_KM;
+* time to resolve: log hours from submission to resolution against the
+  department's resolutions of the last VERIFY_BASELINE_DAYS, as a robust
+  z-score (median and MAD), flagged ``too_fast`` below -VERIFY_TIME_Z once the
+  department has VERIFY_MIN_SAMPLES of them. Slow resolutions are left to the
+  SLA escalation;
+* photos: 64-bit difference hashes of the reported and the proof photo,
+  flagged ``same_photo`` when they are at least VERIFY_PHOTO_SIMILARITY
+  alike, i.e. the proof shows the problem as reported. The bottom of both is
+  cut off first, where the dashboard burns the GPS/time banner into the
+  proof. JPEGs are decoded at reduced scale, on VERIFY_HASH_THREADS threads;
+* missing proof: ``no_location`` and ``no_photo`` for resolutions without
+  coordinates or a readable proof photo (quick and bulk resolves carry
+  neither).
+
+Each complaint gets one ResolutionCheck row, replaced when it is resolved
+again. Rows with any flag are ``flagged`` for municipal review:
+``GET /api/resolution-checks`` lists them and
+``POST /api/resolution-checks/<id>/review`` records the outcome. Events are
+read VERIFY_DELAY_SECONDS after they were written, by when the background
+job saving the proof photo has run. A run reads at most VERIFY_BATCH events
+and comes back within seconds while a backlog remains.
+
+Usage:
+  python verification.py    - Check every resolution not checked yet and exit
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from PIL import Image
+
+from events import advance_cursor, cursor_position, read_events
+from logs import get_logger, log_event
+from models import db, ArchivedComplaint, BackgroundJob, Complaint, ResolutionCheck
+from tasks import enqueue, task
+from utils import parse_coordinates
+
+logger = get_logger('verification')
+
+VERIFY_INTERVAL = int(os.environ.get('VERIFY_INTERVAL', 300))
+VERIFY_BATCH = int(os.environ.get('VERIFY_BATCH', 5000))  # events read per run
+VERIFY_DELAY_SECONDS = float(os.environ.get('VERIFY_DELAY_SECONDS', 120))
+VERIFY_MAX_DISTANCE_KM = float(os.environ.get('VERIFY_MAX_DISTANCE_KM', 0.5))
+VERIFY_BASELINE_DAYS = float(os.environ.get('VERIFY_BASELINE_DAYS', 90))
+VERIFY_TIME_Z = float(os.environ.get('VERIFY_TIME_Z', 3.5))
+VERIFY_MIN_SAMPLES = int(os.environ.get('VERIFY_MIN_SAMPLES', 20))
+VERIFY_PHOTO_SIMILARITY = float(os.environ.get('VERIFY_PHOTO_SIMILARITY', 0.9))
+VERIFY_HASH_THREADS = int(os.environ.get('VERIFY_HASH_THREADS', 4))
+VERIFY_BACKLOG_INTERVAL = 5
+VERIFY_CURSOR = 'verification'
+VERIFY_CHUNK_SIZE = 500  # ids per IN (...) lookup
+CHECK_PAGE_MAX = 500
+REVIEW_OUTCOMES = ('cleared', 'confirmed')
+
+EARTH_RADIUS_KM = 6371.0
+HASH_SIZE = 8  # 8x8 difference bits
+BANNER_FRACTION = 0.15  # bottom of a photo ignored by the hash: the proof's GPS/time banner
+MAD_FLOOR = 0.05  # log hours; keeps near-identical durations from making any difference an outlier
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'static', 'uploads')
+
+RESOLUTION_COLUMNS = (
+    'id', 'forwarded_department', 'pincode', 'created_at', 'resolved_at', 'photo_path', 'resolved_photo_path',
+    'coordinates', 'latitude', 'longitude', 'resolved_coordinates', 'resolved_latitude', 'resolved_longitude',
+)
+
+
+# ==================== LOADING ====================
+
+def load_resolutions(complaint_ids):
+    """Resolved, non-fake complaints among `complaint_ids`, live or archived, in that order"""
+    rows = {}
+    for model in (Complaint, ArchivedComplaint):
+        pending = [complaint_id for complaint_id in complaint_ids if complaint_id not in rows]
+        for start in range(0, len(pending), VERIFY_CHUNK_SIZE):
+            query = db.session.query(*(getattr(model, column) for column in RESOLUTION_COLUMNS)).filter(
+                model.id.in_(pending[start:start + VERIFY_CHUNK_SIZE]),
+                model.status == 'resolved',
+                model.is_fake.isnot(True),
+            )
+            rows.update((row.id, row) for row in query)
+    return [rows[complaint_id] for complaint_id in complaint_ids if complaint_id in rows]
+
+
+def coordinate_arrays(rows, prefix=''):
+    """Latitudes and longitudes of `rows` (NaN where missing)"""
+    lat = np.array([getattr(row, prefix + 'latitude') for row in rows], dtype=float)
+    lng = np.array([getattr(row, prefix + 'longitude') for row in rows], dtype=float)
+    # Rows the migration backfill has not reached yet only have the string
+    for i in np.flatnonzero(np.isnan(lat) | np.isnan(lng)):
+        parsed = parse_coordinates(getattr(rows[i], prefix + 'coordinates'))
+        if parsed:
+            lat[i], lng[i] = parsed
+    return lat, lng
+
+
+def hours_between(starts, ends):
+    """Hours from each start to its end (NaN where either is missing)"""
+    starts = np.array(starts, dtype='datetime64[s]')
+    ends = np.array(ends, dtype='datetime64[s]')
+    return (ends - starts) / np.timedelta64(1, 'h')
+
+
+def photo_file(path):
+    """The photo at `path`, or the file of that name in the uploads folder (paths saved from another cwd)"""
+    if not path:
+        return None
+    if os.path.isfile(path):
+        return path
+    candidate = os.path.join(UPLOADS_DIR, os.path.basename(path))
+    return candidate if os.path.isfile(candidate) else None
+
+
+def difference_hash(path):
+    """64-bit difference hash of the photo at `path`, or None when there is no readable photo"""
+    path = photo_file(path)
+    if path is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            # JPEG decodes straight to a small grayscale image, skipping most of the work
+            image.draft('L', (HASH_SIZE * 16, HASH_SIZE * 16))
+            image = image.convert('L')
+            width, height = image.size
+            image = image.crop((0, 0, width, max(int(height * (1 - BANNER_FRACTION)), 1)))
+            pixels = np.asarray(image.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    except (OSError, ValueError):
+        return None
+    return int.from_bytes(np.packbits(pixels[:, 1:] > pixels[:, :-1]).tobytes(), 'big')
+
+
+def photo_hashes(paths):
+    with ThreadPoolExecutor(max_workers=VERIFY_HASH_THREADS) as pool:
+        return list(pool.map(difference_hash, paths))
+
+
+# ==================== CHECKS ====================
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(a) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def photo_similarity(before, after):
+    """1 - Hamming distance / 64 of each pair of hashes (NaN where either photo is missing)"""
+    present = np.array([b is not None and a is not None for b, a in zip(before, after)], dtype=bool)
+    before = np.array([b or 0 for b in before], dtype=np.uint64)
+    after = np.array([a or 0 for a in after], dtype=np.uint64)
+    distance = np.unpackbits((before ^ after).view(np.uint8)).reshape(-1, 64).sum(axis=1)
+    return np.where(present, 1 - distance / 64, np.nan)
+
+
+def department_baselines(departments, since):
+    """{department: (median, MAD) of log hours to resolve} over its resolutions since `since`"""
+    rows = []
+    for model in (Complaint, ArchivedComplaint):
+        rows += db.session.query(model.forwarded_department, model.created_at, model.resolved_at).filter(
+            model.forwarded_department.in_(departments),
+            model.status == 'resolved',
+            model.is_fake.isnot(True),
+            model.resolved_at >= since,
+        ).all()
+    if not rows:
+        return {}
+    names = np.array([row[0] for row in rows], dtype=object)
+    log_hours = np.log1p(np.maximum(hours_between([row[1] for row in rows], [row[2] for row in rows]), 0))
+    baselines = {}
+    for department in departments:
+        sample = log_hours[(names == department) & ~np.isnan(log_hours)]
+        if len(sample) >= VERIFY_MIN_SAMPLES:
+            median = np.median(sample)
+            baselines[department] = (median, np.median(np.abs(sample - median)))
+    return baselines
+
+
+def check_resolutions(rows, now=None):
+    """One dict of measurements and flags per resolved complaint row, computed over the whole batch at once"""
+    if not rows:
+        return []
+    now = now or datetime.now()
+    lat, lng = coordinate_arrays(rows)
+    resolved_lat, resolved_lng = coordinate_arrays(rows, 'resolved_')
+    distance = haversine_km(lat, lng, resolved_lat, resolved_lng)
+
+    hours = hours_between([row.created_at for row in rows], [row.resolved_at for row in rows])
+    departments = [row.forwarded_department for row in rows]
+    baselines = department_baselines(sorted({d for d in departments if d}), now - timedelta(days=VERIFY_BASELINE_DAYS))
+    median = np.array([baselines.get(d, (np.nan, np.nan))[0] for d in departments], dtype=float)
+    mad = np.array([baselines.get(d, (np.nan, np.nan))[1] for d in departments], dtype=float)
+    # 0.6745 scales the MAD to a standard deviation for normally distributed durations
+    z = 0.6745 * (np.log1p(np.maximum(hours, 0)) - median) / np.maximum(mad, MAD_FLOOR)
+
+    before = photo_hashes([row.photo_path for row in rows])
+    after = photo_hashes([row.resolved_photo_path for row in rows])
+    similarity = photo_similarity(before, after)
+
+    with np.errstate(invalid='ignore'):
+        tests = {
+            'far_from_site': distance > VERIFY_MAX_DISTANCE_KM,
+            'too_fast': z < -VERIFY_TIME_Z,
+            'same_photo': similarity >= VERIFY_PHOTO_SIMILARITY,
+            'no_location': np.isnan(resolved_lat),
+            'no_photo': np.array([h is None for h in after], dtype=bool),
+        }
+    flags = [[] for _ in rows]
+    for name, failed in tests.items():
+        for i in np.flatnonzero(failed):
+            flags[i].append(name)
+
+    def measured(values, i):
+        return None if np.isnan(values[i]) else round(float(values[i]), 3)
+
+    return [{
+        'complaint_id': row.id,
+        'department': row.forwarded_department,
+        'pincode': row.pincode,
+        'distance_km': measured(distance, i),
+        'resolve_hours': measured(hours, i),
+        'resolve_z': measured(z, i),
+        'photo_similarity': measured(similarity, i),
+        'flags': ','.join(flags[i]) or None,
+    } for i, row in enumerate(rows)]
+
+
+# ==================== JOB ====================
+
+def record_checks(results, event_ids, now=None):
+    """Store each result as its complaint's ResolutionCheck, replacing an earlier one"""
+    now = now or datetime.now()
+    ids = [result['complaint_id'] for result in results]
+    existing = {}
+    for start in range(0, len(ids), VERIFY_CHUNK_SIZE):
+        existing.update((check.complaint_id, check) for check in ResolutionCheck.query.filter(
+            ResolutionCheck.complaint_id.in_(ids[start:start + VERIFY_CHUNK_SIZE])
+        ))
+    for result in results:
+        check = existing.get(result['complaint_id'])
+        if check is None:
+            check = ResolutionCheck(complaint_id=result['complaint_id'])
+            db.session.add(check)
+        for key, value in result.items():
+            setattr(check, key, value)
+        check.event_id = event_ids[result['complaint_id']]
+        check.status = 'flagged' if result['flags'] else 'ok'
+        check.reviewed_by = None
+        check.reviewed_at = None
+        check.checked_at = now
+
+
+def verify_batch(limit=VERIFY_BATCH):
+    """Check the resolutions among the next events after the cursor; returns (events read, checked, flagged)"""
+    events = read_events(cursor_position(VERIFY_CURSOR), limit, settle_seconds=VERIFY_DELAY_SECONDS)
+    if not events:
+        return 0, 0, 0
+    # The latest resolve event of each complaint in the batch
+    event_ids = {event.complaint_id: event.id for event in events if event.action == 'resolve'}
+    results = check_resolutions(load_resolutions(list(event_ids)))
+    record_checks(results, event_ids)
+    advance_cursor(VERIFY_CURSOR, events[-1].id)
+    return len(events), len(results), sum(1 for result in results if result['flags'])
+
+
+def schedule_verification(delay_seconds=VERIFY_INTERVAL):
+    """Queue a verification run unless one is already waiting"""
+    waiting = BackgroundJob.query.filter_by(task='verify_resolutions', status='queued').first()
+    if not waiting:
+        enqueue('verify_resolutions', delay_seconds=delay_seconds)
+
+
+@task('verify_resolutions')
+def verify_resolutions():
+    read, checked, flagged = verify_batch()
+    if checked:
+        log_event(logger, 'resolutions_verified', f'Checked {checked} resolutions, flagged {flagged}',
+                  checked=checked, flagged=flagged)
+    schedule_verification(VERIFY_BACKLOG_INTERVAL if read == VERIFY_BATCH else VERIFY_INTERVAL)
+    db.session.commit()
+
+
+# ==================== REVIEW ====================
+
+def check_dict(check):
+    return {
+        'id': check.id,
+        'complaint_id': check.complaint_id,
+        'department': check.department,
+        'pincode': check.pincode,
+        'distance_km': check.distance_km,
+        'resolve_hours': check.resolve_hours,
+        'resolve_z': check.resolve_z,
+        'photo_similarity': check.photo_similarity,
+        'flags': check.flags.split(',') if check.flags else [],
+        'status': check.status,
+        'reviewed_by': check.reviewed_by,
+        'checked_at': check.checked_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def review(check, outcome, reviewer_id):
+    """Record a reviewer's verdict on a flagged check: the proof is fine (cleared) or not (confirmed)"""
+    check.status = outcome
+    check.reviewed_by = reviewer_id
+    check.reviewed_at = datetime.now()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        totals = [0, 0]
+        while True:
+            read, checked, flagged = verify_batch()
+            db.session.commit()
+            totals[0] += checked
+            totals[1] += flagged
+            if read < VERIFY_BATCH:
+                break
+        print(f"✓ Checked {totals[0]} resolutions, flagged {totals[1]} for review")
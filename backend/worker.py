@@ -0,0 +1,21 @@
+"""
+Background job worker for the Civic Issues Reporting and Resolution System.
+
+Usage:
+  python worker.py         - Process jobs until interrupted
+  python worker.py --once  - Drain the queue once and exit
+
+Set EMBEDDED_WORKER=0 on the web processes when a dedicated worker runs.
+"""
+
+import os
+import sys
+
+# This process is the worker: jobs it enqueues must not start an embedded drain thread as well
+os.environ['EMBEDDED_WORKER'] = '0'
+
+from app import app  # noqa: E402
+from tasks import run_worker  # noqa: E402
+
+if __name__ == '__main__':
+    run_worker(app, once='--once' in sys.argv)
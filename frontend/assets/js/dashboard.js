@@ -0,0 +1,1471 @@
+let mediaStream = null;
+let photoData = null;
+
+let currentLanguage = 'en';
+
+function setLanguage(lang) {
+    currentLanguage = lang;
+    // Use role-specific key to avoid leakage between roles
+    const key = role + 'Language';
+    localStorage.setItem(key, lang);
+    // Server-rendered cards come in the language of this cookie
+    document.cookie = `lang=${lang}; path=/; max-age=31536000; samesite=lax`;
+    // Sync selector if it exists
+    const selector = document.getElementById('language-selector');
+    if (selector) selector.value = lang;
+    return loadTranslations(lang).then(() => {
+        // Ignore a table that arrives after the user picked another language
+        if (currentLanguage === lang) applyTranslations(lang);
+    });
+}
+
+function getSavedLanguage() {
+    const key = role + 'Language';
+    return localStorage.getItem(key) || 'en';
+}
+
+function applyTranslations(lang) {
+    const t = translations[lang] || translations['en'];
+
+    const map = {
+        'header-title': 'headerTitle',
+        'report-title': 'reportTitle',
+        'label-name': 'reporterName',
+        'label-phone': 'mobileNumber',
+        'label-type': 'problemType',
+        'label-district': 'district',
+        'label-pincode': 'pincode',
+        'label-desc': 'description',
+        'label-location': 'location',
+        'label-camera': 'liveEvidence',
+        'btn-start-camera': 'startCamera',
+        'btn-capture': 'capturePhoto',
+        'btn-stop-camera': 'stopCamera',
+        'btn-submit': 'submitBtn',
+        'my-complaints-title': 'myComplaints',
+        'opt-type-default': 'optTypeDefault',
+        'opt-type-roads': 'optTypeRoads',
+        'opt-type-water': 'optTypeWater',
+        'opt-type-garbage': 'optTypeGarbage',
+        'opt-type-drainage': 'optTypeDrainage',
+        'opt-type-streetlight': 'optTypeStreetlight',
+        'opt-type-other': 'optTypeOther',
+        'opt-dist-default': 'optDistDefault',
+        'modal-complaint-id': 'modalTitle',
+        'modal-reporter-info': 'reporterInfo',
+        'modal-label-name': 'modalName',
+        'modal-label-phone': 'modalPhone',
+        'modal-label-status': 'modalStatus',
+        'modal-complaint-info': 'complaintInfo',
+        'modal-label-type': 'modalType',
+        'modal-label-dist': 'modalDist',
+        'modal-label-pin': 'modalPin',
+        'modal-label-loc': 'modalLoc',
+        'modal-label-desc': 'modalDesc',
+        'modal-label-notes': 'modalNotes',
+        'modal-map-title': 'mapTitle',
+        'modal-photo-title': 'photoTitle',
+        'logout-btn': 'logout',
+        'lbl-tab-submitted': 'tabSubmitted',
+        'lbl-tab-assigned': 'tabForwarded',
+        'lbl-tab-inprogress': 'tabInProgress',
+        'lbl-tab-resolved': 'tabResolved',
+        'municipal-title': 'municipalTitle',
+        'dept-title': 'deptTitle',
+        'police-title': 'policeTitle',
+        'modal-action-title': 'modalActionTitle',
+        'btn-forward-modal': 'btnForwardModal',
+        'opt-dept-default': 'optDeptDefault'
+    };
+
+    Object.keys(map).forEach(id => {
+        const el = document.getElementById(id);
+        if (el) {
+            // Preserve icons if they exist
+            const icon = el.querySelector('i');
+            if (icon) {
+                // Use span for text to ensure proper alignment in flex containers
+                el.innerHTML = `${icon.outerHTML} <span>${t[map[id]]}</span>`;
+            } else {
+                el.textContent = t[map[id]];
+            }
+        }
+    });
+
+    // Update placeholders
+    const placeholders = {
+        'c-name': 'yourName',
+        'c-pincode': 'pincodePlaceholder',
+        'c-desc': 'descPlaceholder',
+        'c-loc': 'locPlaceholder'
+    };
+
+    Object.keys(placeholders).forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.placeholder = t[placeholders[id]];
+    });
+
+    // Update loading text if visible
+    const list = document.getElementById('complaints-list');
+    if (list && list.children.length === 1 && list.children[0].tagName === 'P') {
+        list.children[0].textContent = t['loading'];
+    }
+
+    // Update role badge
+    const badge = document.getElementById('user-badge');
+    if (badge) {
+        const roleKey = 'role' + role.charAt(0).toUpperCase() + role.slice(1);
+        badge.textContent = t[roleKey] || role;
+    }
+
+    // Sync with current list
+    if (serverCards || (typeof allComplaints !== 'undefined' && allComplaints.length > 0)) {
+        renderComplaints();
+    }
+}
+
+// Load complaints on page load
+document.addEventListener('DOMContentLoaded', function () {
+    // Initialize language
+    const savedLang = getSavedLanguage();
+    setLanguage(savedLang);
+
+    // Server-rendered cards arrive with the page; only other tabs and languages are fetched
+    const initialLoad = serverCards ? Promise.resolve() : loadComplaints();
+    initialLoad.then(() => {
+        if (role === 'dept') {
+            setActiveTab('assigned');
+        }
+    });
+
+    // Bind form submission for citizens
+    if (role === 'citizen') {
+        const form = document.getElementById('citizen-form');
+        if (form) form.addEventListener('submit', submitComplaint);
+    }
+
+    // Offline shell and queued submissions/status updates
+    startOutbox();
+});
+
+// ============ CAMERA FUNCTIONS ============
+async function startCamera() {
+    try {
+        const video = document.getElementById('liveCamera');
+        mediaStream = await navigator.mediaDevices.getUserMedia({
+            video: { facingMode: 'environment' },
+            audio: false
+        });
+        video.srcObject = mediaStream;
+        video.play();
+        alert('📹 Camera started! Click "Capture Photo" to take a picture.');
+    } catch (error) {
+        alert('❌ Camera Error: ' + error.message + '\n\nMake sure you allow camera access.');
+        console.error('Camera error:', error);
+    }
+}
+
+function capturePhoto() {
+    const video = document.getElementById('liveCamera');
+    if (!mediaStream) {
+        alert('Please start the camera first!');
+        return;
+    }
+
+    const canvas = document.createElement('canvas');
+    canvas.width = video.videoWidth;
+    canvas.height = video.videoHeight;
+
+    const ctx = canvas.getContext('2d');
+    ctx.drawImage(video, 0, 0);
+
+    photoData = canvas.toDataURL('image/jpeg', 0.8);
+
+    // Show preview
+    const previewImg = document.getElementById('photo-preview');
+    previewImg.src = photoData;
+    document.getElementById('photo-preview-container').classList.remove('hidden');
+
+    alert('✅ Photo captured successfully!\n\n📍 Now capturing your location...');
+
+    // Automatically capture location when photo is captured
+    setTimeout(captureLocationAutomatic, 500);
+}
+
+function stopCamera(showAlert = true) {
+    if (mediaStream) {
+        mediaStream.getTracks().forEach(track => track.stop());
+        mediaStream = null;
+        if (showAlert) alert('📹 Camera stopped');
+    }
+}
+
+function clearPhoto() {
+    photoData = null;
+    document.getElementById('photo-preview-container').classList.add('hidden');
+    document.getElementById('c-photo').value = '';
+    document.getElementById('photo-location-display').innerHTML = 'Capturing location...';
+    alert('Photo & Location cleared');
+}
+
+// ============ RESUMABLE PHOTO UPLOADS ============
+// Photos go up in chunks (see backend/uploads.py); after a dropped connection
+// only the missing part is sent again.
+const UPLOAD_CHUNK_BYTES = 256 * 1024;
+const UPLOAD_RETRY_DELAYS_MS = [1000, 2000, 5000, 10000, 20000, 30000];
+const TUS_HEADERS = { 'Tus-Resumable': '1.0.0' };
+
+class UploadRejected extends Error {
+    constructor(message, status) {
+        super(message);
+        this.status = status;
+    }
+}
+
+function dataUrlToBlob(dataUrl) {
+    const [header, encoded] = dataUrl.split(',');
+    const bytes = atob(encoded);
+    const buffer = new Uint8Array(bytes.length);
+    for (let i = 0; i < bytes.length; i++) buffer[i] = bytes.charCodeAt(i);
+    return new Blob([buffer], { type: header.split(':')[1].split(';')[0] });
+}
+
+async function sha256Header(blob) {
+    // crypto.subtle only exists on https:// and localhost; the checksum is optional
+    if (!window.crypto || !crypto.subtle) return {};
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await blob.arrayBuffer()));
+    return { 'Upload-Checksum': 'sha256 ' + btoa(String.fromCharCode(...digest)) };
+}
+
+async function rejection(response) {
+    // An expired session is redirected to the login page
+    if (response.redirected) return new UploadRejected('Your session has expired. Please log in again.', 401);
+    let message = `${response.status} ${response.statusText}`;
+    try { message = (await response.json()).message || message; } catch (error) { }
+    return new UploadRejected(message, response.status);
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// Upload a photo (data URL or Blob) and return its upload id for the complaint request
+async function uploadPhoto(photo) {
+    const blob = typeof photo === 'string' ? dataUrlToBlob(photo) : photo;
+    let url = null;
+    let offset = 0;
+    let failures = 0;
+    while (url === null || offset < blob.size) {
+        try {
+            if (url === null) {
+                const response = await fetch('/api/uploads', {
+                    method: 'POST',
+                    headers: { ...TUS_HEADERS, 'Upload-Length': String(blob.size), ...(await sha256Header(blob)) }
+                });
+                if (response.status !== 201) throw await rejection(response);
+                url = response.headers.get('Location');
+            } else {
+                const response = await fetch(url, {
+                    method: 'PATCH',
+                    headers: { ...TUS_HEADERS, 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) },
+                    body: blob.slice(offset, offset + UPLOAD_CHUNK_BYTES)
+                });
+                // 409: the offset was stale (a retried chunk had arrived after all); ask below
+                if (response.status !== 204 && response.status !== 409) throw await rejection(response);
+                if (response.status === 204) {
+                    offset = Number(response.headers.get('Upload-Offset'));
+                    failures = 0;
+                    continue;
+                }
+            }
+        } catch (error) {
+            // Only network failures and server errors are worth retrying, and not while offline
+            if (error instanceof UploadRejected && error.status < 500) throw error;
+            if (!navigator.onLine) throw error;
+        }
+        if (failures >= UPLOAD_RETRY_DELAYS_MS.length) {
+            throw new Error('Photo upload failed. Please check your connection and try again.');
+        }
+        await sleep(UPLOAD_RETRY_DELAYS_MS[failures++]);
+        if (url !== null) {
+            try {
+                const response = await fetch(url, { method: 'HEAD', headers: TUS_HEADERS });
+                if (response.ok) offset = Number(response.headers.get('Upload-Offset'));
+                else if (response.status === 404) throw new UploadRejected('Photo upload expired. Please submit again.', 404);
+            } catch (error) {
+                if (error instanceof UploadRejected) throw error;
+            }
+        }
+    }
+    return url.split('/').pop();
+}
+
+// ============ OFFLINE OUTBOX ============
+// Submissions and status updates are queued in IndexedDB with a unique key
+// and sent together in one /api/sync request (see backend/sync.py), so
+// nothing is lost offline and a retried batch is never applied twice.
+// Photos wait in the outbox as Blobs and are uploaded just before the sync.
+const OUTBOX_DB = 'civic-outbox';
+const OUTBOX_STORE = 'operations';
+const SYNC_BATCH_SIZE = 100;
+const OUTBOX_RETRY_MS = 30000;
+
+let outboxDatabase = null;
+let outboxFlush = Promise.resolve();
+
+class SyncUnavailable extends Error { }
+
+function openOutbox() {
+    if (!outboxDatabase) {
+        outboxDatabase = new Promise((resolve, reject) => {
+            const request = indexedDB.open(OUTBOX_DB, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(OUTBOX_STORE, { keyPath: 'seq', autoIncrement: true });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    return outboxDatabase;
+}
+
+async function outboxRequest(mode, action) {
+    const database = await openOutbox();
+    return new Promise((resolve, reject) => {
+        const transaction = database.transaction(OUTBOX_STORE, mode);
+        const request = action(transaction.objectStore(OUTBOX_STORE));
+        transaction.oncomplete = () => resolve(request.result);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+// Operations queued by the signed-in account, oldest first
+async function pendingOperations() {
+    const operations = await outboxRequest('readonly', store => store.getAll());
+    return operations.filter(operation => operation.owner === outboxOwner);
+}
+
+function operationKey() {
+    if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2);
+}
+
+// Queue an operation; `photo` is a data URL uploaded as data[photoField] when it is sent
+async function queueOperation(type, data, { complaintId = null, photo = null, photoField = null } = {}) {
+    const operation = {
+        key: operationKey(),
+        owner: outboxOwner,
+        type,
+        complaint_id: complaintId,
+        data,
+        photo: photo ? dataUrlToBlob(photo) : null,
+        photoField,
+        queuedAt: Date.now()
+    };
+    operation.seq = await outboxRequest('readwrite', store => store.add(operation));
+    updateOutboxBadge();
+    return operation;
+}
+
+async function sendOutbox() {
+    const operations = await pendingOperations();
+    if (operations.length && !navigator.onLine) throw new SyncUnavailable('offline');
+    const results = [];
+    const ready = [];
+    for (const operation of operations) {
+        if (operation.photo) {
+            try {
+                operation.data[operation.photoField] = await uploadPhoto(operation.photo);
+            } catch (error) {
+                // Offline, failing or logged out: leave everything queued for the next attempt
+                if (!(error instanceof UploadRejected) || error.status === 401) throw new SyncUnavailable(error.message);
+                await outboxRequest('readwrite', store => store.delete(operation.seq));
+                results.push({ operation, status: error.status, body: { success: false, message: error.message } });
+                continue;
+            }
+            // Keep the upload id so a retry does not upload the photo again
+            operation.photo = null;
+            await outboxRequest('readwrite', store => store.put(operation));
+        }
+        ready.push(operation);
+    }
+
+    for (let start = 0; start < ready.length; start += SYNC_BATCH_SIZE) {
+        const batch = ready.slice(start, start + SYNC_BATCH_SIZE);
+        let response;
+        try {
+            response = await fetch('/api/sync', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    operations: batch.map(({ key, type, complaint_id, data }) => ({ key, type, complaint_id, data }))
+                })
+            });
+        } catch (error) {
+            throw new SyncUnavailable(error.message);
+        }
+        if (!response.ok || response.redirected) throw new SyncUnavailable(`${response.status} ${response.statusText}`);
+        const outcome = await response.json();
+        for (const [index, result] of outcome.results.entries()) {
+            if (result.status >= 500) continue;
+            await outboxRequest('readwrite', store => store.delete(batch[index].seq));
+            results.push({ operation: batch[index], status: result.status, body: result.body });
+        }
+    }
+    return results;
+}
+
+// Send everything queued; flushes run one after another, so an operation
+// queued during a flush goes out in the next one. Resolves to the results of
+// the operations the server settled, or rejects with SyncUnavailable.
+function flushOutbox() {
+    const flush = outboxFlush.catch(() => { }).then(sendOutbox);
+    outboxFlush = flush;
+    flush.finally(updateOutboxBadge).catch(() => { });
+    return flush;
+}
+
+// Queue an operation and try to send it right away. Returns the server's
+// response body, or null when the operation stays queued until the device
+// is back online.
+async function sendOperation(type, data, options) {
+    const operation = await queueOperation(type, data, options);
+    try {
+        const results = await flushOutbox();
+        reportSynced(results.filter(result => result.operation.key !== operation.key));
+        const own = results.find(result => result.operation.key === operation.key);
+        return own ? own.body : null;
+    } catch (error) {
+        if (!(error instanceof SyncUnavailable)) throw error;
+        console.warn('Sync postponed:', error.message);
+        return null;
+    }
+}
+
+// Tell the user about operations queued earlier that have now been settled
+function reportSynced(results) {
+    if (!results.length) return;
+    const failed = results.filter(result => !result.body.success);
+    let message = `🔄 ${results.length - failed.length} queued change(s) synced.`;
+    if (failed.length) {
+        message += `\n\n❌ ${failed.length} could not be applied:\n` + failed.map(result => '• ' + result.body.message).join('\n');
+    }
+    alert(message);
+    loadComplaints();
+}
+
+async function syncQueued() {
+    if (!navigator.onLine) return;
+    try {
+        reportSynced(await flushOutbox());
+    } catch (error) {
+        if (!(error instanceof SyncUnavailable)) console.error('Outbox error:', error);
+    }
+}
+
+async function updateOutboxBadge() {
+    const badge = document.getElementById('outbox-badge');
+    if (!badge) return;
+    const count = (await pendingOperations()).length;
+    badge.textContent = `⏳ ${count} waiting to sync`;
+    badge.classList.toggle('hidden', count === 0);
+}
+
+function startOutbox() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch(error => console.warn('Service worker not registered:', error));
+    }
+    if (!('indexedDB' in self)) return;
+    updateOutboxBadge();
+    syncQueued();
+    window.addEventListener('online', syncQueued);
+    setInterval(syncQueued, OUTBOX_RETRY_MS);
+}
+
+// ============ LOCATION FUNCTIONS ============
+// Without a network the phone has no assisted fix, so a cold GPS fix takes
+// longer; offline we wait longer and accept a recent cached position.
+const OFFLINE_GPS_TIMEOUT_MS = 30000;
+const OFFLINE_GPS_MAX_AGE_MS = 5 * 60 * 1000;
+
+function locationOptions(timeout) {
+    if (navigator.onLine) return { enableHighAccuracy: true, timeout, maximumAge: 0 };
+    return { enableHighAccuracy: true, timeout: Math.max(timeout, OFFLINE_GPS_TIMEOUT_MS), maximumAge: OFFLINE_GPS_MAX_AGE_MS };
+}
+
+function captureLocation() {
+    if (!navigator.geolocation) {
+        alert('❌ Geolocation is not supported by your browser');
+        return;
+    }
+
+    alert('🔍 Getting your location... Please allow location access.');
+
+    navigator.geolocation.getCurrentPosition(
+        function (position) {
+            const lat = position.coords.latitude;
+            const lng = position.coords.longitude;
+            const accuracy = position.coords.accuracy;
+
+            const coordsStr = `${lat.toFixed(6)}, ${lng.toFixed(6)}`;
+            document.getElementById('c-coords').value = coordsStr;
+
+            // Show location info
+            const locInfo = document.getElementById('location-info');
+            locInfo.innerHTML = `<strong>✅ Location Captured:</strong><br>Latitude: ${lat.toFixed(6)}<br>Longitude: ${lng.toFixed(6)}<br>Accuracy: ±${accuracy.toFixed(0)}m`;
+
+            alert(`✅ Location captured!\n\nLatitude: ${lat.toFixed(6)}\nLongitude: ${lng.toFixed(6)}\nAccuracy: ±${accuracy.toFixed(0)} meters`);
+        },
+        function (error) {
+            let errorMsg = 'Failed to get location';
+            if (error.code === 1) errorMsg = 'Location access denied. Please enable location in browser settings.';
+            if (error.code === 2) errorMsg = 'Location unavailable. Please check your GPS.';
+            if (error.code === 3) errorMsg = 'Location request timed out.';
+
+            alert('❌ ' + errorMsg);
+            console.error('Geolocation error:', error);
+        },
+        locationOptions(10000)
+    );
+}
+
+// Automatic location capture when photo is taken (called from capturePhoto)
+function captureLocationAutomatic() {
+    if (!navigator.geolocation) {
+        console.warn('Geolocation not supported');
+        document.getElementById('photo-location-display').innerHTML = '⚠️ Geolocation not available';
+        return;
+    }
+
+    // Check if location already captured
+    if (document.getElementById('c-coords').value) {
+        const coords = document.getElementById('c-coords').value;
+        document.getElementById('photo-location-display').innerHTML = `<strong>${coords}</strong><br>✅ Already captured`;
+        return;
+    }
+
+    document.getElementById('photo-location-display').innerHTML = '🔍 Getting location...';
+
+    navigator.geolocation.getCurrentPosition(
+        function (position) {
+            const lat = position.coords.latitude;
+            const lng = position.coords.longitude;
+            const accuracy = position.coords.accuracy;
+
+            const coordsStr = `${lat.toFixed(6)}, ${lng.toFixed(6)}`;
+            document.getElementById('c-coords').value = coordsStr;
+
+            // Update photo location display
+            document.getElementById('photo-location-display').innerHTML = `
+                <strong>✅ Latitude:</strong> ${lat.toFixed(6)}<br>
+                <strong>✅ Longitude:</strong> ${lng.toFixed(6)}<br>
+                <strong>✅ Accuracy:</strong> ±${accuracy.toFixed(0)}m
+            `;
+
+            // Show location info below form
+            const locInfo = document.getElementById('location-info');
+            locInfo.innerHTML = `<strong>✅ Location Auto-Captured with Photo:</strong><br>📍 Latitude: ${lat.toFixed(6)}<br>📍 Longitude: ${lng.toFixed(6)}<br>📍 Accuracy: ±${accuracy.toFixed(0)}m`;
+
+            alert(`✅ Photo + Location Captured!\n\n📷 Photo: Ready\n📍 Latitude: ${lat.toFixed(6)}\n📍 Longitude: ${lng.toFixed(6)}\n📍 Accuracy: ±${accuracy.toFixed(0)}m\n\nReady to submit! ✨`);
+        },
+        function (error) {
+            console.warn('Auto location capture failed:', error);
+            document.getElementById('photo-location-display').innerHTML = `
+                <strong>⚠️ Location not captured</strong><br>
+                Tap GPS button to capture location manually
+            `;
+        },
+        locationOptions(8000)
+    );
+}
+
+// ============ COMPLAINT FUNCTIONS ============
+let currentModalComplaintId = null;
+let allComplaints = [];
+let currentActiveTab = 'submitted';
+
+function setActiveTab(tab) {
+    currentActiveTab = tab;
+
+    // Update UI styles for tabs
+    const tabs = ['submitted', 'assigned', 'in_progress', 'resolved'];
+    tabs.forEach(t => {
+        const el = document.getElementById('tab-' + t);
+        if (el) {
+            if (t === tab) {
+                el.classList.add('active');
+                // Reset to active color based on status
+                el.classList.remove('bg-gray-100', 'text-gray-600');
+                if (t === 'submitted') { el.classList.add('bg-yellow-100', 'text-yellow-800'); }
+                else if (t === 'assigned') { el.classList.add('bg-blue-100', 'text-blue-800'); }
+                else if (t === 'in_progress') { el.classList.add('bg-purple-100', 'text-purple-800'); }
+                else if (t === 'resolved') { el.classList.add('bg-green-100', 'text-green-800'); }
+            } else {
+                el.classList.remove('active', 'bg-yellow-100', 'text-yellow-800', 'bg-blue-100', 'text-blue-800', 'bg-purple-100', 'text-purple-800', 'bg-green-100', 'text-green-800');
+                el.classList.add('bg-gray-100', 'text-gray-600');
+            }
+        }
+    });
+
+    renderComplaints();
+}
+
+async function loadComplaints() {
+    if (serverCards) return loadCards();
+    try {
+        const response = await fetch('/api/complaints');
+        const data = await response.json();
+        allComplaints = data.complaints;
+
+        if (role === 'municipal' || role === 'dept') {
+            updateTabCounts();
+        }
+
+        renderComplaints();
+    } catch (error) {
+        console.error('Error loading complaints:', error);
+    }
+}
+
+function updateTabCounts() {
+    const counts = {
+        submitted: allComplaints.filter(c => c.status === 'submitted').length,
+        assigned: allComplaints.filter(c => c.status === 'assigned').length,
+        in_progress: allComplaints.filter(c => c.status === 'in_progress').length,
+        resolved: allComplaints.filter(c => c.status === 'resolved').length
+    };
+
+    const setVal = (id, val) => {
+        const el = document.getElementById(id);
+        if (el) el.textContent = val;
+    };
+
+    setVal('count-submitted', counts.submitted);
+    setVal('count-assigned', counts.assigned);
+    setVal('count-in_progress', counts.in_progress);
+    setVal('count-resolved', counts.resolved);
+}
+
+function renderComplaints() {
+    const listEl = document.getElementById('complaints-list');
+    if (serverCards) {
+        // The server renders the cards: fetch them unless this tab and language are shown already
+        if (listEl.dataset.tab !== cardTab() || listEl.dataset.lang !== currentLanguage) loadCards();
+        return;
+    }
+    const t = translations[currentLanguage] || translations['en'];
+    // Not loaded yet: applyTranslations renders the list once it is
+    if (!t) return;
+    let filtered = [];
+
+    if (role === 'municipal' || role === 'dept') {
+        filtered = allComplaints.filter(c => c.status === currentActiveTab);
+    } else {
+        filtered = allComplaints;
+    }
+
+    if (filtered.length === 0) {
+        listEl.innerHTML = `<p class="text-gray-500 text-center py-8">${t.noComplaints || 'No complaints found'}</p>`;
+        return;
+    }
+
+    if (role === 'municipal') {
+        // Municipal view - cards with photo thumbnails
+        listEl.innerHTML = filtered.map(complaint => `
+            <div class="border-2 rounded-xl p-4 hover:border-blue-400 hover:shadow-lg transition-all cursor-pointer" 
+                onclick="openDetailModal(${complaint.id})" style="border-color: #e5e7eb; background-color: white;">
+                <div class="flex gap-4">
+                    <!-- Photo Thumbnails -->
+                    <div class="flex gap-2 flex-shrink-0">
+                        ${complaint.photo_url ? `
+                            <div class="flex flex-col items-center">
+                                 <div class="w-24 h-24 rounded-lg overflow-hidden bg-gray-200 border-2 border-yellow-400 shadow-sm">
+                                     <img src="${complaint.photo_url}" alt="Evidence" 
+                                         class="w-full h-full object-cover"
+                                         onerror="this.parentElement.innerHTML='<div class=\\'flex items-center justify-center h-full text-gray-400 text-xs\\'>📷 Error</div>'">
+                                 </div>
+                                 <p class="text-[10px] text-gray-500 font-bold mt-1">📢 Issue</p>
+                            </div>
+                        ` : `
+                            <div class="w-24 h-24 rounded-lg bg-gray-100 border-2 border-dashed border-gray-300 flex items-center justify-center">
+                                <span class="text-gray-400 text-xs text-center">No Photo</span>
+                            </div>
+                        `}
+
+                        ${complaint.resolved_photo_url ? `
+                            <div class="flex flex-col items-center">
+                                <div class="w-24 h-24 rounded-lg overflow-hidden bg-gray-200 border-2 border-green-500 shadow-sm">
+                                    <img src="${complaint.resolved_photo_url}" alt="Resolution" 
+                                        class="w-full h-full object-cover"
+                                        onerror="this.parentElement.innerHTML='<div class=\\'flex items-center justify-center h-full text-gray-400 text-xs\\'>📷 Error</div>'">
+                                </div>
+                                <p class="text-[10px] text-green-600 font-bold mt-1">✅ Proof</p>
+                            </div>
+                        ` : ''}
+                    </div>
+
+                    <!-- Complaint Info -->
+                    <div class="flex-1 min-w-0">
+                        <div class="flex justify-between items-start mb-1">
+                            <div>
+                                <h3 class="font-bold text-gray-800 text-sm">${complaint.complaint_id}</h3>
+                                <p class="text-sm font-medium text-blue-700">${t['optType' + (complaint.title || 'Other')] || complaint.title}</p>
+                            </div>
+                            <span class="px-2 py-1 text-xs rounded-full ${getStatusColor(complaint.status)} flex-shrink-0">
+                                ${t['status' + complaint.status.split('_').map(s => s.charAt(0).toUpperCase() + s.slice(1)).join('')] || complaint.status.replace('_', ' ')}
+                            </span>
+                        </div>
+                        <p class="text-xs font-bold text-blue-800 mb-1 flex items-center gap-2">
+                            <i class="fas fa-user-circle"></i> ${complaint.reporter_name || 'Unknown'} 
+                            <span class="text-gray-300">|</span> 
+                            <i class="fas fa-phone-alt text-pink-500"></i> ${complaint.reporter_phone || 'N/A'}
+                        </p>
+                        <p class="text-xs text-gray-600 mb-1">📍 ${t.locationLabel}: ${complaint.location}</p>
+                        <p class="text-xs text-gray-500">🏘️ ${complaint.district} | 📮 ${complaint.pincode}</p>
+                        <p class="text-xs text-gray-500">🕐 ${t.reportedLabel}: ${complaint.created_at}</p>
+
+                        ${complaint.coordinates ? `
+                            <!-- Live Map Preview for Municipal -->
+                            <div class="mt-3 rounded-lg overflow-hidden border border-gray-200 shadow-sm" style="height: 120px;" onclick="event.stopPropagation()">
+                                <iframe width="100%" height="100%" style="border:0;" loading="lazy" 
+                                    src="https://maps.google.com/maps?q=${complaint.coordinates.split(',')[0].trim()},${complaint.coordinates.split(',')[1].trim()}&z=14&output=embed">
+                                </iframe>
+                            </div>
+                            <div class="flex justify-between items-center mt-1" onclick="event.stopPropagation()">
+                                <span class="text-[10px] text-gray-400 italic">${complaint.coordinates}</span>
+                                <a href="https://www.google.com/maps?q=${complaint.coordinates}" target="_blank" 
+                                   class="text-[10px] text-blue-600 hover:text-blue-800 font-bold">
+                                    Open in Maps ↗
+                                </a>
+                            </div>
+                        ` : ''}
+
+                        ${complaint.description ? `
+                            <p class="text-xs text-gray-600 mt-2 truncate" style="max-width: 400px;">📝 ${t.descLabel}: ${complaint.description}</p>
+                        ` : ''}
+                        ${complaint.forwarded_department ? `
+                            <p class="mt-1 text-xs text-purple-700 font-semibold">📤 ${t.forwardedTo}: ${complaint.forwarded_department}</p>
+                        ` : ''}
+                        ${complaint.resolution_notes ? `
+                            <p class="mt-1 text-xs text-green-700 font-bold bg-green-50 p-1 rounded border border-green-200">✅ ${t.notesLabel}: ${complaint.resolution_notes}</p>
+                        ` : ''}
+                        <p class="text-xs text-blue-500 mt-2 font-medium">${t.clickForDetails}</p>
+                    </div>
+                </div>
+            </div>
+        `).join('');
+    } else {
+        // Other roles - standard view with Start Work button for Dept
+        listEl.innerHTML = filtered.map(complaint => `
+            <div class="border rounded-lg p-4 hover:bg-gray-50 bg-white shadow-sm transition-all cursor-pointer" 
+                 onclick="openDetailModal(${complaint.id})"
+                 ${role === 'police' ? 'style="border-left: 4px solid #ef4444;"' : ''}>
+                <div class="flex justify-between items-start mb-2">
+                    <div>
+                        <h3 class="font-bold text-gray-800">${complaint.complaint_id}</h3>
+                        <p class="text-sm text-gray-600 font-bold">${t['optType' + (complaint.title || 'Other')] || complaint.title}</p>
+                    </div>
+                    <span class="px-2 py-1 text-xs rounded-full ${getStatusColor(complaint.status)}">
+                        ${t['status' + complaint.status.split('_').map(s => s.charAt(0).toUpperCase() + s.slice(1)).join('')] || complaint.status.replace('_', ' ')}
+                    </span>
+                </div>
+                <div class="flex gap-4 mb-3 overflow-x-auto pb-2">
+                    ${complaint.photo_url ? `
+                        <div class="flex-shrink-0">
+                            <p class="text-[10px] text-gray-500 mb-1 font-bold">📢 Original Issue</p>
+                            <img src="${complaint.photo_url}" alt="Evidence Photo" class="w-32 h-24 object-cover rounded-lg border cursor-zoom-in shadow-sm hover:opacity-90" onclick="event.stopPropagation(); openFullPhoto(this.src)">
+                        </div>
+                    ` : ''}
+
+                    ${complaint.resolved_photo_url ? `
+                        <div class="flex-shrink-0">
+                            <p class="text-[10px] text-green-600 mb-1 font-bold">✅ Resolution Proof</p>
+                            <img src="${complaint.resolved_photo_url}" alt="Resolution Photo" class="w-32 h-24 object-cover rounded-lg border-2 border-green-400 cursor-zoom-in shadow-sm hover:opacity-90" onclick="event.stopPropagation(); openFullPhoto(this.src)">
+                        </div>
+                    ` : ''}
+
+                     <div class="text-sm text-gray-600 flex-1 min-w-[150px]">
+                        <h4 class="text-xs font-bold text-blue-800 mb-1 flex items-center gap-2">
+                            <i class="fas fa-user-circle"></i> ${complaint.reporter_name} 
+                            <span class="text-gray-300">|</span> 
+                            <i class="fas fa-phone-alt text-pink-500"></i> ${complaint.reporter_phone}
+                        </h4>
+                        <p class="mb-1"><strong>📍 ${t.locationLabel}:</strong> ${complaint.location}</p>
+                        <p class="mb-1"><strong>📝 ${t.descLabel}:</strong> ${complaint.description}</p>
+                        ${role === 'police' ? `
+                            <div class="mt-2 p-2 bg-red-50 border border-red-200 rounded-lg">
+                                <p class="text-xs font-bold text-red-700 uppercase mb-1">🔍 Investigation Targets</p>
+                                <p class="text-sm font-bold text-gray-800">👤 Name: ${complaint.reporter_name}</p>
+                                <p class="text-sm font-bold text-red-600">📞 Phone: ${complaint.reporter_phone}</p>
+                            </div>
+                        ` : ''}
+                        ${complaint.resolution_notes ? `
+                            <p class="mb-1 text-green-700 font-bold">✅ ${t.notesLabel}: ${complaint.resolution_notes}</p>
+                        ` : ''}
+                        <p class="text-xs text-gray-500">${t.reportedLabel}: ${complaint.created_at}</p>
+                    </div>
+                </div>
+
+                ${role === 'dept' && complaint.coordinates ? `
+                    <!-- Live Map Preview for Department -->
+                    <div class="mb-4 bg-gray-50 p-3 rounded-lg border border-gray-200" onclick="event.stopPropagation()">
+                        <p class="text-xs font-bold text-blue-700 mb-2 uppercase tracking-wide"><i class="fas fa-map-marked-alt mr-1"></i> Target Work Location</p>
+                        <div class="rounded-lg overflow-hidden border border-blue-100 shadow-sm mb-2" style="height: 150px;">
+                            <iframe width="100%" height="100%" style="border:0;" loading="lazy" 
+                                src="https://maps.google.com/maps?q=${complaint.coordinates.split(',')[0].trim()},${complaint.coordinates.split(',')[1].trim()}&z=15&output=embed">
+                            </iframe>
+                        </div>
+                        <div class="flex justify-between items-center">
+                            <span class="text-[10px] text-gray-400 font-mono">${complaint.coordinates}</span>
+                            <a href="https://www.google.com/maps?q=${complaint.coordinates}" target="_blank" 
+                               class="text-xs text-blue-600 hover:text-blue-800 font-bold flex items-center gap-1">
+                                Open in Navigation ↗
+                            </a>
+                        </div>
+                    </div>
+                ` : ''}
+
+                ${role === 'police' && complaint.coordinates ? `
+                    <!-- Live Google Map for Police -->
+                    <div class="mt-3 border-t pt-3" onclick="event.stopPropagation()">
+                        <p class="text-xs font-bold text-red-600 mb-2 underline tracking-wider">🚩 LIVE INVESTIGATION LOCATION</p>
+                        <div class="rounded-lg overflow-hidden border border-red-200 shadow-sm mb-2" style="height: 180px;">
+                            <iframe width="100%" height="100%" style="border:0;" loading="lazy" 
+                                src="https://maps.google.com/maps?q=${complaint.coordinates.split(',')[0].trim()},${complaint.coordinates.split(',')[1].trim()}&z=15&output=embed">
+                            </iframe>
+                        </div>
+                        <div class="flex justify-between items-center">
+                            <span class="text-[10px] text-gray-500 font-mono italic">${complaint.coordinates}</span>
+                            <a href="https://www.google.com/maps?q=${complaint.coordinates}" target="_blank" 
+                               class="text-xs text-blue-600 hover:text-blue-800 font-bold flex items-center gap-1">
+                                <i class="fas fa-directions"></i> Start Navigation ↗
+                            </a>
+                        </div>
+                    </div>
+                ` : ''}
+
+                ${role === 'dept' ? `
+                    <div class="mt-4 pt-4 border-t border-gray-100" onclick="event.stopPropagation()">
+                        <p class="text-xs font-bold text-gray-500 uppercase mb-2">${t.labelUpdateState}</p>
+                        <div class="flex gap-2 flex-wrap items-end">
+                            <div class="flex-1 min-w-[150px]">
+                                <label class="block text-[10px] text-gray-400 mb-1">${t.labelSelectStatus}</label>
+                                <select id="status-select-${complaint.id}" onchange="toggleNotes(${complaint.id})" class="w-full border rounded px-2 py-1.5 text-xs bg-gray-50 font-semibold">
+                                    <option value="assigned" ${complaint.status === 'assigned' ? 'selected' : ''}>${t.optStatusForwarded}</option>
+                                    <option value="in_progress" ${complaint.status === 'in_progress' ? 'selected' : ''}>${t.optStatusInProgress}</option>
+                                    <option value="resolved" ${complaint.status === 'resolved' ? 'selected' : ''}>${t.optStatusResolved}</option>
+                                </select>
+                            </div>
+                            <button onclick="updateGenericStatus(${complaint.id})" class="bg-blue-600 hover:bg-blue-700 text-white text-xs px-4 py-2 rounded font-bold transition-colors">
+                                ${t.btnUpdate}
+                            </button>
+
+                            ${complaint.status === 'assigned' ? `
+                                <button onclick="quickUpdateStatus(${complaint.id}, 'in_progress')" class="bg-purple-600 hover:bg-purple-700 text-white text-xs px-4 py-2 rounded font-bold transition-colors">
+                                    <i class="fas fa-play mr-1"></i> ${t.btnStartWorking}
+                                </button>
+                            ` : ''}
+
+                            <button onclick="markAsFake(${complaint.id})" class="bg-red-50 hover:bg-red-100 text-red-600 border border-red-200 text-[10px] px-3 py-1.5 rounded font-bold uppercase transition-all">
+                                ${t.btnMarkFake}
+                            </button>
+                        </div>
+
+                        <div id="notes-container-${complaint.id}" class="mt-2 ${complaint.status === 'resolved' || complaint.status === 'in_progress' ? '' : 'hidden'}">
+                            <label class="block text-[10px] text-gray-400 mb-1">${t.labelUpdateNotes}</label>
+                            <textarea id="notes-${complaint.id}" class="w-full border rounded p-2 text-xs" placeholder="${t.placeholderWorkDone}">${complaint.resolution_notes || ''}</textarea>
+                        </div>
+
+                        <!-- Resolved Photo Capture (Required for Department) -->
+                        <div id="resolved-photo-section-${complaint.id}" class="mt-2 ${complaint.status === 'resolved' ? '' : 'hidden'}">
+                            <label class="block text-[10px] text-red-600 font-bold mb-1 uppercase tracking-tight">📸 Live Resolution Photo (Compulsory)</label>
+
+                            <div id="res-camera-container-${complaint.id}" class="hidden bg-black rounded-lg overflow-hidden mb-2 relative" style="height: 200px;">
+                                <video id="res-video-${complaint.id}" class="w-full h-full object-cover" autoplay playsinline></video>
+                            </div>
+
+                            <div id="res-preview-container-${complaint.id}" class="${complaint.resolved_photo_url ? '' : 'hidden'} mb-2">
+                                <img id="res-preview-${complaint.id}" src="${complaint.resolved_photo_url || ''}" class="w-full rounded-lg border-2 border-green-500 shadow-md">
+                                <p class="text-[10px] text-green-600 font-bold mt-1">✅ Captured Resolution Evidence</p>
+                            </div>
+
+                            <div class="flex gap-1 flex-wrap">
+                                <button id="btn-res-start-${complaint.id}" onclick="startResCamera(${complaint.id})" class="bg-gray-800 text-white text-[10px] px-2 py-1 rounded flex items-center gap-1 hover:bg-black transition-all">
+                                    <i class="fas fa-video"></i> Start Camera
+                                </button>
+                                <button id="btn-res-capture-${complaint.id}" onclick="captureResPhoto(${complaint.id})" class="hidden bg-yellow-500 text-white text-[10px] px-2 py-1 rounded flex items-center gap-1 hover:bg-yellow-600 transition-all">
+                                    <i class="fas fa-camera"></i> Take Photo
+                                </button>
+                                <button id="btn-res-stop-${complaint.id}" onclick="stopResCamera(${complaint.id})" class="hidden bg-red-600 text-white text-[10px] px-2 py-1 rounded flex items-center gap-1 hover:bg-red-700 transition-all">
+                                    <i class="fas fa-stop"></i> Stop
+                                </button>
+                            </div>
+                            <input type="hidden" id="res-photo-data-${complaint.id}" value="">
+                            <input type="hidden" id="res-coords-data-${complaint.id}" value="">
+                        </div>
+                    </div>
+                ` : ''}
+            </div>
+        `).join('');
+    }
+}
+
+// Server-rendered cards (DASHBOARD_CARDS=server): HTML pages from /dashboard/cards
+function cardTab() {
+    return (role === 'municipal' || role === 'dept') ? currentActiveTab : '';
+}
+
+async function loadCards(before = null) {
+    const listEl = document.getElementById('complaints-list');
+    const tab = cardTab();
+    const params = new URLSearchParams({ lang: currentLanguage });
+    if (tab) params.set('tab', tab);
+    if (before) params.set('before', before);
+    try {
+        const response = await fetch('/dashboard/cards?' + params);
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        const html = await response.text();
+        // Ignore a page for a tab or language the user has already left
+        if (tab !== cardTab() || params.get('lang') !== currentLanguage) return;
+
+        if (before) {
+            const more = listEl.querySelector('.cards-more');
+            if (more) more.outerHTML = html;
+        } else {
+            listEl.innerHTML = html;
+            listEl.dataset.tab = tab;
+            listEl.dataset.lang = currentLanguage;
+        }
+
+        const counts = response.headers.get('X-Status-Counts');
+        if (counts) {
+            Object.entries(JSON.parse(counts)).forEach(([status, count]) => {
+                const el = document.getElementById('count-' + status);
+                if (el) el.textContent = count;
+            });
+        }
+    } catch (error) {
+        console.error('Error loading complaints:', error);
+    }
+}
+
+function loadMap(placeholder) {
+    const iframe = document.createElement('iframe');
+    iframe.width = '100%';
+    iframe.height = '100%';
+    iframe.style.border = '0';
+    iframe.src = placeholder.dataset.mapSrc;
+    placeholder.replaceChildren(iframe);
+    placeholder.onclick = event => event.stopPropagation();
+    placeholder.classList.remove('cursor-pointer');
+}
+
+function toggleNotes(complaintId) {
+    const select = document.getElementById(`status-select-${complaintId}`);
+    const notesContainer = document.getElementById(`notes-container-${complaintId}`);
+    const photoSection = document.getElementById(`resolved-photo-section-${complaintId}`);
+
+    if (select.value === 'resolved' || select.value === 'in_progress') {
+        notesContainer.classList.remove('hidden');
+    } else {
+        notesContainer.classList.add('hidden');
+    }
+
+    if (select.value === 'resolved') {
+        photoSection.classList.remove('hidden');
+    } else {
+        photoSection.classList.add('hidden');
+        stopResCamera(complaintId);
+    }
+}
+
+async function quickUpdateStatus(complaintId, newStatus) {
+    try {
+        const data = await sendOperation('update_status', { status: newStatus, notes: 'Work started.' }, { complaintId });
+        if (!data) {
+            alert(`📴 Offline: the change to ${newStatus.replace('_', ' ')} will be sent when the connection is back.`);
+        } else if (data.success) {
+            alert(`✅ Status updated to ${newStatus.replace('_', ' ')}!`);
+            // Automatically switch to the correct tab to show the update
+            setActiveTab(newStatus);
+            loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred.');
+        console.error(error);
+    }
+}
+
+async function updateGenericStatus(complaintId) {
+    const status = document.getElementById(`status-select-${complaintId}`).value;
+    const notes = document.getElementById(`notes-${complaintId}`).value;
+    const resolvedPhoto = document.getElementById(`res-photo-data-${complaintId}`).value;
+    const resolvedCoords = document.getElementById(`res-coords-data-${complaintId}`).value;
+
+    if (status === 'resolved') {
+        if (!resolvedPhoto) {
+            alert('⚠️ COMPULSORY: You must capture a live photo of the resolved issue before marks as Resolved.');
+            return;
+        }
+        if (!notes || notes.trim().length < 5) {
+            alert('⚠️ Please provide detailed resolution notes.');
+            return;
+        }
+    }
+
+    try {
+        const data = await sendOperation('update_status', {
+            status,
+            notes,
+            resolved_coordinates: resolvedCoords
+        }, {
+            complaintId,
+            photo: status === 'resolved' ? resolvedPhoto : null,
+            photoField: 'resolved_photo_upload_id'
+        });
+
+        if (!data) {
+            alert('📴 Offline: the status update is saved on this device and will be sent when the connection is back.');
+            stopResCamera(complaintId);
+        } else if (data.success) {
+            alert('✅ Status updated successfully!');
+            // Stop camera if it's still running
+            stopResCamera(complaintId);
+            // Switch tab if status changed to something not in current tab
+            if (status !== currentActiveTab) {
+                setActiveTab(status);
+            }
+            loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred.');
+        console.error(error);
+    }
+}
+
+// ============ DEPT RESOLUTION CAMERA FUNCTIONS ============
+let resStreams = {};
+
+async function startResCamera(complaintId) {
+    try {
+        const video = document.getElementById(`res-video-${complaintId}`);
+        const container = document.getElementById(`res-camera-container-${complaintId}`);
+
+        const stream = await navigator.mediaDevices.getUserMedia({
+            video: { facingMode: 'environment' },
+            audio: false
+        });
+
+        resStreams[complaintId] = stream;
+        video.srcObject = stream;
+        video.play();
+
+        container.classList.remove('hidden');
+        document.getElementById(`btn-res-start-${complaintId}`).classList.add('hidden');
+        document.getElementById(`btn-res-capture-${complaintId}`).classList.remove('hidden');
+        document.getElementById(`btn-res-stop-${complaintId}`).classList.remove('hidden');
+
+        document.getElementById(`res-preview-container-${complaintId}`).classList.add('hidden');
+    } catch (error) {
+        alert('❌ Camera Error: ' + error.message);
+        console.error('Camera error:', error);
+    }
+}
+
+async function captureResPhoto(complaintId) {
+    const video = document.getElementById(`res-video-${complaintId}`);
+    const stream = resStreams[complaintId];
+
+    if (!stream) return;
+
+    // Get live location
+    let coords = "Location not available";
+    try {
+        const pos = await new Promise((resolve, reject) => {
+            navigator.geolocation.getCurrentPosition(resolve, reject, locationOptions(5000));
+        });
+        coords = `${pos.coords.latitude.toFixed(6)}, ${pos.coords.longitude.toFixed(6)}`;
+        document.getElementById(`res-coords-data-${complaintId}`).value = coords;
+    } catch (err) {
+        console.warn("Location error:", err);
+    }
+
+    const canvas = document.createElement('canvas');
+    canvas.width = video.videoWidth;
+    canvas.height = video.videoHeight;
+    const ctx = canvas.getContext('2d');
+    ctx.drawImage(video, 0, 0);
+
+    // Overlay Location & Timestamp
+    const now = new Date();
+    const dateStr = now.toLocaleString();
+
+    ctx.fillStyle = "rgba(0, 0, 0, 0.6)";
+    ctx.fillRect(0, canvas.height - 60, canvas.width, 60);
+
+    ctx.fillStyle = "white";
+    ctx.font = "bold 14px Arial";
+    ctx.fillText("✅ RESOLVED PROOF", 10, canvas.height - 40);
+    ctx.font = "12px Arial";
+    ctx.fillText(`📍 ${coords} | 🕒 ${dateStr}`, 10, canvas.height - 20);
+
+    const data = canvas.toDataURL('image/jpeg', 0.8);
+    document.getElementById(`res-photo-data-${complaintId}`).value = data;
+
+    const preview = document.getElementById(`res-preview-${complaintId}`);
+    preview.src = data;
+    document.getElementById(`res-preview-container-${complaintId}`).classList.remove('hidden');
+
+    // Update UI to show location captured
+    const locLabel = document.createElement('p');
+    locLabel.className = 'text-[10px] text-blue-600 font-bold mt-1';
+    locLabel.innerHTML = `<i class="fas fa-map-marker-alt"></i> Location Captured: ${coords}`;
+    preview.after(locLabel);
+
+    stopResCamera(complaintId);
+    alert('✅ Resolution photo & live location captured!');
+}
+
+function stopResCamera(complaintId) {
+    if (resStreams[complaintId]) {
+        resStreams[complaintId].getTracks().forEach(track => track.stop());
+        delete resStreams[complaintId];
+    }
+
+    const container = document.getElementById(`res-camera-container-${complaintId}`);
+    if (container) container.classList.add('hidden');
+
+    const btnStart = document.getElementById(`btn-res-start-${complaintId}`);
+    const btnCapture = document.getElementById(`btn-res-capture-${complaintId}`);
+    const btnStop = document.getElementById(`btn-res-stop-${complaintId}`);
+
+    if (btnStart) btnStart.classList.remove('hidden');
+    if (btnCapture) btnCapture.classList.add('hidden');
+    if (btnStop) btnStop.classList.add('hidden');
+}
+
+async function startWork(complaintId) {
+    if (!confirm('Start work on this complaint?')) return;
+    try {
+        const response = await fetch(`/api/complaint/${complaintId}/start-work`, { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            alert('✅ Work started! Status updated to In Progress.');
+            loadComplaints();
+        }
+    } catch (error) { console.error(error); }
+}
+
+async function resolveComplaint(complaintId) {
+    const notes = document.getElementById('notes-' + complaintId).value;
+    if (!notes) { alert('Please enter resolution notes'); return; }
+    if (!confirm('Mark this complaint as resolved?')) return;
+
+    try {
+        const response = await fetch(`/api/complaint/${complaintId}/resolve`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ notes })
+        });
+        const data = await response.json();
+        if (data.success) {
+            alert('✅ Complaint resolved successfully!');
+            loadComplaints();
+        }
+    } catch (error) { console.error(error); }
+}
+
+// ============ DETAIL MODAL FUNCTIONS (Municipal) ============
+async function openDetailModal(complaintId) {
+    try {
+        const t = translations[currentLanguage] || translations['en'] || {};
+        currentModalComplaintId = complaintId;
+        const response = await fetch(`/api/complaint/${complaintId}/detail`);
+        const data = await response.json();
+
+        if (!data.success) {
+            alert('❌ Could not load complaint details');
+            return;
+        }
+
+        const c = data.complaint;
+
+        // Populate modal
+        document.getElementById('modal-complaint-id').textContent = `📋 ${c.complaint_id}`;
+        document.getElementById('modal-date').textContent = `${t.labelSubmittedAt || 'Submitted'}: ${c.created_at}`;
+        document.getElementById('modal-reporter-name').textContent = c.reporter_name;
+        document.getElementById('modal-reporter-phone').textContent = c.reporter_phone;
+
+        const statusEl = document.getElementById('modal-status');
+        const statusKey = 'status' + c.status.split('_').map(s => s.charAt(0).toUpperCase() + s.slice(1)).join('');
+        statusEl.textContent = t[statusKey] || c.status.toUpperCase();
+        statusEl.className = `px-2 py-0.5 rounded-full text-xs font-bold ${getStatusColor(c.status)}`;
+
+        document.getElementById('modal-type').textContent = t['optType' + (c.type || 'Other')] || c.type;
+        document.getElementById('modal-district').textContent = c.district;
+        document.getElementById('modal-pincode').textContent = c.pincode;
+        document.getElementById('modal-location').textContent = c.location;
+        document.getElementById('modal-description').textContent = c.description || 'No description provided';
+
+        // Resolution Notes
+        const resSection = document.getElementById('modal-resolution-section');
+        if (c.resolution_notes) {
+            document.getElementById('modal-resolution-notes').textContent = c.resolution_notes;
+            resSection.classList.remove('hidden');
+        } else {
+            resSection.classList.add('hidden');
+        }
+
+        // Coordinates & Google Map
+        if (c.coordinates) {
+            document.getElementById('modal-coordinates').textContent = c.coordinates;
+            document.getElementById('modal-coords-section').classList.remove('hidden');
+
+            // Parse coordinates (format: "lat, lng")
+            const coords = c.coordinates.split(',').map(s => s.trim());
+            if (coords.length === 2) {
+                const lat = coords[0];
+                const lng = coords[1];
+
+                // Set Google Maps iframe
+                const mapIframe = document.getElementById('modal-google-map');
+                mapIframe.src = `https://maps.google.com/maps?q=${lat},${lng}&z=16&output=embed`;
+
+                // Set "Open in Google Maps" link
+                const mapLink = document.getElementById('modal-map-link');
+                mapLink.href = `https://www.google.com/maps?q=${lat},${lng}`;
+            }
+        } else {
+            document.getElementById('modal-coords-section').classList.add('hidden');
+            document.getElementById('modal-google-map').src = '';
+        }
+
+        // Photo
+        if (c.photo_url) {
+            document.getElementById('modal-photo').src = c.photo_url;
+            document.getElementById('modal-photo-section').classList.remove('hidden');
+        } else {
+            document.getElementById('modal-photo-section').classList.add('hidden');
+        }
+
+        // Resolved Photo
+        const resPhotoSection = document.getElementById('modal-resolved-photo-section');
+        if (c.resolved_photo_url) {
+            document.getElementById('modal-resolved-photo').src = c.resolved_photo_url;
+            resPhotoSection.classList.remove('hidden');
+
+            // Show resolution coordinates if available
+            if (c.resolved_coordinates) {
+                document.getElementById('modal-resolved-coordinates').textContent = c.resolved_coordinates;
+                document.getElementById('modal-res-coords-section').classList.remove('hidden');
+            } else {
+                document.getElementById('modal-res-coords-section').classList.add('hidden');
+            }
+        } else {
+            resPhotoSection.classList.add('hidden');
+        }
+
+        // Show/hide action section based on status
+        if (c.status === 'submitted') {
+            document.getElementById('modal-action-section').classList.remove('hidden');
+        } else {
+            document.getElementById('modal-action-section').classList.add('hidden');
+        }
+
+        // Show modal
+        document.getElementById('complaint-detail-modal').classList.remove('hidden');
+        document.body.style.overflow = 'hidden';
+    } catch (error) {
+        console.error('Error loading complaint details:', error);
+        alert('❌ Failed to load complaint details');
+    }
+}
+
+function closeDetailModal() {
+    document.getElementById('complaint-detail-modal').classList.add('hidden');
+    document.body.style.overflow = '';
+    currentModalComplaintId = null;
+}
+
+function openFullPhoto(src) {
+    document.getElementById('fullscreen-photo-img').src = src;
+    document.getElementById('fullscreen-photo-modal').classList.remove('hidden');
+}
+
+function closeFullPhoto() {
+    document.getElementById('fullscreen-photo-modal').classList.add('hidden');
+}
+
+async function forwardFromModal() {
+    if (!currentModalComplaintId) return;
+
+    const department = document.getElementById('modal-dept-select').value;
+    if (!department) {
+        alert('❌ Please select a department before forwarding.');
+        return;
+    }
+
+    if (!confirm(`Forward this complaint to "${department}"?`)) return;
+
+    try {
+        const response = await fetch(`/api/complaint/${currentModalComplaintId}/forward`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ department: department })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            alert('✅ ' + data.message);
+            closeDetailModal();
+            loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred. Please try again.');
+        console.error(error);
+    }
+}
+
+function getStatusColor(status) {
+    const colors = {
+        'submitted': 'bg-yellow-100 text-yellow-800',
+        'verified': 'bg-blue-100 text-blue-800',
+        'assigned': 'bg-blue-100 text-blue-800',
+        'in_progress': 'bg-purple-100 text-purple-800',
+        'resolved': 'bg-green-100 text-green-800'
+    };
+    return colors[status] || 'bg-gray-100 text-gray-800';
+}
+
+async function submitComplaint(e) {
+    e.preventDefault();
+
+    // Stop camera before submitting (silent)
+    if (mediaStream) {
+        stopCamera(false);
+    }
+
+    // Validate form fields
+    const name = document.getElementById('c-name').value.trim();
+    const type = document.getElementById('c-type').value.trim();
+    const district = document.getElementById('c-district').value.trim();
+    const pincode = document.getElementById('c-pincode').value.trim();
+    const location = document.getElementById('c-loc').value.trim();
+    const description = document.getElementById('c-desc').value.trim();
+
+    if (!name) {
+        alert('❌ Please enter your name');
+        return;
+    }
+    if (!type || type === '') {
+        alert('❌ Please select a problem type');
+        return;
+    }
+    if (!district || district === '') {
+        alert('❌ Please select a district');
+        return;
+    }
+    if (!pincode || String(pincode).length !== 6) {
+        alert('❌ Please enter a valid 6-digit pincode');
+        return;
+    }
+    if (!location) {
+        alert('❌ Please enter the location details');
+        return;
+    }
+    if (!description) {
+        alert('❌ Please describe the issue');
+        return;
+    }
+
+    const complaintData = {
+        name: name,
+        type: type,
+        district: district,
+        pincode: pincode,
+        location: location,
+        description: description,
+        mobile_number: document.getElementById('c-phone').value,
+        coordinates: document.getElementById('c-coords').value
+    };
+
+    try {
+        const data = await sendOperation('submit_complaint', complaintData, { photo: photoData, photoField: 'photo_upload_id' });
+        if (!data || data.success) {
+            alert(data
+                ? '✅ Complaint submitted successfully!\n\nComplaint ID: ' + data.complaint_id
+                : '📴 The server cannot be reached right now.\n\nYour complaint is saved on this device and will be sent automatically when the connection is back.');
+            document.getElementById('citizen-form').reset();
+            photoData = null;
+            document.getElementById('photo-preview-container').classList.add('hidden');
+            document.getElementById('location-info').innerHTML = '';
+            if (data) loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred while communicating with the server.\n\nDetails: ' + error.message);
+        console.error('Submission error:', error);
+    }
+}
+
+async function forwardComplaint(complaintId) {
+    const select = document.getElementById('dept-' + complaintId);
+    const department = select ? select.value : '';
+
+    if (!department) {
+        alert('❌ Please select a department before forwarding.');
+        return;
+    }
+
+    if (!confirm(`Forward this complaint to "${department}"?`)) return;
+
+    try {
+        const response = await fetch(`/api/complaint/${complaintId}/forward`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ department: department })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            alert('✅ ' + data.message);
+            loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred. Please try again.');
+        console.error(error);
+    }
+}
+
+async function markAsFake(complaintId) {
+    const reason = prompt("Why are you marking this as fake? (Optional):", "No evidence found at location / Spam report");
+    if (reason === null) return; // User cancelled
+
+    if (!confirm('Are you sure you want to mark this complaint as fake? It will be sent for investigation.')) return;
+
+    try {
+        const response = await fetch(`/api/complaint/${complaintId}/mark-fake`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ reason: reason })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            alert('🚩 ' + data.message);
+            loadComplaints();
+        } else {
+            alert('❌ Error: ' + data.message);
+        }
+    } catch (error) {
+        alert('❌ An error occurred.');
+        console.error(error);
+    }
+}
@@ -0,0 +1,23 @@
+// Translation tables are fetched one language at a time (built from utils.TRANSLATIONS);
+// the page sets I18N_URLS, mapping each language to its file.
+const translations = {};
+const translationRequests = {};
+
+function loadTranslations(lang) {
+    if (!I18N_URLS[lang]) lang = 'en';
+    if (!translationRequests[lang]) {
+        translationRequests[lang] = fetch(I18N_URLS[lang])
+            .then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            })
+            .then(table => (translations[lang] = table))
+            .catch(error => {
+                console.error('Could not load translations for ' + lang, error);
+                delete translationRequests[lang];
+                if (lang !== 'en') return loadTranslations('en');
+                return (translations.en = {});
+            });
+    }
+    return translationRequests[lang];
+}
@@ -0,0 +1,173 @@
+let currentOfficialRole = '';
+
+function showCitizenLogin() {
+    document.getElementById('citizen-login-modal').classList.remove('hidden');
+}
+
+function closeCitizenLogin() {
+    document.getElementById('citizen-login-modal').classList.add('hidden');
+    document.getElementById('login-step-1').classList.remove('hidden');
+    document.getElementById('login-step-2').classList.add('hidden');
+}
+
+function showOfficialLogin(role) {
+    currentOfficialRole = role;
+    document.getElementById('official-login-modal').classList.remove('hidden');
+    document.getElementById('official-login-title').textContent = role.charAt(0).toUpperCase() + role.slice(1) + ' Login';
+
+    // Show/hide fields based on role
+    const pincodeField = document.getElementById('official-pincode-field');
+    const deptField = document.getElementById('official-dept-field');
+
+    // Officials use Pincode for territorial access
+    if (role === 'municipal' || role === 'dept' || role === 'police') {
+        pincodeField.classList.remove('hidden');
+    } else {
+        pincodeField.classList.add('hidden');
+    }
+
+    // Only Dept uses the Department selection
+    if (role === 'dept') {
+        deptField.classList.remove('hidden');
+    } else {
+        deptField.classList.add('hidden');
+    }
+}
+
+function closeOfficialLogin() {
+    document.getElementById('official-login-modal').classList.add('hidden');
+}
+
+function getOtp() {
+    const phone = document.getElementById('login-phone').value;
+    if (!phone || phone.length !== 10) {
+        alert('Please enter a valid 10-digit phone number');
+        return;
+    }
+
+    fetch('/api/citizen/request-otp', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ phone })
+    })
+        .then(r => r.json())
+        .then(data => {
+            if (data.success) {
+                document.getElementById('otp-sent-msg').textContent = data.message;
+                document.getElementById('login-step-1').classList.add('hidden');
+                document.getElementById('login-step-2').classList.remove('hidden');
+            } else {
+                alert(data.message);
+            }
+        });
+}
+
+function verifyOtp() {
+    const phone = document.getElementById('login-phone').value;
+    const otp = document.getElementById('login-otp').value;
+
+    fetch('/api/citizen/verify-otp', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ phone, otp })
+    })
+        .then(r => r.json())
+        .then(data => {
+            if (data.success) {
+                window.location.href = '/dashboard';
+            } else {
+                alert(data.message);
+            }
+        });
+}
+
+function verifyOfficialLogin() {
+    const user_id = document.getElementById('official-id').value;
+    const password = document.getElementById('official-pass').value;
+    const pincode = document.getElementById('official-pincode').value;
+    const department = document.getElementById('official-dept').value;
+
+    fetch('/api/official/login', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            user_id,
+            password,
+            role: currentOfficialRole,
+            pincode,
+            department
+        })
+    })
+        .then(r => r.json())
+        .then(data => {
+            if (data.success) {
+                window.location.href = '/dashboard';
+            } else {
+                alert(data.message);
+            }
+        });
+}
+
+function changeLanguage(lang) {
+    // Store language preference
+    localStorage.setItem('selectedLanguage', lang);
+
+    return loadTranslations(lang).then(t => {
+        // Ignore a table that arrives after the user picked another language
+        if (localStorage.getItem('selectedLanguage') !== lang) return;
+
+        // Update home page texts
+        document.querySelector('h1').textContent = t.mainTitle;
+        document.querySelector('p:not([class])').textContent = t.mainSubtitle;
+
+        // Update role cards
+        const roleCards = document.querySelectorAll('[onclick*="Login"]');
+        const cardTitles = document.querySelectorAll('.role-card h3');
+        const cardDescs = document.querySelectorAll('.role-card p:not([class])');
+
+        // Citizen
+        cardTitles[0].textContent = t.citizen;
+        cardDescs[0].textContent = t.citizenDesc;
+
+        // Municipal
+        cardTitles[1].textContent = t.municipal;
+        cardDescs[1].textContent = t.municipalDesc;
+
+        // Dept
+        cardTitles[2].textContent = t.dept;
+        cardDescs[2].textContent = t.deptDesc;
+
+        // Police
+        cardTitles[3].textContent = t.police;
+        cardDescs[3].textContent = t.policeDesc;
+
+        // Update Citizen Login Modal
+        document.querySelector('#citizen-login-modal h2').textContent = t.citizenLoginTitle;
+        const citizenLabels = document.querySelectorAll('#citizen-login-modal label');
+        citizenLabels[0].textContent = t.phoneLabel;
+        citizenLabels[1].textContent = t.otpLabel;
+
+        // Update buttons
+        const getOtpBtn = document.querySelector('button[onclick="getOtp()"]');
+        const verifyBtn = document.querySelector('button[onclick="verifyOtp()"]');
+        if (getOtpBtn) getOtpBtn.textContent = t.getOtpBtn;
+        if (verifyBtn) verifyBtn.textContent = t.verifyBtn;
+
+        // Update Official Login Modal
+        document.querySelector('#official-login-modal h2').textContent = t.officialLoginTitle;
+        const officialLabels = document.querySelectorAll('#official-login-modal label');
+        officialLabels[0].textContent = t.userIdLabel;
+        officialLabels[1].textContent = t.passwordLabel;
+        officialLabels[2].textContent = t.pincodeLabel;
+        if (officialLabels[3]) officialLabels[3].textContent = t.deptLabel;
+    });
+}
+
+// Initialize language on page load
+window.addEventListener('DOMContentLoaded', function () {
+    const savedLanguage = localStorage.getItem('selectedLanguage') || 'en';
+    const selector = document.getElementById('language-selector');
+    if (selector) selector.value = savedLanguage;
+    // The page is rendered in English; other languages are fetched only when chosen
+    if (savedLanguage !== 'en') changeLanguage(savedLanguage);
+});
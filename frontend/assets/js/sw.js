@@ -0,0 +1,72 @@
+// Offline shell for the dashboard (served at /sw.js, see backend/assets.py).
+// Fingerprinted bundles never change, so they come from the cache first; the
+// dashboard page, source assets, stylesheets/fonts and the complaint list come
+// from the network and fall back to their last copy when it is unreachable.
+// Submissions and status updates made offline wait in the page's outbox.
+const SHELL_CACHE = 'civic-shell-v1';
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names.filter(name => name !== SHELL_CACHE).map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+function cacheable(response) {
+    // Opaque responses are cross-origin stylesheets and fonts from the CDNs
+    return response.type === 'opaque' || (response.ok && !response.redirected);
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (cacheable(response)) {
+            const cache = await caches.open(SHELL_CACHE);
+            await cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await caches.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        if (request.destination === 'style' || request.destination === 'font') {
+            event.respondWith(networkFirst(request));
+        }
+        return;
+    }
+    if (url.pathname === '/logout') {
+        // The cached pages and complaint list belong to the account signing out
+        event.waitUntil(caches.delete(SHELL_CACHE));
+        return;
+    }
+    if (url.pathname.startsWith('/assets/src/')) {
+        event.respondWith(networkFirst(request));
+    } else if (url.pathname.startsWith('/assets/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname === '/dashboard' || url.pathname === '/dashboard/cards' || url.pathname === '/api/complaints') {
+        event.respondWith(networkFirst(request));
+    }
+});